@@ -4,36 +4,29 @@ Extract Socio-Economic Data (RWI and Population) for each LGA
 
 import geopandas as gpd
 import pandas as pd
-import rasterio
-from rasterio.mask import mask
-import numpy as np
 from pathlib import Path
+from zonal_stats import ZonalStatsEngine
+from zonal_cache import ZonalStatsCache
+from storage import write_table
 
-def extract_raster_stats(raster_path, geometry):
-    """Extract statistics from raster for a given geometry"""
+def extract_raster_stats(raster_path, gdf, cache=None):
+    """
+    Extract statistics from raster for every LGA in one streaming pass
+    
+    The raster is read block by block, so peak memory stays flat even for
+    the national population raster. LGAs without valid pixels get 0.
+    With a cache, only LGAs whose geometry (or the raster) changed are recomputed.
+    """
+    stat_funcs = ['mean', 'sum', 'min', 'max', 'std']
     try:
-        with rasterio.open(raster_path) as src:
-            # Mask the raster with the geometry
-            out_image, out_transform = mask(src, [geometry], crop=True, nodata=src.nodata)
-            
-            # Get valid data (excluding nodata)
-            data = out_image[0]
-            valid_data = data[data != src.nodata] if src.nodata is not None else data.flatten()
-            
-            if len(valid_data) == 0:
-                return {'mean': 0, 'sum': 0, 'min': 0, 'max': 0, 'std': 0}
-            
-            stats = {
-                'mean': float(np.mean(valid_data)),
-                'sum': float(np.sum(valid_data)),
-                'min': float(np.min(valid_data)),
-                'max': float(np.max(valid_data)),
-                'std': float(np.std(valid_data))
-            }
-            return stats
+        if cache is not None:
+            stats = cache.get_or_compute(raster_path, gdf, stat_funcs, streaming=True)
+        else:
+            stats = ZonalStatsEngine(gdf).extract(raster_path, stat_funcs, streaming=True)
+        return stats.fillna(0)
     except Exception as e:
         print(f"    Error extracting raster: {e}", flush=True)
-        return {'mean': 0, 'sum': 0, 'min': 0, 'max': 0, 'std': 0}
+        return pd.DataFrame(0.0, index=gdf.index, columns=stat_funcs)
 
 def main():
     """Extract socio-economic data for all LGAs"""
@@ -68,7 +61,14 @@ def main():
     
     print(f"Processing {len(gdf)} LGAs: {gdf[lga_col].tolist()}\n", flush=True)
     
-    # Extract data for each LGA
+    # Extract raster statistics for all LGAs at once (cached between runs)
+    cache = ZonalStatsCache(base_path / "cache" / "zonal_stats")
+    print("Extracting RWI...", flush=True)
+    rwi_all = extract_raster_stats(rwi_raster, gdf, cache)
+    
+    print("Extracting Population...\n", flush=True)
+    pop_all = extract_raster_stats(population_raster, gdf, cache)
+    
     results = []
     
     for idx, row in gdf.iterrows():
@@ -77,15 +77,8 @@ def main():
         
         print(f"[{idx+1}/{len(gdf)}] {lga_name}, {state_name}", flush=True)
         
-        geom = row.geometry
-        
-        # Extract RWI (Relative Wealth Index)
-        print("  Extracting RWI...", flush=True)
-        rwi_stats = extract_raster_stats(rwi_raster, geom)
-        
-        # Extract Population
-        print("  Extracting Population...", flush=True)
-        pop_stats = extract_raster_stats(population_raster, geom)
+        rwi_stats = rwi_all.loc[idx]
+        pop_stats = pop_all.loc[idx]
         
         result = {
             'lga_name': lga_name,
@@ -104,8 +97,7 @@ def main():
     
     # Save results
     df = pd.DataFrame(results)
-    output_file = output_dir / "socioeconomic_data.xlsx"
-    df.to_excel(output_file, index=False)
+    output_file = write_table(df, output_dir / "socioeconomic_data.parquet")
     
     print("="*70, flush=True)
     print("EXTRACTION COMPLETE!", flush=True)
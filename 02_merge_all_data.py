@@ -6,116 +6,346 @@ Creates a complete dataset ready for modeling
 import pandas as pd
 from pathlib import Path
 import numpy as np
+from storage import read_table, write_table, table_exists, PartitionedTableWriter, partition_values, read_partition
+from panel_features import (
+    add_history_features, history_feature_names, history_weeks, week_ordinal,
+    DEFAULT_LAGS, DEFAULT_ROLLING_MEANS
+)
+from panel_index import project_registry, add_panel_index, UNKNOWN_LGA
 
-def main():
-    """Merge all data sources"""
-    print("="*70, flush=True)
-    print("MERGING ALL DATA SOURCES", flush=True)
-    print("="*70, flush=True)
-    
-    # Paths
-    base_path = Path(__file__).parent
-    data_path = base_path / "Data"
-    env_path = base_path / "environmental_data_excel"
-    output_dir = base_path / "merged_data"
-    output_dir.mkdir(exist_ok=True)
-    
-    # Load environmental data (weekly)
-    print("\n1. Loading environmental data...", flush=True)
-    env_file = env_path / "environmental_weekly_data_20141031_to_20241130.xlsx"
-    df_env = pd.read_excel(env_file)
-    print(f"   [OK] {len(df_env)} environmental records loaded", flush=True)
-    
-    # Load socioeconomic data
-    print("\n2. Loading socioeconomic data...", flush=True)
-    socio_file = env_path / "socioeconomic_data.xlsx"
-    df_socio = pd.read_excel(socio_file)
-    print(f"   [OK] {len(df_socio)} LGAs with socioeconomic data", flush=True)
-    
-    # Load epidemiological data
+SOCIO_COLUMNS = ['lga_id', 'rwi_mean', 'rwi_std', 'population_total']
+DEFAULT_POPULATION = 200000
+
+# Columns the streaming merge can partition the environmental panel by
+PARTITION_COLUMNS = {'state': 'state_name', 'year': 'year'}
+
+def load_weekly_cases(epi_file, registry):
+    """
+    Aggregate the line list to case counts per LGA and epi week
+
+    Parameters:
+    -----------
+    registry : LGARegistry
+        Maps line-list LGA names to lga_id
+
+    Returns:
+    --------
+    DataFrame (lga_id, week_id, case_count), or None if the line list has
+    no date or LGA column
+    """
     print("\n3. Loading epidemiological data...", flush=True)
-    epi_file = data_path / "Yobe State Cholera Line list (State Modified Template) 01122024.xlsx"
     df_epi = pd.read_excel(epi_file)
     print(f"   [OK] {len(df_epi)} cholera cases loaded", flush=True)
-    
+
     # Find date and location columns in epi data
     date_cols = [col for col in df_epi.columns if any(x in col.lower() for x in ['date', 'onset'])]
     lga_cols = [col for col in df_epi.columns if 'lga' in col.lower()]
-    
+
     if date_cols:
         date_col = date_cols[0]
         df_epi[date_col] = pd.to_datetime(df_epi[date_col], errors='coerce')
         df_epi = df_epi.dropna(subset=[date_col])
     else:
         print("   [ERROR] No date column found in epi data", flush=True)
-        return
-    
+        return None
+
     if lga_cols:
         lga_col_epi = lga_cols[0]
-        df_epi[lga_col_epi] = df_epi[lga_col_epi].str.strip().str.title()
     else:
         print("   [ERROR] No LGA column found in epi data", flush=True)
-        return
-    
-    # Create epi week and year
-    df_epi['year'] = df_epi[date_col].dt.isocalendar().year
-    df_epi['epi_week'] = df_epi[date_col].dt.isocalendar().week
-    
+        return None
+
+    # Integer LGA codes and Monday-based week ordinals (the epi week of the date)
+    df_epi['lga_id'] = registry.encode(df_epi[lga_col_epi])
+    df_epi['week_id'] = week_ordinal(df_epi[date_col]).astype(np.int32)
+
+    unknown = df_epi['lga_id'] == UNKNOWN_LGA
+    if unknown.any():
+        names = df_epi.loc[unknown, lga_col_epi].dropna().unique().tolist()
+        print(f"   [WARNING] {unknown.sum()} cases from LGAs not in LGA.shp skipped: {names}", flush=True)
+        df_epi = df_epi[~unknown]
+
     # Aggregate cases by LGA and epi week
     print("\n4. Aggregating cases by LGA and epi week...", flush=True)
-    cases_weekly = df_epi.groupby([lga_col_epi, 'year', 'epi_week']).size().reset_index(name='case_count')
-    cases_weekly.rename(columns={lga_col_epi: 'lga_name'}, inplace=True)
+    cases_weekly = df_epi.groupby(['lga_id', 'week_id']).size().reset_index(name='case_count')
     print(f"   [OK] {len(cases_weekly)} weekly case records", flush=True)
-    
-    # Merge environmental with socioeconomic
-    print("\n5. Merging environmental with socioeconomic data...", flush=True)
-    df_merged = df_env.merge(df_socio[['lga_name', 'rwi_mean', 'rwi_std', 'population_total']], 
-                              on='lga_name', how='left')
-    print(f"   [OK] Merged dataset: {len(df_merged)} records", flush=True)
-    
-    # Merge with case counts
-    print("\n6. Merging with epidemiological case data...", flush=True)
-    df_final = df_merged.merge(cases_weekly, on=['lga_name', 'year', 'epi_week'], how='left')
-    
+
+    return cases_weekly
+
+def index_socio(df_socio, registry):
+    """Add lga_id to the socioeconomic table"""
+    states = df_socio['state_name'] if 'state_name' in df_socio.columns else None
+    df_socio['lga_id'] = registry.encode(df_socio['lga_name'], states)
+    return df_socio
+
+def merge_panel(df_env, df_socio, cases_weekly, rwi_fill=None):
+    """
+    Join environmental rows with socioeconomic data and weekly case counts
+
+    All joins are on the integer panel index (lga_id, week_id); see
+    panel_index.add_panel_index and index_socio.
+
+    Parameters:
+    -----------
+    rwi_fill : float, optional
+        Value for LGAs without RWI (default: mean RWI of the merged rows)
+    """
+    df_merged = df_env.merge(df_socio[SOCIO_COLUMNS], on='lga_id', how='left')
+    df_final = df_merged.merge(cases_weekly, on=['lga_id', 'week_id'], how='left')
+
     # Fill missing case counts with 0 (weeks with no reported cases)
     df_final['case_count'] = df_final['case_count'].fillna(0).astype(int)
-    
+
     # Fill missing socioeconomic data with mean values
-    df_final['rwi_mean'] = df_final['rwi_mean'].fillna(df_final['rwi_mean'].mean())
+    if rwi_fill is None:
+        rwi_fill = df_final['rwi_mean'].mean()
+    df_final['rwi_mean'] = df_final['rwi_mean'].fillna(rwi_fill)
     df_final['rwi_std'] = df_final['rwi_std'].fillna(0)
-    df_final['population_total'] = df_final['population_total'].fillna(200000)  # Default population
-    
-    print(f"   [OK] Final dataset: {len(df_final)} records", flush=True)
-    
-    # Add lagged features (previous week's cases)
-    print("\n7. Creating lagged features...", flush=True)
-    df_final = df_final.sort_values(['lga_name', 'year', 'epi_week'])
-    
-    for lag in [1, 2, 4]:
-        df_final[f'cases_lag_{lag}w'] = df_final.groupby('lga_name')['case_count'].shift(lag).fillna(0)
-    
-    # Calculate rolling averages
-    for window in [4, 8]:
-        df_final[f'cases_rolling_{window}w'] = df_final.groupby('lga_name')['case_count'].transform(
-            lambda x: x.rolling(window, min_periods=1).mean()
-        )
-    
-    print(f"   [OK] Added lagged and rolling features", flush=True)
-    
-    # Save merged dataset
-    output_file = output_dir / "cholera_merged_dataset.xlsx"
-    df_final.to_excel(output_file, index=False)
-    
-    # Also save as CSV for faster loading
-    csv_file = output_dir / "cholera_merged_dataset.csv"
-    df_final.to_csv(csv_file, index=False)
-    
+    df_final['population_total'] = df_final['population_total'].fillna(DEFAULT_POPULATION)  # Default population
+
+    return df_final
+
+def add_case_features(df, lags, rolling_windows, ewm_spans):
+    """Lagged, rolling and EWM case features on the dense (LGA x week) panel"""
+    # Lags and windows count calendar weeks, so gaps in the data stay gaps
+    df = df.sort_values(['lga_id', 'week_id'])
+    return add_history_features(
+        df, 'case_count', prefix='cases', entity_col='lga_id', week_col='week_id',
+        lags=lags, rolling_means=rolling_windows, ewm_spans=ewm_spans
+    )
+
+def merge_incremental(df_env, df_socio, cases_weekly, output_file, lags, rolling_windows, ewm_spans):
+    """
+    Update the stored merged table, recomputing case features only where
+    the case history changed
+
+    The environmental, socioeconomic and case joins are redone (they are
+    cheap); (LGA, week) keys that are new, removed or have a different case
+    count are compared against the stored snapshot. For each LGA with a
+    change, features are recomputed from its first changed week onward,
+    using the preceding history_weeks() weeks as context; all other rows
+    keep their stored features.
+
+    Returns:
+    --------
+    (DataFrame, n_changed_keys, n_recomputed_rows), or None when there is no
+    stored snapshot with the same feature columns (a full merge is needed)
+    """
+    if not table_exists(output_file):
+        return None
+    df_old = read_table(output_file)
+
+    feature_cols = history_feature_names('cases', lags=lags, rolling_means=rolling_windows, ewm_spans=ewm_spans)
+    old_features = [col for col in df_old.columns if col.startswith('cases_')]
+    if sorted(old_features) != sorted(feature_cols) or 'lga_id' not in df_old.columns:
+        return None
+
+    df_new = merge_panel(df_env, df_socio, cases_weekly)
+    keys = ['lga_id', 'week_id']
+
+    # Keys whose case history differs from the snapshot
+    compare = df_new[keys + ['case_count']].merge(
+        df_old[keys + ['case_count']], on=keys, how='outer', suffixes=('', '_old'), indicator=True
+    )
+    changed = compare[(compare['_merge'] != 'both') | (compare['case_count'] != compare['case_count_old'])]
+    first_changed = changed.groupby('lga_id')['week_id'].min()
+
+    # Recompute from each LGA's first changed week, with trailing context
+    start = df_new['lga_id'].map(first_changed)
+    recompute = start.notna() & (df_new['week_id'] >= start)
+    context = start.notna() & (df_new['week_id'] >= start - history_weeks(lags, rolling_windows, ewm_spans))
+
+    df_recomputed = add_case_features(df_new[context], lags, rolling_windows, ewm_spans)
+    df_recomputed = df_recomputed[recompute.loc[df_recomputed.index]]
+    df_kept = df_new[~recompute].merge(df_old[keys + feature_cols], on=keys, how='left')
+
+    columns = df_new.columns.tolist() + feature_cols
+    df_final = pd.concat([df_kept, df_recomputed], ignore_index=True)[columns]
+    df_final = df_final.sort_values(['lga_id', 'week_id']).reset_index(drop=True)
+
+    return df_final, len(changed), int(recompute.sum())
+
+def merge_streaming(env_file, df_socio, cases_weekly, output_file, partition_by,
+                    lags, rolling_windows, ewm_spans, registry):
+    """
+    Merge the environmental panel one partition at a time
+
+    Each partition (a state, or a year plus the trailing weeks its lag and
+    rolling features need) is read with a Parquet filter, joined against
+    the small socioeconomic and weekly case tables, and written as one part
+    of the output table, so peak memory is one partition.
+
+    Returns:
+    --------
+    dict with summary statistics of the written table
+    """
+    column = PARTITION_COLUMNS[partition_by]
+
+    # Fill value for missing RWI, fixed up front so it does not vary by
+    # partition: the same row-weighted mean the full merge uses, computed
+    # from the LGA column alone
+    env_lgas = read_table(env_file, columns=['lga_name', 'state_name'])
+    registry.add(env_lgas['lga_name'], env_lgas['state_name'])
+    rows_per_lga = pd.Series(registry.encode(env_lgas['lga_name'], env_lgas['state_name'])).value_counts()
+    rwi = df_socio.drop_duplicates('lga_id').set_index('lga_id')['rwi_mean'].reindex(rows_per_lga.index)
+    rwi_fill = (rwi * rows_per_lga).sum() / rows_per_lga[rwi.notna()].sum()
+    del env_lgas
+
+    # Year partitions need earlier years as history for lag/rolling features
+    years_back = int(np.ceil(history_weeks(lags, rolling_windows, ewm_spans) / 52))
+
+    summary = {'records': 0, 'lgas': set(), 'week_start': None, 'week_end': None,
+               'cases_by_lga': pd.Series(dtype=float), 'weeks_with_cases': 0, 'columns': []}
+
+    values = partition_values(env_file, column)
+    with PartitionedTableWriter(output_file) as writer:
+        for i, value in enumerate(values, 1):
+            if partition_by == 'year':
+                df_env = read_partition(env_file, column, range(value - years_back, value + 1))
+            else:
+                df_env = read_partition(env_file, column, [value])
+
+            df_env = add_panel_index(df_env, registry)
+            df_part = merge_panel(df_env, df_socio, cases_weekly, rwi_fill)
+            df_part = add_case_features(df_part, lags, rolling_windows, ewm_spans)
+            if partition_by == 'year':
+                df_part = df_part[df_part['year'] == value]
+
+            writer.write(df_part)
+            print(f"   [{i}/{len(values)}] {column}={value}: {len(df_part)} records", flush=True)
+
+            summary['records'] += len(df_part)
+            summary['lgas'].update(df_part['lga_id'].unique())
+            start, end = df_part['week_start'].min(), df_part['week_end'].max()
+            summary['week_start'] = start if summary['week_start'] is None else min(summary['week_start'], start)
+            summary['week_end'] = end if summary['week_end'] is None else max(summary['week_end'], end)
+            summary['cases_by_lga'] = summary['cases_by_lga'].add(
+                df_part.groupby('lga_id')['case_count'].sum(), fill_value=0)
+            summary['weeks_with_cases'] += int((df_part['case_count'] > 0).sum())
+            summary['columns'] = df_part.columns.tolist()
+
+    cases_by_lga = summary['cases_by_lga']
+    summary['cases_by_lga'] = pd.Series(cases_by_lga.values, index=registry.decode(cases_by_lga.index.astype(int)))
+    return summary
+
+def main(lags=DEFAULT_LAGS, rolling_windows=DEFAULT_ROLLING_MEANS, ewm_spans=(), partition_by=None,
+         incremental=False):
+    """
+    Merge all data sources
+
+    Parameters:
+    -----------
+    lags : sequence of int
+        Case-count lags in weeks
+    rolling_windows : sequence of int
+        Trailing rolling-mean windows in weeks
+    ewm_spans : sequence of int
+        Spans of exponentially weighted case-count means
+    partition_by : str, optional
+        'state' or 'year' to stream the merge one partition at a time and
+        write a partitioned output table (for national, multi-year panels)
+    incremental : bool
+        Update the stored merged table, recomputing features only for new or
+        changed (LGA, week) rows (falls back to a full merge when there is no
+        compatible stored table; takes precedence over partition_by)
+    """
+    print("="*70, flush=True)
+    print("MERGING ALL DATA SOURCES", flush=True)
+    print("="*70, flush=True)
+
+    # Paths
+    base_path = Path(__file__).parent
+    data_path = base_path / "Data"
+    env_path = base_path / "environmental_data_excel"
+    output_dir = base_path / "merged_data"
+    output_dir.mkdir(exist_ok=True)
+
+    env_file = env_path / "environmental_weekly_data_20141031_to_20241130.parquet"
+    socio_file = env_path / "socioeconomic_data.parquet"
+    # The web app saves uploads appended to the line list under the template name
+    epi_file = data_path / "Yobe State Cholera Line list (State Modified Template).xlsx"
+    if not epi_file.exists():
+        epi_file = data_path / "Yobe State Cholera Line list (State Modified Template) 01122024.xlsx"
+    output_file = output_dir / "cholera_merged_dataset.parquet"
+
+    if incremental:
+        partition_by = None
+
+    # Integer LGA codes shared by every stage (built from LGA.shp)
+    registry = project_registry(base_path)
+
+    # Load environmental data (weekly)
+    print("\n1. Loading environmental data...", flush=True)
+    if partition_by:
+        print(f"   [OK] Streaming by {partition_by}; partitions are read during the merge", flush=True)
+    else:
+        df_env = add_panel_index(read_table(env_file), registry)
+        print(f"   [OK] {len(df_env)} environmental records loaded", flush=True)
+
+    # Load socioeconomic data
+    print("\n2. Loading socioeconomic data...", flush=True)
+    df_socio = index_socio(read_table(socio_file), registry)
+    print(f"   [OK] {len(df_socio)} LGAs with socioeconomic data", flush=True)
+
+    # Load epidemiological data
+    cases_weekly = load_weekly_cases(epi_file, registry)
+    if cases_weekly is None:
+        return
+
+    if partition_by:
+        print(f"\n5-7. Merging and creating features by {partition_by}...", flush=True)
+        summary = merge_streaming(env_file, df_socio, cases_weekly, output_file, partition_by,
+                                  lags, rolling_windows, ewm_spans, registry)
+        registry.save()
+
+        print("\n" + "="*70, flush=True)
+        print("MERGE COMPLETE!", flush=True)
+        print("="*70, flush=True)
+        print(f"Output table: {output_file}", flush=True)
+        print(f"\nDataset summary:", flush=True)
+        print(f"  Total records: {summary['records']}", flush=True)
+        print(f"  LGAs: {len(summary['lgas'])}", flush=True)
+        print(f"  Date range: {summary['week_start']} to {summary['week_end']}", flush=True)
+        print(f"  Total cases: {int(summary['cases_by_lga'].sum())}", flush=True)
+        print(f"  Weeks with cases: {summary['weeks_with_cases']}", flush=True)
+        print(f"\nColumns ({len(summary['columns'])}):", flush=True)
+        print(f"  {summary['columns']}", flush=True)
+        print(f"\nCase distribution by LGA:", flush=True)
+        print(summary['cases_by_lga'].sort_values(ascending=False), flush=True)
+        return summary
+
+    result = None
+    if incremental:
+        print("\n5-7. Updating merged dataset incrementally...", flush=True)
+        result = merge_incremental(df_env, df_socio, cases_weekly, output_file,
+                                   lags, rolling_windows, ewm_spans)
+        if result is None:
+            print("   [INFO] No compatible merged dataset found; running full merge", flush=True)
+
+    if result is not None:
+        df_final, n_changed, n_recomputed = result
+        print(f"   [OK] {n_changed} new or changed (LGA, week) keys", flush=True)
+        print(f"   [OK] Recomputed features for {n_recomputed} of {len(df_final)} records", flush=True)
+    else:
+        # Merge environmental with socioeconomic
+        print("\n5. Merging environmental with socioeconomic data...", flush=True)
+        print("\n6. Merging with epidemiological case data...", flush=True)
+        df_final = merge_panel(df_env, df_socio, cases_weekly)
+        print(f"   [OK] Final dataset: {len(df_final)} records", flush=True)
+
+        # Add lagged, rolling and EWM features
+        print("\n7. Creating lagged features...", flush=True)
+        df_final = add_case_features(df_final, lags, rolling_windows, ewm_spans)
+        print(f"   [OK] Added lagged and rolling features", flush=True)
+
+    # Save merged dataset (Parquet; Excel only when CHOLERA_EXPORT_EXCEL=1)
+    output_file = write_table(df_final, output_file)
+    registry.save()
+
     print("\n" + "="*70, flush=True)
     print("MERGE COMPLETE!", flush=True)
     print("="*70, flush=True)
-    print(f"Output files:", flush=True)
-    print(f"  Excel: {output_file}", flush=True)
-    print(f"  CSV: {csv_file}", flush=True)
+    print(f"Output file: {output_file}", flush=True)
     print(f"\nDataset summary:", flush=True)
     print(f"  Total records: {len(df_final)}", flush=True)
     print(f"  LGAs: {df_final['lga_name'].nunique()}", flush=True)
@@ -126,12 +356,30 @@ def main():
     print(f"  {df_final.columns.tolist()}", flush=True)
     print(f"\nFirst few records:", flush=True)
     print(df_final.head(10), flush=True)
-    
+
     # Summary statistics
     print(f"\nCase distribution by LGA:", flush=True)
-    print(df_final.groupby('lga_name')['case_count'].sum().sort_values(ascending=False), flush=True)
-    
+    cases_by_lga = df_final.groupby('lga_id')['case_count'].sum()
+    cases_by_lga.index = registry.decode(cases_by_lga.index)
+    print(cases_by_lga.sort_values(ascending=False), flush=True)
+
     return df_final
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Merge environmental, socioeconomic and case data')
+    parser.add_argument('--lags', type=int, nargs='+', default=list(DEFAULT_LAGS),
+                        help='Case-count lags in weeks (default: 1 2 4)')
+    parser.add_argument('--windows', type=int, nargs='+', default=list(DEFAULT_ROLLING_MEANS),
+                        help='Rolling-mean windows in weeks (default: 4 8)')
+    parser.add_argument('--ewm-spans', type=int, nargs='*', default=[],
+                        help='Exponentially weighted mean spans in weeks (default: none)')
+    parser.add_argument('--partition-by', choices=sorted(PARTITION_COLUMNS), default=None,
+                        help='Stream the merge by state or year and write a partitioned table')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only recompute features for new or changed (LGA, week) rows')
+    args = parser.parse_args()
+
+    main(lags=args.lags, rolling_windows=args.windows, ewm_spans=args.ewm_spans,
+         partition_by=args.partition_by, incremental=args.incremental)
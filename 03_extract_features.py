@@ -5,16 +5,14 @@ Combines environmental, socioeconomic, and epidemiological data at LGA level
 
 import geopandas as gpd
 import pandas as pd
-import numpy as np
-import rasterio
-from rasterio.mask import mask
-from rasterio.warp import calculate_default_transform, reproject, Resampling
 from pathlib import Path
-from tqdm import tqdm
+from zonal_stats import ZonalStatsEngine, extract_parallel
+from zonal_cache import ZonalStatsCache, cached_extract_parallel
 import warnings
 warnings.filterwarnings('ignore')
 
-def extract_raster_stats(raster_path, geometries, stat_funcs=['mean', 'min', 'max', 'std']):
+def extract_raster_stats(raster_path, geometries, stat_funcs=['mean', 'min', 'max', 'std'], engine=None,
+                         streaming=False, cache=None):
     """
     Extract zonal statistics from raster for each geometry
     
@@ -26,122 +24,99 @@ def extract_raster_stats(raster_path, geometries, stat_funcs=['mean', 'min', 'ma
         Geometries to extract statistics for
     stat_funcs : list
         Statistics to calculate (mean, min, max, std, sum, median)
+    engine : ZonalStatsEngine, optional
+        Shared engine so label grids are reused across rasters on the same grid
+    streaming : bool
+        Stream the raster block by block with flat peak memory
+        (for national-scale rasters such as population and RWI)
+    cache : ZonalStatsCache, optional
+        Reuse stored statistics; only changed (raster, LGA) pairs are recomputed
     
     Returns:
     --------
     DataFrame with statistics for each geometry
     """
-    stats_list = []
+    if engine is None:
+        engine = ZonalStatsEngine(geometries)
     
-    with rasterio.open(raster_path) as src:
-        # Reproject geometries to match raster CRS if needed
-        if geometries.crs != src.crs:
-            geometries = geometries.to_crs(src.crs)
-        
-        for idx, row in geometries.iterrows():
-            try:
-                # Mask raster with geometry
-                geom = [row.geometry.__geo_interface__]
-                out_image, out_transform = mask(src, geom, crop=True, nodata=src.nodata)
-                
-                # Get valid pixels (non-nodata)
-                valid_pixels = out_image[out_image != src.nodata]
-                
-                if len(valid_pixels) == 0:
-                    # No valid pixels in this geometry
-                    stats = {func: np.nan for func in stat_funcs}
-                else:
-                    # Calculate statistics
-                    stats = {}
-                    if 'mean' in stat_funcs:
-                        stats['mean'] = np.mean(valid_pixels)
-                    if 'min' in stat_funcs:
-                        stats['min'] = np.min(valid_pixels)
-                    if 'max' in stat_funcs:
-                        stats['max'] = np.max(valid_pixels)
-                    if 'std' in stat_funcs:
-                        stats['std'] = np.std(valid_pixels)
-                    if 'sum' in stat_funcs:
-                        stats['sum'] = np.sum(valid_pixels)
-                    if 'median' in stat_funcs:
-                        stats['median'] = np.median(valid_pixels)
-                
-                stats['index'] = idx
-                stats_list.append(stats)
-                
-            except Exception as e:
-                print(f"Error processing geometry {idx}: {e}")
-                stats = {func: np.nan for func in stat_funcs}
-                stats['index'] = idx
-                stats_list.append(stats)
-    
-    return pd.DataFrame(stats_list).set_index('index')
+    if cache is not None:
+        return cache.get_or_compute(raster_path, geometries, stat_funcs, streaming, engine)
+    
+    return engine.extract(raster_path, stat_funcs, streaming=streaming)
+
+# ESRI Sentinel-2 10m LULC classes
+LULC_CLASSES = {
+    1: 'water',
+    2: 'trees',
+    3: 'grass',
+    4: 'flooded_veg',
+    5: 'crops',
+    6: 'shrub',
+    7: 'built',
+    8: 'bare',
+    9: 'snow_ice',
+    10: 'clouds'
+}
 
-def extract_lulc_proportions(lulc_path, geometries):
+def extract_lulc_proportions(lulc_path, geometries, class_map=None, engine=None, cache=None):
     """
     Extract land use/land cover class proportions for each geometry
     
-    LULC Classes:
-    1: Water, 2: Trees, 3: Grass, 4: Flooded Vegetation, 5: Crops
-    6: Shrub/Scrub, 7: Built Area, 8: Bare Ground, 9: Snow/Ice, 10: Clouds
+    All LGA x class proportions come from one joint (zone, class) bincount
+    over the label grid and the class raster, read block by block so the
+    10 m land cover raster is never held in memory whole.
+    
+    Parameters:
+    -----------
+    lulc_path : Path
+        Path to categorical LULC raster
+    geometries : GeoDataFrame
+        Geometries to extract proportions for
+    class_map : dict, optional
+        {class code: class name}; defaults to LULC_CLASSES
+        (1: Water, 2: Trees, 3: Grass, 4: Flooded Vegetation, 5: Crops,
+        6: Shrub/Scrub, 7: Built Area, 8: Bare Ground, 9: Snow/Ice, 10: Clouds)
+    engine : ZonalStatsEngine, optional
+        Shared engine so label grids are reused across rasters on the same grid
+    cache : ZonalStatsCache, optional
+        Reuse stored proportions; only changed (raster, LGA) pairs are recomputed
+    
+    Returns:
+    --------
+    DataFrame with a lulc_{name}_prop column per class
     """
     print("\nExtracting LULC proportions...")
     
-    lulc_classes = {
-        1: 'water',
-        2: 'trees',
-        3: 'grass',
-        4: 'flooded_veg',
-        5: 'crops',
-        6: 'shrub',
-        7: 'built',
-        8: 'bare',
-        9: 'snow_ice',
-        10: 'clouds'
-    }
+    if class_map is None:
+        class_map = LULC_CLASSES
+    if engine is None:
+        engine = ZonalStatsEngine(geometries)
     
-    props_list = []
+    columns = {class_id: f'lulc_{name}_prop' for class_id, name in class_map.items()}
+    if cache is not None:
+        props = cache.get_or_compute(lulc_path, geometries, columns, streaming=True, engine=engine)
+    else:
+        props = engine.class_proportions(lulc_path, columns, streaming=True)
     
-    with rasterio.open(lulc_path) as src:
-        # Reproject geometries if needed
-        if geometries.crs != src.crs:
-            geometries = geometries.to_crs(src.crs)
-        
-        for idx, row in tqdm(geometries.iterrows(), total=len(geometries), desc="LULC"):
-            try:
-                geom = [row.geometry.__geo_interface__]
-                out_image, out_transform = mask(src, geom, crop=True, nodata=src.nodata)
-                
-                # Get valid pixels
-                valid_pixels = out_image[out_image != src.nodata]
-                
-                if len(valid_pixels) == 0:
-                    props = {f'lulc_{name}_prop': 0.0 for name in lulc_classes.values()}
-                else:
-                    # Calculate proportions
-                    total_pixels = len(valid_pixels)
-                    props = {}
-                    for class_id, class_name in lulc_classes.items():
-                        count = np.sum(valid_pixels == class_id)
-                        props[f'lulc_{class_name}_prop'] = count / total_pixels
-                
-                props['index'] = idx
-                props_list.append(props)
-                
-            except Exception as e:
-                print(f"Error processing geometry {idx}: {e}")
-                props = {f'lulc_{name}_prop': 0.0 for name in lulc_classes.values()}
-                props['index'] = idx
-                props_list.append(props)
-    
-    return pd.DataFrame(props_list).set_index('index')
+    # LGAs without valid pixels get 0 for every class
+    return props.fillna(0.0)
 
-def process_environmental_data(gdf, env_data_dir):
-    """Extract all environmental variables for each LGA"""
+def process_environmental_data(gdf, env_data_dir, engine=None, workers=1, cache=None):
+    """
+    Extract all environmental variables for each LGA
+    
+    With workers > 1, every raster x LGA-chunk task runs in a process pool
+    (each worker opens its own rasterio handle) and results are merged back
+    in LGA order, giving the same features_df as the sequential path.
+    """
     print("\n" + "="*60)
     print("Extracting Environmental Features")
     print("="*60)
     
+    # One engine for all rasters: LGAs are rasterized once per raster grid
+    if engine is None:
+        engine = ZonalStatsEngine(gdf)
+    
     # Dictionary to store all features
     features_dict = {}
     
@@ -157,17 +132,13 @@ def process_environmental_data(gdf, env_data_dir):
         'precipitation_total': ['sum', 'mean']
     }
     
-    # Extract statistics for each variable
+    # Rasters to process
+    tasks = {}
     for var_name, stats in env_vars.items():
         raster_path = env_data_dir / f"{var_name}.tif"
         
         if raster_path.exists():
-            print(f"\nProcessing {var_name}...")
-            stats_df = extract_raster_stats(raster_path, gdf, stats)
-            
-            # Rename columns
-            for stat in stats:
-                features_dict[f'{var_name}_{stat}'] = stats_df[stat]
+            tasks[var_name] = (raster_path, stats)
         else:
             print(f"Warning: {raster_path} not found, skipping...")
     
@@ -177,13 +148,42 @@ def process_environmental_data(gdf, env_data_dir):
     if not lulc_path.exists():
         lulc_path = env_data_dir / "lulc.tif"
     
-    if lulc_path.exists():
-        print(f"\nProcessing LULC from: {lulc_path.name}...")
-        lulc_props = extract_lulc_proportions(lulc_path, gdf)
+    lulc_columns = {class_id: f'lulc_{name}_prop' for class_id, name in LULC_CLASSES.items()}
+    if not lulc_path.exists():
+        print(f"Warning: LULC file not found, skipping...")
+        lulc_path = None
+    
+    if workers > 1:
+        print(f"\nProcessing {len(tasks)} rasters with {workers} workers...")
+        if lulc_path is not None:
+            tasks['lulc'] = (lulc_path, lulc_columns)
+        # LULC streams as in the sequential path (same results and cache entries)
+        if cache is not None:
+            results = cached_extract_parallel(cache, gdf, tasks, workers, streaming={'lulc'})
+        else:
+            results = extract_parallel(gdf, tasks, workers, streaming={'lulc'})
+        lulc_props = results.pop('lulc', None)
+        if lulc_props is not None:
+            lulc_props = lulc_props.fillna(0.0)
+    else:
+        results = {}
+        for var_name, (raster_path, stats) in tasks.items():
+            print(f"\nProcessing {var_name}...")
+            results[var_name] = extract_raster_stats(raster_path, gdf, stats, engine=engine, cache=cache)
+        
+        lulc_props = None
+        if lulc_path is not None:
+            print(f"\nProcessing LULC from: {lulc_path.name}...")
+            lulc_props = extract_lulc_proportions(lulc_path, gdf, engine=engine, cache=cache)
+    
+    # Rename columns
+    for var_name, stats_df in results.items():
+        for stat in env_vars[var_name]:
+            features_dict[f'{var_name}_{stat}'] = stats_df[stat]
+    
+    if lulc_props is not None:
         for col in lulc_props.columns:
             features_dict[col] = lulc_props[col]
-    else:
-        print(f"Warning: LULC file not found, skipping...")
     
     # Combine all features
     features_df = pd.DataFrame(features_dict)
@@ -192,18 +192,22 @@ def process_environmental_data(gdf, env_data_dir):
     
     return features_df
 
-def process_socioeconomic_data(gdf, rwi_path, population_path):
+def process_socioeconomic_data(gdf, rwi_path, population_path, engine=None, cache=None):
     """Extract socioeconomic features (RWI and population)"""
     print("\n" + "="*60)
     print("Extracting Socioeconomic Features")
     print("="*60)
     
+    if engine is None:
+        engine = ZonalStatsEngine(gdf)
+    
     features_dict = {}
     
     # Relative Wealth Index
     if rwi_path.exists():
         print("\nProcessing Relative Wealth Index...")
-        rwi_stats = extract_raster_stats(rwi_path, gdf, ['mean', 'min', 'max', 'std'])
+        rwi_stats = extract_raster_stats(rwi_path, gdf, ['mean', 'min', 'max', 'std'],
+                                         engine=engine, streaming=True, cache=cache)
         for stat in ['mean', 'min', 'max', 'std']:
             features_dict[f'rwi_{stat}'] = rwi_stats[stat]
     else:
@@ -212,7 +216,8 @@ def process_socioeconomic_data(gdf, rwi_path, population_path):
     # Population
     if population_path.exists():
         print("\nProcessing Population data...")
-        pop_stats = extract_raster_stats(population_path, gdf, ['sum', 'mean', 'max', 'std'])
+        pop_stats = extract_raster_stats(population_path, gdf, ['sum', 'mean', 'max', 'std'],
+                                         engine=engine, streaming=True, cache=cache)
         features_dict['population_total'] = pop_stats['sum']
         features_dict['population_density_mean'] = pop_stats['mean']
         features_dict['population_max'] = pop_stats['max']
@@ -266,8 +271,17 @@ def calculate_derived_features(features_df):
     
     return derived_df
 
-def main():
-    """Main feature extraction function"""
+def main(workers=1, use_cache=True):
+    """
+    Main feature extraction function
+    
+    Parameters:
+    -----------
+    workers : int
+        Worker processes for environmental raster extraction (1 = sequential)
+    use_cache : bool
+        Reuse cached zonal statistics from previous runs (cache/zonal_stats)
+    """
     # Define paths
     base_path = Path(__file__).parent
     data_path = base_path / "Data"
@@ -288,11 +302,15 @@ def main():
     rwi_path = data_path / "rwi.tif"
     population_path = data_path / "nga_general_2020.tif"
     
+    # Shared zonal statistics engine (label grids cached per raster grid)
+    engine = ZonalStatsEngine(gdf)
+    cache = ZonalStatsCache(base_path / "cache" / "zonal_stats") if use_cache else None
+    
     # Extract environmental features
-    env_features = process_environmental_data(gdf, env_data_dir)
+    env_features = process_environmental_data(gdf, env_data_dir, engine, workers=workers, cache=cache)
     
     # Extract socioeconomic features
-    socio_features = process_socioeconomic_data(gdf, rwi_path, population_path)
+    socio_features = process_socioeconomic_data(gdf, rwi_path, population_path, engine, cache=cache)
     
     # Calculate derived features
     derived_features = calculate_derived_features(
@@ -352,4 +370,13 @@ def main():
     return gdf_final
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Extract LGA-level features from rasters')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for raster x LGA-chunk extraction (default: 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recompute all zonal statistics instead of using cache/zonal_stats')
+    args = parser.parse_args()
+    
+    main(workers=args.workers, use_cache=not args.no_cache)
@@ -8,30 +8,39 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
 # Machine Learning
-from sklearn.model_selection import train_test_split, cross_val_score, TimeSeriesSplit
 from sklearn.preprocessing import StandardScaler
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import Ridge, Lasso
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-import joblib
-
-# Geospatial
-import geopandas as gpd
-import matplotlib.patches as mpatches
+from storage import read_table, write_table, frame_fingerprint
+from panel_index import project_registry, add_panel_index
+from forecasting import RecursiveForecaster, DEFAULT_HORIZON
+from model_zoo import train_zoo, DEFAULT_N_JOBS
+from backtest import temporal_split, PanelTimeSeriesSplit, run_backtest, save_backtest, DEFAULT_STEP
+from tuning import TrialStore, tune_model, tuned_params
+from model_registry import save_bundle, TASK_WEEKLY
+from inference import InferencePipeline
+from risk import classify_risk
+from map_geometry import load_geometry
+from map_render import value_labels, draw_labels
 
 def load_data():
     """Load merged dataset"""
     print("Loading merged dataset...", flush=True)
     base_path = Path(__file__).parent
-    data_file = base_path / "merged_data" / "cholera_merged_dataset.csv"
-    df = pd.read_csv(data_file)
+    data_file = base_path / "merged_data" / "cholera_merged_dataset.parquet"
+    df = read_table(data_file)
     df['week_start'] = pd.to_datetime(df['week_start'])
     df['week_end'] = pd.to_datetime(df['week_end'])
+    if 'lga_id' not in df.columns:
+        # Merged datasets from older runs have no integer panel index
+        add_panel_index(df, project_registry(base_path))
     print(f"  [OK] {len(df)} records loaded\n", flush=True)
     return df
 
@@ -60,58 +69,77 @@ def prepare_features(df):
     
     return X, y, feature_cols
 
-def train_models(X_train, y_train, X_test, y_test):
-    """Train multiple models and compare"""
-    print("Training models...", flush=True)
-    
+def build_models(tuned=None):
+    """Candidate models, with stored tuned params applied where available"""
     models = {
         'Random Forest': RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1),
         'Gradient Boosting': GradientBoostingRegressor(n_estimators=100, random_state=42),
         'Ridge Regression': Ridge(alpha=1.0),
         'Lasso Regression': Lasso(alpha=0.1)
     }
+    for name, params in (tuned or {}).items():
+        if name in models:
+            models[name].set_params(**params)
+    return models
+
+def tune_models(df, feature_cols, store, n_iter=20, n_jobs=DEFAULT_N_JOBS):
+    """
+    Hyperparameter search for every candidate model (see tuning.py)
+    
+    Parameters:
+    -----------
+    df : DataFrame
+        Training weeks of the merged panel (features filled)
+    store : TrialStore
+        Trial store (searches resume and warm start from it)
+    n_iter : int
+        Random candidates per model on a first search
+    """
+    print("Tuning hyperparameters...", flush=True)
+    start = time.time()
+    for name, model in build_models().items():
+        params, trials = tune_model(name, model, df, feature_cols, store, n_iter=n_iter, n_jobs=n_jobs)
+        print(f"  [OK] {name}: {params} ({len(trials)} trials)", flush=True)
+    print(f"[OK] Tuning finished in {time.time() - start:.1f}s\n", flush=True)
+
+def train_models(X_train, y_train, X_test, y_test, n_jobs=DEFAULT_N_JOBS, halving=False, cv=5,
+                 tuned=None):
+    """
+    Train multiple models and compare
+    
+    All holdout fits and cross-validation folds run in parallel (model_zoo).
+    
+    Parameters:
+    -----------
+    n_jobs : int
+        Worker processes (-1: all cores)
+    halving : bool
+        Drop clearly losing models after the first CV folds
+    cv : int or splitter
+        Cross-validation folds on the training data
+    tuned : dict, optional
+        Model name -> tuned params (from the tuning trial store)
+    """
+    print("Training models...", flush=True)
     
-    results = []
-    trained_models = {}
+    models = build_models(tuned)
+    if tuned:
+        print(f"  Using tuned params for: {', '.join(tuned)}", flush=True)
     
-    for name, model in models.items():
-        print(f"\n  Training {name}...", flush=True)
-        
-        # Train
-        model.fit(X_train, y_train)
-        
-        # Predictions
-        y_pred_train = model.predict(X_train)
-        y_pred_test = model.predict(X_test)
-        
-        # Metrics
-        train_r2 = r2_score(y_train, y_pred_train)
-        test_r2 = r2_score(y_test, y_pred_test)
-        test_rmse = np.sqrt(mean_squared_error(y_test, y_pred_test))
-        test_mae = mean_absolute_error(y_test, y_pred_test)
-        
-        # Cross-validation
-        cv_scores = cross_val_score(model, X_train, y_train, cv=5, scoring='r2')
-        cv_mean = cv_scores.mean()
-        
-        results.append({
-            'Model': name,
-            'Train_R2': train_r2,
-            'Test_R2': test_r2,
-            'CV_R2_Mean': cv_mean,
-            'Test_RMSE': test_rmse,
-            'Test_MAE': test_mae
-        })
-        
-        trained_models[name] = model
-        
-        print(f"    Train R²: {train_r2:.3f}", flush=True)
-        print(f"    Test R²: {test_r2:.3f}", flush=True)
-        print(f"    CV R² (mean): {cv_mean:.3f}", flush=True)
-        print(f"    RMSE: {test_rmse:.3f}", flush=True)
+    start = time.time()
+    results_df, trained_models = train_zoo(
+        models, X_train, y_train, X_test, y_test, cv=cv, n_jobs=n_jobs, halving=halving
+    )
     
-    results_df = pd.DataFrame(results)
-    print(f"\n[OK] All models trained\n", flush=True)
+    for _, row in results_df.iterrows():
+        print(f"\n  {row['Model']}:", flush=True)
+        print(f"    Train R²: {row['Train_R2']:.3f}", flush=True)
+        print(f"    Test R²: {row['Test_R2']:.3f}", flush=True)
+        print(f"    CV R² (mean): {row['CV_R2_Mean']:.3f} ({row['CV_Folds']} folds)", flush=True)
+        print(f"    RMSE: {row['Test_RMSE']:.3f}", flush=True)
+    
+    results_df = results_df[['Model', 'Train_R2', 'Test_R2', 'CV_R2_Mean', 'CV_Folds', 'Test_RMSE', 'Test_MAE']]
+    print(f"\n[OK] All models trained in {time.time() - start:.1f}s\n", flush=True)
     
     # Select best model (highest Test R2)
     best_idx = results_df['Test_R2'].idxmax()
@@ -122,30 +150,55 @@ def train_models(X_train, y_train, X_test, y_test):
     
     return results_df, trained_models, best_model, best_model_name
 
-def save_models_and_results(models, results_df, scaler, feature_cols):
-    """Save models and results"""
+def save_models_and_results(pipeline, results_df, data_fingerprint=None):
+    """Save results and register the best model's inference pipeline (model_registry)"""
     base_path = Path(__file__).parent
     output_dir = base_path / "model_output"
     output_dir.mkdir(exist_ok=True)
     
     # Save best model
-    best_model_name = results_df.loc[results_df['Test_R2'].idxmax(), 'Model']
-    best_model = models[best_model_name]
-    
-    joblib.dump(best_model, output_dir / "best_model.pkl")
-    joblib.dump(scaler, output_dir / "scaler.pkl")
-    
-    # Save feature names
-    with open(output_dir / "feature_names.txt", 'w') as f:
-        f.write('\n'.join(feature_cols))
+    best_row = results_df.loc[results_df['Test_R2'].idxmax()]
+    best_model_name = best_row['Model']
+    bundle = save_bundle(
+        pipeline, task=TASK_WEEKLY,
+        data_fingerprint=data_fingerprint, model_name=best_model_name,
+        metrics={k: float(v) for k, v in best_row.drop('Model').items()}
+    )
     
     # Save results
     results_df.to_csv(output_dir / "model_results.csv", index=False)
     
+    print(f"Model registered: {best_model_name} (version {bundle.version})", flush=True)
     print(f"Models saved to: {output_dir}\n", flush=True)
     
     return output_dir
 
+def backtest_model(model, df, feature_cols, output_dir, horizon=DEFAULT_HORIZON,
+                   step=DEFAULT_STEP, n_jobs=DEFAULT_N_JOBS):
+    """
+    Rolling-origin backtest of a model's recursive forecasts
+    
+    Parameters:
+    -----------
+    model : estimator
+        Model to backtest (refit at each origin, warm where supported)
+    step : int
+        Weeks between forecast origins
+    """
+    print("Backtesting (rolling origin)...", flush=True)
+    start = time.time()
+    results = run_backtest(clone(model), df, feature_cols, scaler=StandardScaler(),
+                           step=step, horizon=horizon, n_jobs=n_jobs)
+    save_backtest(results, output_dir)
+    
+    origins = results['origins']
+    horizons = results['horizons']
+    print(f"  Origins: {len(origins)} (every {step} weeks, {horizon}-week horizon)", flush=True)
+    print(f"  MAE: {origins['mae'].mean():.3f} per origin, "
+          f"{horizons['mae'].iloc[0]:.3f} at 1 week, {horizons['mae'].iloc[-1]:.3f} at {horizon} weeks", flush=True)
+    print(f"[OK] Backtest saved to {output_dir} in {time.time() - start:.1f}s\n", flush=True)
+    return results
+
 def plot_feature_importance(model, feature_cols, output_dir):
     """Plot feature importance"""
     if hasattr(model, 'feature_importances_'):
@@ -171,23 +224,15 @@ def plot_feature_importance(model, feature_cols, output_dir):
         
         print(f"[OK] Feature importance saved\n", flush=True)
 
-def make_predictions(model, scaler, df, feature_cols, output_dir):
-    """Make predictions on entire dataset"""
+def make_predictions(pipeline, df, output_dir):
+    """Make predictions on entire dataset (one fused pipeline pass)"""
     print("Making predictions...", flush=True)
     
-    X = df[feature_cols].fillna(0)
-    X_scaled = scaler.transform(X)
-    
-    predictions = model.predict(X_scaled)
-    predictions = np.maximum(predictions, 0)  # No negative predictions
-    
-    df['predicted_cases'] = predictions
+    df['predicted_cases'] = pipeline.predict(df)  # No negative predictions
     df['prediction_error'] = df['case_count'] - df['predicted_cases']
     
-    # Risk categories
-    df['risk_category'] = pd.cut(df['predicted_cases'], 
-                                   bins=[-np.inf, 1, 5, 10, np.inf],
-                                   labels=['Low', 'Medium', 'High', 'Very High'])
+    # Risk categories (fixed bins; a value on a bin edge is in the lower level)
+    df['risk_category'] = classify_risk(df['predicted_cases'], scheme='fixed', right=True)
     
     print(f"[OK] Predictions generated\n", flush=True)
     
@@ -200,18 +245,18 @@ def create_maps(df, output_dir):
     base_path = Path(__file__).parent
     shapefile = base_path / "Data" / "LGA.shp"
     
-    gdf = gpd.read_file(shapefile)
-    lga_col = [col for col in gdf.columns if 'lganame' in col.lower()][0]
-    gdf[lga_col] = gdf[lga_col].str.strip().str.title()
+    # Prepared boundaries with label points (map_geometry.py)
+    geometry = load_geometry(shapefile, registry=project_registry(base_path))
+    gdf = geometry.geodataframe()
     
     # Aggregate predictions by LGA
-    lga_summary = df.groupby('lga_name').agg({
+    lga_summary = df.groupby('lga_id').agg({
         'case_count': 'sum',
         'predicted_cases': 'sum'
     }).reset_index()
     
     # Merge with shapefile
-    gdf_merged = gdf.merge(lga_summary, left_on=lga_col, right_on='lga_name', how='left')
+    gdf_merged = gdf.merge(lga_summary, on='lga_id', how='left')
     gdf_merged['case_count'] = gdf_merged['case_count'].fillna(0)
     gdf_merged['predicted_cases'] = gdf_merged['predicted_cases'].fillna(0)
     
@@ -226,11 +271,8 @@ def create_maps(df, output_dir):
     axes[0].axis('off')
     
     # Add labels
-    for idx, row in gdf_merged.iterrows():
-        if pd.notna(row['case_count']) and row['case_count'] > 0:
-            centroid = row.geometry.centroid
-            axes[0].text(centroid.x, centroid.y, f"{int(row['case_count'])}", 
-                        fontsize=8, ha='center', fontweight='bold')
+    x, y, text = value_labels(gdf_merged, 'case_count')
+    draw_labels(axes[0], x, y, text, fontsize=8, ha='center', fontweight='bold')
     
     # Map 2: Predicted Cases
     gdf_merged.plot(column='predicted_cases', ax=axes[1], legend=True,
@@ -266,8 +308,8 @@ def create_charts(df, results_df, output_dir):
     axes[0, 1].set_ylabel('RMSE')
     
     # Time series by LGA
-    for lga in df['lga_name'].unique():
-        lga_data = df[df['lga_name'] == lga].sort_values('week_start')
+    for _, lga_data in df.sort_values('week_start').groupby('lga_id'):
+        lga = lga_data['lga_name'].iloc[0]
         axes[1, 0].plot(lga_data['week_start'], lga_data['case_count'], label=lga, alpha=0.7)
     axes[1, 0].set_title('Cholera Cases Over Time by LGA', fontweight='bold')
     axes[1, 0].set_xlabel('Date')
@@ -291,84 +333,25 @@ def create_charts(df, results_df, output_dir):
     
     print(f"[OK] Charts saved\n", flush=True)
 
-def generate_future_predictions(model, scaler, df, feature_cols, output_dir):
-    """Generate predictions for next 12 weeks"""
-    print("Generating future predictions...", flush=True)
-    
-    # Get last date
-    last_date = df['week_end'].max()
-    
-    # Create future dates (next 12 weeks)
-    future_dates = []
-    for i in range(1, 13):
-        future_week_start = last_date + timedelta(days=7*i)
-        future_week_end = future_week_start + timedelta(days=6)
-        future_dates.append({
-            'week_start': future_week_start,
-            'week_end': future_week_end,
-            'year': future_week_start.isocalendar()[0],
-            'epi_week': future_week_start.isocalendar()[1]
-        })
-    
-    future_predictions = []
-    
-    for lga in df['lga_name'].unique():
-        lga_data = df[df['lga_name'] == lga].sort_values('week_start').tail(20)
-        
-        # Get recent averages for environmental features
-        env_features = {
-            'elevation_mean': lga_data['elevation_mean'].mean(),
-            'slope_mean': lga_data['slope_mean'].mean(),
-            'aspect_mean': lga_data['aspect_mean'].mean(),
-            'precipitation_total': lga_data['precipitation_total'].mean(),
-            'lst_day_mean': lga_data['lst_day_mean'].mean(),
-            'lst_night_mean': lga_data['lst_night_mean'].mean(),
-            'ndvi_mean': lga_data['ndvi_mean'].mean(),
-            'rwi_mean': lga_data['rwi_mean'].mean(),
-            'rwi_std': lga_data['rwi_std'].mean(),
-            'population_total': lga_data['population_total'].mean()
-        }
-        
-        for future_date in future_dates:
-            # Use recent case trends for lagged features
-            recent_cases = lga_data['case_count'].tail(8).values
-            
-            features = {
-                **env_features,
-                **future_date,
-                'cases_lag_1w': recent_cases[-1] if len(recent_cases) > 0 else 0,
-                'cases_lag_2w': recent_cases[-2] if len(recent_cases) > 1 else 0,
-                'cases_lag_4w': recent_cases[-4] if len(recent_cases) > 3 else 0,
-                'cases_rolling_4w': recent_cases[-4:].mean() if len(recent_cases) > 3 else 0,
-                'cases_rolling_8w': recent_cases.mean()
-            }
-            
-            # Make prediction
-            X_future = pd.DataFrame([features])[feature_cols]
-            X_future_scaled = scaler.transform(X_future)
-            pred = model.predict(X_future_scaled)[0]
-            pred = max(0, pred)
-            
-            # Risk category
-            if pred < 1:
-                risk = 'Low'
-            elif pred < 5:
-                risk = 'Medium'
-            elif pred < 10:
-                risk = 'High'
-            else:
-                risk = 'Very High'
-            
-            future_predictions.append({
-                'lga_name': lga,
-                'week_start': future_date['week_start'],
-                'week_end': future_date['week_end'],
-                'predicted_cases': round(pred, 2),
-                'risk_category': risk
-            })
+def generate_future_predictions(pipeline, df, output_dir, horizon=DEFAULT_HORIZON):
+    """
+    Generate predictions for the weeks after the data
+
+    All LGAs are forecast together, one batched predict per week, with each
+    week's predictions feeding the lag and rolling case features of the next.
+    """
+    print(f"Generating future predictions ({horizon} weeks)...", flush=True)
     
-    df_future = pd.DataFrame(future_predictions)
-    df_future.to_excel(output_dir / "future_predictions_12weeks.xlsx", index=False)
+    forecaster = RecursiveForecaster(pipeline, None, pipeline.feature_names)
+    df_future = forecaster.forecast(df, horizon=horizon)
+    df_future['predicted_cases'] = df_future['predicted_cases'].round(2)
+    
+    # Risk categories (fixed bins)
+    df_future['risk_category'] = classify_risk(df_future['predicted_cases'], scheme='fixed').astype(str)
+    
+    df_future = df_future[['lga_id', 'lga_name', 'week_start', 'week_end', 'predicted_cases', 'risk_category']]
+    # The app and PDF report read this file whatever the horizon
+    write_table(df_future, output_dir / "future_predictions_12weeks.parquet")
     
     print(f"[OK] Future predictions saved\n", flush=True)
     
@@ -398,7 +381,9 @@ def generate_report(df, df_future, results_df, output_dir):
         # Case Distribution
         f.write("2. CASE DISTRIBUTION BY LGA\n")
         f.write("-"*70 + "\n")
-        case_dist = df.groupby('lga_name')['case_count'].sum().sort_values(ascending=False)
+        case_dist = df.groupby('lga_id')['case_count'].sum()
+        case_dist.index = df.drop_duplicates('lga_id').set_index('lga_id').loc[case_dist.index, 'lga_name']
+        case_dist = case_dist.sort_values(ascending=False)
         for lga, cases in case_dist.items():
             f.write(f"   {lga}: {int(cases)} cases ({cases/df['case_count'].sum()*100:.1f}%)\n")
         f.write("\n")
@@ -418,16 +403,16 @@ def generate_report(df, df_future, results_df, output_dir):
         f.write(f"\n   Best Model: {best_model}\n\n")
         
         # Future Predictions
-        f.write("4. FUTURE PREDICTIONS (Next 12 Weeks)\n")
+        f.write(f"4. FUTURE PREDICTIONS (Next {df_future['week_start'].nunique()} Weeks)\n")
         f.write("-"*70 + "\n")
-        for lga in df_future['lga_name'].unique():
-            lga_future = df_future[df_future['lga_name'] == lga]
+        for _, lga_future in df_future.groupby('lga_id', sort=False):
+            lga = lga_future['lga_name'].iloc[0]
             total_pred = lga_future['predicted_cases'].sum()
             high_risk_weeks = (lga_future['risk_category'].isin(['High', 'Very High'])).sum()
             
             f.write(f"\n   {lga}:\n")
             f.write(f"      Predicted Total Cases: {total_pred:.1f}\n")
-            f.write(f"      High-Risk Weeks: {high_risk_weeks}/12\n")
+            f.write(f"      High-Risk Weeks: {high_risk_weeks}/{len(lga_future)}\n")
             f.write(f"      Next Week Prediction: {lga_future.iloc[0]['predicted_cases']:.1f} cases\n")
         
         f.write("\n\n5. RECOMMENDATIONS\n")
@@ -453,8 +438,29 @@ def generate_report(df, df_future, results_df, output_dir):
     
     print(f"[OK] Report saved to: {report_file}\n", flush=True)
 
-def main():
-    """Main pipeline"""
+def main(horizon=DEFAULT_HORIZON, n_jobs=DEFAULT_N_JOBS, halving=False, backtest=False,
+         backtest_step=DEFAULT_STEP, tune=False, n_iter=20):
+    """
+    Main pipeline
+    
+    Parameters:
+    -----------
+    horizon : int
+        Number of future weeks to forecast
+    n_jobs : int
+        Worker processes for model training (-1: all cores)
+    halving : bool
+        Successive halving: drop clearly losing models after the first CV folds
+    backtest : bool
+        Run a rolling-origin backtest of the best model
+    backtest_step : int
+        Weeks between backtest origins
+    tune : bool
+        Run (or resume) the hyperparameter search before training; tuned
+        params from earlier searches are used either way
+    n_iter : int
+        Random candidates per model on a first search
+    """
     print("\n" + "="*70, flush=True)
     print("CHOLERA PREDICTION SYSTEM - FULL PIPELINE", flush=True)
     print("="*70, flush=True)
@@ -466,10 +472,21 @@ def main():
     # Prepare features
     X, y, feature_cols = prepare_features(df)
     
-    # Split data (temporal split)
-    split_idx = int(len(X) * 0.8)
-    X_train, X_test = X[:split_idx], X[split_idx:]
-    y_train, y_test = y[:split_idx], y[split_idx:]
+    # Split data (temporal split: the last 20% of weeks, across all LGAs)
+    train_mask = temporal_split(df['week_id'])
+    X_train, X_test = X[train_mask], X[~train_mask]
+    y_train, y_test = y[train_mask], y[~train_mask]
+    cv = PanelTimeSeriesSplit(df.loc[train_mask, 'week_id'], n_splits=5)
+    df_model = df.assign(**{col: X[col] for col in feature_cols})
+    
+    # Hyperparameters: search on the training weeks only, reuse stored results
+    model_dir = Path(__file__).parent / "model_output"
+    model_dir.mkdir(exist_ok=True)
+    store = TrialStore(model_dir / "tuning_trials.sqlite")
+    if tune:
+        tune_models(df_model[train_mask], feature_cols, store, n_iter=n_iter, n_jobs=n_jobs)
+    tuned = tuned_params(store, build_models())
+    store.close()
     
     # Scale features
     scaler = StandardScaler()
@@ -478,32 +495,38 @@ def main():
     
     # Train models
     results_df, models, best_model, best_model_name = train_models(
-        X_train_scaled, y_train, X_test_scaled, y_test
+        X_train_scaled, y_train, X_test_scaled, y_test, n_jobs=n_jobs, halving=halving, cv=cv,
+        tuned=tuned
     )
     
     # Save models
-    output_dir = save_models_and_results(models, results_df, scaler, feature_cols)
+    fingerprint = frame_fingerprint(df_model[train_mask], ['lga_id', 'week_id', 'case_count'] + feature_cols)
+    pipeline = InferencePipeline(best_model, scaler, feature_cols)  # Training fill is 0
+    output_dir = save_models_and_results(pipeline, results_df, fingerprint)
     
     # Feature importance
     plot_feature_importance(best_model, feature_cols, output_dir)
     
+    # Rolling-origin backtest of the best model
+    if backtest:
+        backtest_model(models[best_model_name], df_model, feature_cols, output_dir,
+                       horizon, backtest_step, n_jobs)
+    
     # Make predictions on full dataset
-    X_scaled = scaler.transform(X)
-    df = make_predictions(best_model, scaler, df, feature_cols, output_dir)
+    df = make_predictions(pipeline, df, output_dir)
     
     # Save predictions
     pred_dir = Path(__file__).parent / "predictions"
     pred_dir.mkdir(exist_ok=True)
     
-    df.to_csv(pred_dir / "cholera_predictions.csv", index=False)
-    df.to_excel(pred_dir / "cholera_predictions.xlsx", index=False)
+    write_table(df, pred_dir / "cholera_predictions.parquet")
     
     # Create visualizations
     create_maps(df, pred_dir)
     create_charts(df, results_df, pred_dir)
     
     # Future predictions
-    df_future = generate_future_predictions(best_model, scaler, df, feature_cols, pred_dir)
+    df_future = generate_future_predictions(pipeline, df, pred_dir, horizon)
     
     # Generate report
     generate_report(df, df_future, results_df, pred_dir)
@@ -518,4 +541,25 @@ def main():
     print("="*70, flush=True)
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Train models, predict and forecast cholera cases')
+    parser.add_argument('--horizon', type=int, default=DEFAULT_HORIZON,
+                        help=f'Weeks to forecast (default: {DEFAULT_HORIZON})')
+    parser.add_argument('--n-jobs', type=int, default=DEFAULT_N_JOBS,
+                        help='Worker processes for model training (default: all cores)')
+    parser.add_argument('--halving', action='store_true',
+                        help='Drop clearly losing models after the first CV folds')
+    parser.add_argument('--backtest', action='store_true',
+                        help='Rolling-origin backtest of the best model (model_output/backtest_*.parquet)')
+    parser.add_argument('--backtest-step', type=int, default=DEFAULT_STEP,
+                        help=f'Weeks between backtest origins (default: {DEFAULT_STEP})')
+    parser.add_argument('--tune', action='store_true',
+                        help='Run or resume the hyperparameter search (model_output/tuning_trials.sqlite)')
+    parser.add_argument('--n-iter', type=int, default=20,
+                        help='Random candidates per model on a first search (default: 20)')
+    args = parser.parse_args()
+    
+    main(horizon=args.horizon, n_jobs=args.n_jobs, halving=args.halving,
+         backtest=args.backtest, backtest_step=args.backtest_step,
+         tune=args.tune, n_iter=args.n_iter)
@@ -10,6 +10,9 @@ from matplotlib.patches import Rectangle
 from pathlib import Path
 from datetime import datetime
 import warnings
+from storage import read_table
+from panel_index import project_registry, add_panel_index
+from model_registry import load_latest, TASK_WEEKLY
 warnings.filterwarnings('ignore')
 
 # For tables
@@ -245,16 +248,21 @@ def add_individual_maps(pdf, df):
     
     gdf = gpd.read_file(shapefile)
     lga_col = [col for col in gdf.columns if 'lganame' in col.lower()][0]
-    gdf[lga_col] = gdf[lga_col].str.strip().str.title()
+    state_cols = [col for col in gdf.columns if 'statename' in col.lower()]
+    registry = project_registry(base_path)
+    gdf['lga_id'] = registry.encode(gdf[lga_col], gdf[state_cols[0]] if state_cols else None)
+    if 'lga_id' not in df.columns:
+        # Predictions from older runs have no integer panel index
+        df = add_panel_index(df.copy(), registry)
     
     # Aggregate by LGA
-    lga_summary = df.groupby('lga_name').agg({
+    lga_summary = df.groupby('lga_id').agg({
         'case_count': 'sum',
         'predicted_cases': 'sum'
     }).reset_index()
     
     # Merge with shapefile
-    gdf_merged = gdf.merge(lga_summary, left_on=lga_col, right_on='lga_name', how='left')
+    gdf_merged = gdf.merge(lga_summary, on='lga_id', how='left')
     gdf_merged['case_count'] = gdf_merged['case_count'].fillna(0)
     gdf_merged['predicted_cases'] = gdf_merged['predicted_cases'].fillna(0)
     
@@ -292,8 +300,8 @@ def add_individual_maps(pdf, df):
     pdf.savefig(fig, bbox_inches='tight')
     plt.close()
 
-def add_model_results_page(pdf, results_df):
-    """Add detailed model results page"""
+def add_model_results_page(pdf, results_df, bundle=None):
+    """Add detailed model results page (with the deployed model version, if registered)"""
     fig = plt.figure(figsize=(8.5, 11))
     fig.patch.set_facecolor('white')
     ax = fig.add_subplot(111)
@@ -302,6 +310,11 @@ def add_model_results_page(pdf, results_df):
     # Title
     ax.text(0.5, 0.95, 'MODEL PERFORMANCE COMPARISON', 
             ha='center', va='top', fontsize=18, fontweight='bold', color='#2c3e50')
+    if bundle is not None:
+        manifest = bundle.manifest
+        ax.text(0.5, 0.91, f"Deployed model: {manifest.get('model_name')} "
+                f"(version {bundle.version}, trained {manifest.get('created', 'unknown')})",
+                ha='center', va='top', fontsize=9, color='#7f8c8d')
     
     # Create table with model results
     cell_text = []
@@ -457,9 +470,13 @@ def main():
     
     # Load data
     print("\nLoading data...", flush=True)
-    df = pd.read_csv(pred_dir / "cholera_predictions.csv")
-    df_future = pd.read_excel(pred_dir / "future_predictions_12weeks.xlsx")
+    df = read_table(pred_dir / "cholera_predictions.parquet")
+    df_future = read_table(pred_dir / "future_predictions_12weeks.parquet")
     results_df = pd.read_csv(model_dir / "model_results.csv")
+    try:
+        bundle = load_latest(TASK_WEEKLY, registry_dir=model_dir / "registry")
+    except FileNotFoundError:
+        bundle = None
     
     df['week_start'] = pd.to_datetime(df['week_start'])
     df['week_end'] = pd.to_datetime(df['week_end'])
@@ -487,7 +504,7 @@ def main():
                           "ANALYSIS CHARTS")
         
         print("  Adding model results...", flush=True)
-        add_model_results_page(pdf, results_df)
+        add_model_results_page(pdf, results_df, bundle)
         
         print("  Adding future predictions...", flush=True)
         add_future_predictions_page(pdf, df_future)
@@ -9,14 +9,17 @@ import geopandas as gpd
 from pathlib import Path
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.model_selection import train_test_split, cross_val_score, KFold
+from sklearn.model_selection import train_test_split, KFold
 from sklearn.preprocessing import StandardScaler, RobustScaler
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, ExtraTreesRegressor
 from sklearn.linear_model import Ridge, Lasso, ElasticNet
 from sklearn.svm import SVR
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.inspection import permutation_importance
-import joblib
+from model_zoo import train_zoo, DEFAULT_N_JOBS
+from model_registry import save_bundle, TASK_LGA
+from inference import InferencePipeline
+from storage import frame_fingerprint
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -110,8 +113,23 @@ def scale_features(X_train, X_test, method='robust'):
     
     return X_train_scaled, X_test_scaled, scaler
 
-def train_models(X_train, y_train):
-    """Train multiple models"""
+def train_models(X_train, y_train, n_jobs=DEFAULT_N_JOBS, cv=5):
+    """
+    Train multiple models and cross-validate each of them
+
+    Every model's fit and CV folds run in one process pool (see model_zoo).
+
+    Parameters:
+    -----------
+    n_jobs : int
+        Worker processes (-1: all cores)
+    cv : int
+        Shuffled K-fold cross-validation folds on the training set
+
+    Returns:
+    --------
+    (dict of fitted models, DataFrame of Model, CV_R2_Mean, CV_R2_Std, CV_Folds)
+    """
     print("\n" + "="*60)
     print("Training Models")
     print("="*60)
@@ -128,15 +146,13 @@ def train_models(X_train, y_train):
         'Elastic Net': ElasticNet(alpha=1.0, l1_ratio=0.5, max_iter=5000)
     }
     
-    trained_models = {}
+    kfold = KFold(n_splits=cv, shuffle=True, random_state=42)
+    zoo_results, trained_models = train_zoo(models, X_train, y_train, cv=kfold, n_jobs=n_jobs)
     
-    for name, model in models.items():
-        print(f"\nTraining {name}...")
-        model.fit(X_train, y_train)
-        trained_models[name] = model
+    for name in trained_models:
         print(f"[OK] {name} trained")
     
-    return trained_models
+    return trained_models, zoo_results[['Model', 'CV_R2_Mean', 'CV_R2_Std', 'CV_Folds']]
 
 def evaluate_models(models, X_train, y_train, X_test, y_test, feature_names):
     """Evaluate all models and return results"""
@@ -190,22 +206,17 @@ def evaluate_models(models, X_train, y_train, X_test, y_test, feature_names):
     
     return results_df
 
-def cross_validate_best_model(model, X, y, cv=5):
-    """Perform cross-validation on best model"""
+def report_cross_validation(cv_results, model_name):
+    """Print the best model's cross-validation scores (computed in train_models)"""
     print("\n" + "="*60)
     print("Cross-Validation")
     print("="*60)
     
-    kfold = KFold(n_splits=cv, shuffle=True, random_state=42)
-    
-    # Calculate scores
-    cv_scores = cross_val_score(model, X, y, cv=kfold, 
-                                scoring='r2', n_jobs=-1)
-    
-    print(f"\nCross-validation R² scores: {cv_scores}")
-    print(f"Mean R²: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
+    row = cv_results.set_index('Model').loc[model_name]
+    print(f"\nCross-validation R² ({int(row['CV_Folds'])} folds)")
+    print(f"Mean R²: {row['CV_R2_Mean']:.4f} (+/- {row['CV_R2_Std'] * 2:.4f})")
     
-    return cv_scores
+    return row
 
 def plot_feature_importance(model, feature_names, output_dir, top_n=20):
     """Plot feature importance for tree-based models"""
@@ -295,8 +306,17 @@ def plot_model_comparison(results_df, output_dir):
     
     print(f"[OK] Model comparison plot saved")
 
-def main():
-    """Main training function"""
+def main(n_jobs=DEFAULT_N_JOBS, cv=5):
+    """
+    Main training function
+    
+    Parameters:
+    -----------
+    n_jobs : int
+        Worker processes for model training (-1: all cores)
+    cv : int
+        Cross-validation folds per model
+    """
     # Define paths
     base_path = Path(__file__).parent
     model_data_path = base_path / "model_data"
@@ -323,11 +343,15 @@ def main():
     X_train_scaled, X_test_scaled, scaler = scale_features(X_train, X_test)
     
     # Train models
-    models = train_models(X_train_scaled, y_train)
+    models, cv_results = train_models(X_train_scaled, y_train, n_jobs=n_jobs, cv=cv)
     
     # Evaluate models
     results_df = evaluate_models(models, X_train_scaled, y_train, 
                                  X_test_scaled, y_test, feature_names)
+    results_df = results_df.merge(
+        cv_results.rename(columns={'Model': 'model', 'CV_R2_Mean': 'cv_r2_mean', 'CV_R2_Std': 'cv_r2_std'})
+        .drop(columns='CV_Folds'), on='model', how='left'
+    )
     
     # Save results
     results_df.to_csv(output_dir / 'model_results.csv', index=False)
@@ -342,8 +366,8 @@ def main():
     print(f"Test R²: {results_df.iloc[0]['test_r2']:.4f}")
     print(f"{'='*60}")
     
-    # Cross-validate best model
-    cv_scores = cross_validate_best_model(best_model, X_train_scaled, y_train)
+    # Cross-validation of the best model
+    report_cross_validation(cv_results, best_model_name)
     
     # Feature importance for best model
     plot_feature_importance(best_model, feature_names, output_dir)
@@ -356,14 +380,17 @@ def main():
     # Plot model comparison
     plot_model_comparison(results_df, output_dir)
     
-    # Save best model and scaler
-    joblib.dump(best_model, output_dir / 'best_model.pkl')
-    joblib.dump(scaler, output_dir / 'scaler.pkl')
-    joblib.dump(feature_names, output_dir / 'feature_names.pkl')
+    # Register best model with its scaler, feature schema and median fill
+    best_metrics = results_df.iloc[0].drop('model')
+    pipeline = InferencePipeline(best_model, scaler, feature_names,
+                                 fill_values=df[feature_names].median().values)
+    bundle = save_bundle(
+        pipeline, task=TASK_LGA,
+        data_fingerprint=frame_fingerprint(df, feature_names + ['total_cases']),
+        model_name=best_model_name, metrics={k: float(v) for k, v in best_metrics.items()}
+    )
     
-    print(f"\n[OK] Best model saved: {output_dir / 'best_model.pkl'}")
-    print(f"[OK] Scaler saved: {output_dir / 'scaler.pkl'}")
-    print(f"[OK] Feature names saved: {output_dir / 'feature_names.pkl'}")
+    print(f"\n[OK] Best model registered: {bundle.path} (version {bundle.version})")
     
     # Create predictions dataframe
     pred_df = pd.DataFrame({
@@ -382,4 +409,13 @@ def main():
     return best_model, scaler, feature_names
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Train LGA-level models on model_data')
+    parser.add_argument('--n-jobs', type=int, default=DEFAULT_N_JOBS,
+                        help='Worker processes for model training (default: all cores)')
+    parser.add_argument('--cv', type=int, default=5,
+                        help='Cross-validation folds per model (default: 5)')
+    args = parser.parse_args()
+    
+    main(n_jobs=args.n_jobs, cv=args.cv)
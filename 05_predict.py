@@ -6,27 +6,27 @@ Load trained model and make predictions on new data or scenarios
 import pandas as pd
 import numpy as np
 import geopandas as gpd
-import joblib
 from pathlib import Path
 import matplotlib.pyplot as plt
 import seaborn as sns
+from model_registry import load_latest, TASK_LGA
+from risk import classify_risk, RISK_LEVELS
 
 def load_model_artifacts(model_dir):
-    """Load trained model, scaler, and feature names"""
+    """Load the latest registered inference pipeline (model, scaler, feature schema)"""
     print("Loading model artifacts...")
     
-    model = joblib.load(model_dir / 'best_model.pkl')
-    scaler = joblib.load(model_dir / 'scaler.pkl')
-    feature_names = joblib.load(model_dir / 'feature_names.pkl')
+    bundle = load_latest(TASK_LGA, registry_dir=model_dir / "registry")
+    pipeline = bundle.pipeline
     
-    print(f"[OK] Model loaded: {type(model).__name__}")
-    print(f"[OK] Scaler loaded: {type(scaler).__name__}")
-    print(f"[OK] Feature names loaded: {len(feature_names)} features")
+    print(f"[OK] Model loaded: {type(pipeline.model).__name__} (version {bundle.version})")
+    print(f"[OK] Scaler loaded: {type(pipeline.scaler).__name__}")
+    print(f"[OK] Feature names loaded: {len(pipeline.feature_names)} features")
     
-    return model, scaler, feature_names
+    return pipeline
 
-def load_data_for_prediction(data_path, feature_names):
-    """Load data and ensure it has required features"""
+def load_data_for_prediction(data_path, pipeline):
+    """Load data and check it against the model's feature schema"""
     print(f"\nLoading data from: {data_path}")
     
     if data_path.suffix == '.csv':
@@ -39,8 +39,8 @@ def load_data_for_prediction(data_path, feature_names):
     
     print(f"Data shape: {df.shape}")
     
-    # Check for missing features
-    missing_features = [f for f in feature_names if f not in df.columns]
+    # Check for missing features (the pipeline fills them with the training fill)
+    missing_features = pipeline.missing_features(df.columns)
     
     if missing_features:
         print(f"\n⚠ Warning: {len(missing_features)} features missing from data:")
@@ -48,29 +48,16 @@ def load_data_for_prediction(data_path, feature_names):
             print(f"  - {feat}")
         if len(missing_features) > 10:
             print(f"  ... and {len(missing_features) - 10} more")
-        
-        # Fill missing features with zeros (or could use mean/median)
-        for feat in missing_features:
-            df[feat] = 0
-            print(f"  Filled {feat} with 0")
-    
-    # Extract features in correct order
-    X = df[feature_names].values
+        print("  Missing features are filled with their training fill values")
     
-    return X, df
+    return df
 
-def make_predictions(model, scaler, X):
-    """Make predictions using trained model"""
+def make_predictions(pipeline, df):
+    """Make predictions (column selection, imputation, scaling and model in one pass)"""
     print("\nMaking predictions...")
     
-    # Scale features
-    X_scaled = scaler.transform(X)
-    
-    # Predict
-    predictions = model.predict(X_scaled)
-    
-    # Ensure non-negative predictions
-    predictions = np.maximum(predictions, 0)
+    # Non-negative predictions
+    predictions = pipeline.predict(df)
     
     print(f"[OK] Predictions complete")
     print(f"  Min: {predictions.min():.2f}")
@@ -80,23 +67,18 @@ def make_predictions(model, scaler, X):
     
     return predictions
 
-def create_risk_categories(predictions):
-    """Categorize predictions into risk levels"""
-    # Define thresholds (adjust based on your context)
-    percentiles = np.percentile(predictions, [25, 50, 75])
-    
-    categories = []
-    for pred in predictions:
-        if pred < percentiles[0]:
-            categories.append('Low')
-        elif pred < percentiles[1]:
-            categories.append('Medium')
-        elif pred < percentiles[2]:
-            categories.append('High')
-        else:
-            categories.append('Very High')
-    
-    return categories
+def create_risk_categories(predictions, scheme='percentile', groups=None):
+    """
+    Categorize predictions into risk levels (see risk.py)
+    
+    Parameters:
+    -----------
+    scheme : str
+        'percentile' (quartiles of the predictions) or 'fixed' (1/5/10 cases)
+    groups : array-like, optional
+        Group of each prediction (e.g. state) for per-group percentile thresholds
+    """
+    return classify_risk(predictions, scheme=scheme, groups=groups)
 
 def visualize_predictions(df_with_predictions, output_dir):
     """Create visualizations of predictions"""
@@ -116,8 +98,7 @@ def visualize_predictions(df_with_predictions, output_dir):
     # 2. Risk categories bar chart
     plt.figure(figsize=(10, 6))
     risk_counts = df_with_predictions['risk_category'].value_counts()
-    risk_order = ['Low', 'Medium', 'High', 'Very High']
-    risk_counts = risk_counts.reindex(risk_order, fill_value=0)
+    risk_counts = risk_counts.reindex(RISK_LEVELS, fill_value=0)
     
     colors = ['green', 'yellow', 'orange', 'red']
     plt.bar(risk_counts.index, risk_counts.values, color=colors, edgecolor='black')
@@ -201,8 +182,17 @@ def create_prediction_report(df_with_predictions, output_dir):
     print("\n" + '\n'.join(report_lines))
     print(f"\n[OK] Report saved: {report_path}")
 
-def main():
-    """Main prediction function"""
+def main(risk_scheme='percentile', risk_by=None):
+    """
+    Main prediction function
+    
+    Parameters:
+    -----------
+    risk_scheme : str
+        'percentile' or 'fixed' risk thresholds
+    risk_by : str, optional
+        Column whose groups get their own percentile thresholds (e.g. a state column)
+    """
     # Define paths
     base_path = Path(__file__).parent
     model_dir = base_path / "model_output"
@@ -215,23 +205,25 @@ def main():
     print("="*70)
     
     # Load model artifacts
-    model, scaler, feature_names = load_model_artifacts(model_dir)
+    pipeline = load_model_artifacts(model_dir)
     
     # Load data for prediction
     # By default, use the same data used for training
     # You can change this to predict on new data
     data_path = model_data_dir / "cholera_model_data.csv"
     
-    X, df = load_data_for_prediction(data_path, feature_names)
+    df = load_data_for_prediction(data_path, pipeline)
     
     # Make predictions
-    predictions = make_predictions(model, scaler, X)
+    predictions = make_predictions(pipeline, df)
     
     # Add predictions to dataframe
     df['predicted_cases'] = predictions
     
-    # Create risk categories
-    df['risk_category'] = create_risk_categories(predictions)
+    # Create risk categories (once, shared by every output)
+    groups = df[risk_by].values if risk_by else None
+    risk = create_risk_categories(predictions, scheme=risk_scheme, groups=groups)
+    df['risk_category'] = risk
     
     # Save predictions
     output_csv = output_dir / 'cholera_predictions.csv'
@@ -243,7 +235,7 @@ def main():
     if shapefile_path.exists():
         gdf = gpd.read_file(shapefile_path)
         gdf['predicted_cases'] = predictions
-        gdf['risk_category'] = create_risk_categories(predictions)
+        gdf['risk_category'] = np.asarray(risk)
         
         output_shapefile = output_dir / 'cholera_predictions.shp'
         gdf.to_file(output_shapefile)
@@ -268,4 +260,13 @@ def main():
     return df
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Predict cholera cases with the latest trained model')
+    parser.add_argument('--risk-scheme', choices=['percentile', 'fixed'], default='percentile',
+                        help='Risk thresholds: quartiles of the predictions, or 1/5/10 cases (default: percentile)')
+    parser.add_argument('--risk-by', default=None,
+                        help='Column with groups (e.g. state) that get their own percentile thresholds')
+    args = parser.parse_args()
+    
+    main(risk_scheme=args.risk_scheme, risk_by=args.risk_by)
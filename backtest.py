@@ -0,0 +1,235 @@
+"""
+Rolling-Origin Backtesting
+Evaluates a model on the (LGA x week) panel the way it is used: train on
+every week up to an origin, forecast the following weeks recursively,
+move the origin forward and repeat
+"""
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import BaggingRegressor, ExtraTreesRegressor, RandomForestRegressor
+from forecasting import RecursiveForecaster, DEFAULT_HORIZON
+from panel_features import week_ordinal
+from storage import write_table
+
+DEFAULT_STEP = 4
+DEFAULT_MIN_TRAIN_WEEKS = 104
+
+# Consecutive origins refit warm from one cold fit; fixed so that results
+# do not depend on the number of workers
+DEFAULT_ORIGINS_PER_RUN = 6
+
+# Bagged ensembles: warm_start only appends trees fit on the new window and
+# keeps every old one, so they are refit cold at every origin
+COLD_REFIT_MODELS = (RandomForestRegressor, ExtraTreesRegressor, BaggingRegressor)
+
+def temporal_split(week_ids, test_fraction=0.2):
+    """Boolean training mask: rows in the earliest (1 - test_fraction) of weeks"""
+    weeks = np.unique(week_ids)
+    cutoff = weeks[max(int(len(weeks) * (1 - test_fraction)) - 1, 0)]
+    return np.asarray(week_ids) <= cutoff
+
+class PanelTimeSeriesSplit:
+    """
+    TimeSeriesSplit over the weeks of a panel rather than its rows
+
+    Each fold trains on all LGAs up to a week and tests on the following
+    block of weeks, whatever the row order. Usable as `cv` in scikit-learn
+    and model_zoo.train_zoo.
+
+    Parameters:
+    -----------
+    week_ids : array-like
+        Week ordinal of each row of the data that will be split
+    n_splits : int
+        Number of folds
+    """
+
+    def __init__(self, week_ids, n_splits=5):
+        self.week_ids = np.asarray(week_ids)
+        self.n_splits = n_splits
+
+    def get_n_splits(self, X=None, y=None, groups=None):
+        return self.n_splits
+
+    def split(self, X=None, y=None, groups=None):
+        weeks = np.unique(self.week_ids)
+        fold_weeks = len(weeks) // (self.n_splits + 1)
+        for k in range(1, self.n_splits + 1):
+            cutoff = weeks[k * fold_weeks - 1]
+            end = weeks[-1] if k == self.n_splits else weeks[(k + 1) * fold_weeks - 1]
+            train = np.flatnonzero(self.week_ids <= cutoff)
+            test = np.flatnonzero((self.week_ids > cutoff) & (self.week_ids <= end))
+            yield train, test
+
+def rolling_origins(week_ids, step=DEFAULT_STEP, horizon=DEFAULT_HORIZON,
+                    min_train_weeks=DEFAULT_MIN_TRAIN_WEEKS, max_origins=None):
+    """
+    Forecast origins (last training week) for an expanding-window backtest
+
+    Origins start after min_train_weeks weeks, advance by `step` weeks and
+    stop when a full horizon of observed weeks no longer follows; with
+    max_origins only the most recent ones are kept.
+    """
+    weeks = np.unique(week_ids)
+    if len(weeks) == 0:
+        return []
+    first = weeks[min(min_train_weeks, len(weeks)) - 1]
+    origins = np.arange(first, weeks[-1] - horizon + 1, step)
+    if max_origins is not None:
+        origins = origins[-max_origins:]
+    return origins.tolist()
+
+def supports_warm_start(model):
+    """
+    Whether refitting a model from its previous state on a larger window is
+    meaningful: linear models and gradient boosting, not bagged forests
+    """
+    return 'warm_start' in model.get_params() and not isinstance(model, COLD_REFIT_MODELS)
+
+def _warm_start(model, n_added):
+    """
+    Prepare a fitted model to be refit incrementally, or return False
+
+    Gradient boosting keeps its stages and adds n_added new ones fit to the
+    residuals on the larger window; linear models start coordinate descent
+    from the previous coefficients.
+    """
+    if not supports_warm_start(model):
+        return False
+    params = model.get_params()
+    updates = {'warm_start': True}
+    if 'n_estimators' in params:
+        updates['n_estimators'] = params['n_estimators'] + n_added
+    model.set_params(**updates)
+    return True
+
+def _run_origins(model, scaler, frame, feature_cols, origins, horizon, warm_start):
+    """
+    Backtest a run of consecutive origins: a cold fit at the first origin,
+    then warm refits where the model supports them
+    """
+    estimator = clone(model)
+    if 'n_jobs' in estimator.get_params():
+        estimator.set_params(n_jobs=1)  # The pool is the parallelism
+    fitted_scaler = None
+    n_added = max(1, estimator.get_params().get('n_estimators', 10) // 10)
+    results = []
+
+    for i, origin in enumerate(origins):
+        train = frame[frame['week_id'] <= origin]
+        warm = warm_start and i > 0 and _warm_start(estimator, n_added)
+
+        # A warm model keeps the scaling it was first fit with
+        if scaler is not None and not warm:
+            fitted_scaler = clone(scaler).fit(train[feature_cols])
+        X_train = train[feature_cols]
+        if fitted_scaler is not None:
+            X_train = fitted_scaler.transform(X_train)
+        estimator.fit(X_train, train['case_count'])
+
+        forecast = RecursiveForecaster(estimator, fitted_scaler, feature_cols).forecast(train, horizon)
+        forecast['week_id'] = week_ordinal(forecast['week_start'])
+        actual = frame[(frame['week_id'] > origin) & (frame['week_id'] <= origin + horizon)]
+        scored = forecast[['lga_id', 'week_id', 'predicted_cases']].merge(
+            actual[['lga_id', 'week_id', 'case_count']], on=['lga_id', 'week_id'], how='inner'
+        )
+        scored['origin'] = origin
+        results.append(scored)
+
+    return pd.concat(results, ignore_index=True) if results else None
+
+def _metrics(forecasts, by):
+    """Error metrics of forecasts grouped by one column"""
+    error = forecasts['predicted_cases'] - forecasts['case_count']
+    grouped = forecasts.assign(error=error, abs_error=error.abs(), sq_error=error ** 2).groupby(by)
+    metrics = pd.DataFrame({
+        'n': grouped.size(),
+        'mae': grouped['abs_error'].mean(),
+        'rmse': np.sqrt(grouped['sq_error'].mean()),
+        'bias': grouped['error'].mean(),
+        'actual_total': grouped['case_count'].sum(),
+        'predicted_total': grouped['predicted_cases'].sum()
+    })
+    return metrics.reset_index()
+
+def run_backtest(model, df, feature_cols, scaler=None, step=DEFAULT_STEP, horizon=DEFAULT_HORIZON,
+                 min_train_weeks=DEFAULT_MIN_TRAIN_WEEKS, max_origins=None, warm_start=True,
+                 origins_per_run=DEFAULT_ORIGINS_PER_RUN, n_jobs=-1):
+    """
+    Expanding-window rolling-origin backtest
+
+    Parameters:
+    -----------
+    model : estimator
+        Unfitted model (cloned for every run of origins)
+    df : DataFrame
+        Merged panel with lga_id, lga_name, week_id, week_start, case_count
+        and the feature columns
+    scaler : transformer, optional
+        Unfitted scaler fit on each training window
+    step, horizon : int
+        Weeks between origins, and weeks forecast from each origin
+    min_train_weeks : int
+        Weeks in the first training window
+    max_origins : int, optional
+        Only backtest the most recent origins
+    warm_start : bool
+        Refit incrementally across consecutive origins for linear models and
+        gradient boosting (see supports_warm_start). Origins are split into
+        runs of origins_per_run: the first origin of a run is fit cold and
+        the rest warm. Warm refits are faster, but a warm-started boosting
+        model keeps the stages it fit on shorter windows and grows by a
+        tenth of n_estimators per origin, so results differ slightly from
+        cold refits; shorter runs bound the drift at the cost of more cold
+        fits. Bagged forests and models without warm_start are refit cold
+        at every origin, each origin as its own task.
+    origins_per_run : int
+        Consecutive origins per warm-started run; the runs do not depend
+        on n_jobs, so results are the same on any number of cores
+    n_jobs : int
+        Worker processes (-1: all cores)
+
+    Returns:
+    --------
+    dict of DataFrames: forecasts (origin, lga_id, week_id, horizon,
+    case_count, predicted_cases) and metrics by origin, lga_id and horizon
+    """
+    keys = ['lga_id', 'lga_name', 'week_id', 'week_start', 'case_count']
+    columns = keys + [col for col in feature_cols if col not in keys]
+    frame = df[columns].sort_values(['lga_id', 'week_id']).reset_index(drop=True)
+    origins = rolling_origins(frame['week_id'], step, horizon, min_train_weeks, max_origins)
+    if not origins:
+        raise ValueError("Not enough weeks for a backtest with these settings")
+
+    warm = warm_start and supports_warm_start(model)
+    if warm:
+        runs = [origins[i:i + origins_per_run] for i in range(0, len(origins), origins_per_run)]
+    else:
+        runs = [[origin] for origin in origins]
+
+    outputs = Parallel(n_jobs=n_jobs)(
+        delayed(_run_origins)(model, scaler, frame, feature_cols, run, horizon, warm)
+        for run in runs
+    )
+    forecasts = pd.concat([out for out in outputs if out is not None], ignore_index=True)
+    forecasts['horizon'] = forecasts['week_id'] - forecasts['origin']
+    forecasts = forecasts.astype({
+        'origin': np.int32, 'lga_id': np.int32, 'week_id': np.int32, 'horizon': np.int16,
+        'case_count': np.int32, 'predicted_cases': np.float32
+    })[['origin', 'lga_id', 'week_id', 'horizon', 'case_count', 'predicted_cases']]
+
+    return {
+        'forecasts': forecasts,
+        'origins': _metrics(forecasts, 'origin'),
+        'lgas': _metrics(forecasts, 'lga_id'),
+        'horizons': _metrics(forecasts, 'horizon')
+    }
+
+def save_backtest(results, output_dir):
+    """Write backtest tables as Parquet (backtest_<name>.parquet)"""
+    for name, table in results.items():
+        write_table(table, output_dir / f"backtest_{name}.parquet")
+    return output_dir
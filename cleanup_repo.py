@@ -93,10 +93,10 @@ def cleanup_repository():
     
     key_outputs = [
         ("predictions/Cholera_Prediction_Report_Complete.pdf", "Final PDF Report"),
-        ("predictions/cholera_predictions.xlsx", "All Predictions"),
-        ("predictions/future_predictions_12weeks.xlsx", "12-Week Forecast"),
-        ("merged_data/cholera_merged_dataset.csv", "Complete Dataset"),
-        ("model_output/best_model.pkl", "Trained Model")
+        ("predictions/cholera_predictions.parquet", "All Predictions"),
+        ("predictions/future_predictions_12weeks.parquet", "12-Week Forecast"),
+        ("merged_data/cholera_merged_dataset.parquet", "Complete Dataset"),
+        ("model_output/registry/weekly/LATEST", "Trained Model")
     ]
     
     print("\n   KEY DELIVERABLES:")
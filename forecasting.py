@@ -0,0 +1,149 @@
+"""
+Recursive Multi-Step Case Forecasting
+Advances every LGA one week at a time in lockstep: each horizon step is one
+batched predict across all LGAs, and its predictions are fed back into the
+lag, rolling and EWM case features of the following steps
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from panel_features import DensePanel, week_ordinal
+
+DEFAULT_HORIZON = 12
+
+# Non-history features are held at each LGA's mean over its most recent weeks
+RECENT_WEEKS = 20
+
+class RecursiveForecaster:
+    """
+    Batched recursive forecaster for a fitted case model
+
+    History features are recognised from the feature names the merge stage
+    produces ({prefix}_lag_{k}w, {prefix}_rolling_{w}w, {prefix}_ewm_{s}w).
+    For a future week they are computed from the weeks before it, observed
+    or already predicted, held in one (LGA x week) NumPy buffer.
+
+    Parameters:
+    -----------
+    model : estimator or InferencePipeline
+        Fitted model with predict()
+    scaler : transformer, optional
+        Fitted scaler applied before predict() (None for an InferencePipeline,
+        which scales itself)
+    feature_cols : list
+        Model feature columns, in training order
+    prefix : str
+        Prefix of the case history features
+    recent_weeks : int
+        Weeks averaged for features that are not history or calendar features
+    """
+
+    def __init__(self, model, scaler, feature_cols, prefix='cases', recent_weeks=RECENT_WEEKS):
+        self.model = model
+        self.scaler = scaler
+        self.feature_cols = list(feature_cols)
+        self.recent_weeks = recent_weeks
+
+        self.lags, self.rolling, self.ewm = {}, {}, {}
+        patterns = [
+            (self.lags, re.compile(rf'^{prefix}_lag_(\d+)w$')),
+            (self.rolling, re.compile(rf'^{prefix}_rolling_(\d+)w$')),
+            (self.ewm, re.compile(rf'^{prefix}_ewm_(\d+)w$'))
+        ]
+        for j, col in enumerate(self.feature_cols):
+            for found, pattern in patterns:
+                match = pattern.match(col)
+                if match:
+                    found[j] = int(match.group(1))
+        self.calendar = {j: col for j, col in enumerate(self.feature_cols) if col in ('year', 'epi_week')}
+
+        history = set(self.lags) | set(self.rolling) | set(self.ewm) | set(self.calendar)
+        self.static = [j for j in range(len(self.feature_cols)) if j not in history]
+        self.window = max([1, *self.lags.values(), *self.rolling.values()])
+
+    def _predict(self, X):
+        if self.scaler is not None:
+            X = self.scaler.transform(pd.DataFrame(X, columns=self.feature_cols))
+        return np.maximum(self.model.predict(X), 0)  # No negative predictions
+
+    def forecast(self, df, horizon=DEFAULT_HORIZON, value_col='case_count', entity_col='lga_id'):
+        """
+        Forecast the weeks after the last week in df for every LGA
+
+        Parameters:
+        -----------
+        df : DataFrame
+            Long (LGA x week) history with the model's feature columns,
+            entity_col, lga_name, week_start and value_col
+        horizon : int
+            Number of weeks to forecast
+
+        Returns:
+        --------
+        DataFrame (lga_id, lga_name, week_start, week_end, year, epi_week,
+        predicted_cases), ordered by LGA then week
+        """
+        df = df.sort_values([entity_col, 'week_start'])
+        entity_codes, entity_ids = pd.factorize(df[entity_col], sort=True)
+        weeks = df['week_id'].values if 'week_id' in df.columns else week_ordinal(df['week_start'])
+        dense = DensePanel(entity_codes, weeks).to_dense(df[value_col])
+        n_entities, n_weeks = dense.shape
+
+        # Observed tail of the history, then one column per forecast week
+        buffer = np.full((n_entities, self.window + horizon), np.nan)
+        tail = dense[:, max(0, n_weeks - self.window):]
+        buffer[:, self.window - tail.shape[1]:self.window] = tail
+
+        # EWM numerator / denominator over the full observed history
+        ewm_state = {}
+        for s in set(self.ewm.values()):
+            decay = 1.0 - 2.0 / (s + 1.0)
+            weights = decay ** np.arange(n_weeks - 1, -1, -1)
+            valid = ~np.isnan(dense)
+            ewm_state[s] = [np.where(valid, dense, 0.0) @ weights, valid.astype(float) @ weights, decay]
+
+        # Features held fixed: recent means per LGA
+        X = np.zeros((n_entities, len(self.feature_cols)))
+        if self.static:
+            static_cols = [self.feature_cols[j] for j in self.static]
+            recent = df.groupby(entity_col).tail(self.recent_weeks)
+            X[:, self.static] = recent.groupby(entity_col)[static_cols].mean().reindex(entity_ids).fillna(0).values
+
+        last_start = df['week_start'].max()
+        week_starts = pd.DatetimeIndex([last_start + pd.Timedelta(weeks=h + 1) for h in range(horizon)])
+        iso = week_starts.isocalendar()
+
+        predictions = np.empty((n_entities, horizon))
+        for h in range(horizon):
+            c = self.window + h
+            for j, col in self.calendar.items():
+                X[:, j] = iso['year' if col == 'year' else 'week'].iloc[h]
+            for j, k in self.lags.items():
+                X[:, j] = np.nan_to_num(buffer[:, c - k])
+            for j, w in self.rolling.items():
+                window = buffer[:, c - w:c]
+                count = (~np.isnan(window)).sum(axis=1)
+                X[:, j] = np.where(count > 0, np.nansum(window, axis=1) / np.maximum(count, 1), 0)
+            for j, s in self.ewm.items():
+                num, den, _ = ewm_state[s]
+                X[:, j] = np.where(den > 0, num / np.where(den > 0, den, 1), 0)
+
+            pred = self._predict(X)
+            predictions[:, h] = pred
+            buffer[:, c] = pred
+            for state in ewm_state.values():
+                num, den, decay = state
+                state[0] = pred + decay * num
+                state[1] = 1.0 + decay * den
+
+        names = df.drop_duplicates(entity_col).set_index(entity_col)['lga_name'].reindex(entity_ids)
+        return pd.DataFrame({
+            entity_col: np.repeat(entity_ids, horizon),
+            'lga_name': np.repeat(names.values, horizon),
+            'week_start': np.tile(week_starts, n_entities),
+            'week_end': np.tile(week_starts + pd.Timedelta(days=6), n_entities),
+            'year': np.tile(iso['year'].values, n_entities),
+            'epi_week': np.tile(iso['week'].values, n_entities),
+            'predicted_cases': predictions.ravel()
+        })
@@ -0,0 +1,118 @@
+"""
+Fused Inference Pipeline
+Column selection, imputation, scaling and prediction in one step on a
+contiguous float32 array, saved as a single artifact
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler, RobustScaler
+
+def _scaler_affine(scaler):
+    """(offset, scale) of a fitted Standard/RobustScaler, or None for other scalers"""
+    if isinstance(scaler, StandardScaler):
+        offset = scaler.mean_ if scaler.with_mean else None
+        scale = scaler.scale_ if scaler.with_std else None
+    elif isinstance(scaler, RobustScaler):
+        offset = scaler.center_ if scaler.with_centering else None
+        scale = scaler.scale_ if scaler.with_scaling else None
+    else:
+        return None
+    n = scaler.n_features_in_
+    offset = np.zeros(n) if offset is None else np.asarray(offset, dtype=float)
+    scale = np.ones(n) if scale is None else np.asarray(scale, dtype=float)
+    return offset, scale
+
+def _is_linear(model):
+    """Fitted scikit-learn linear regressor with a single output"""
+    return (type(model).__module__.startswith('sklearn.linear_model')
+            and np.ndim(getattr(model, 'coef_', None)) == 1)
+
+class InferencePipeline:
+    """
+    A fitted model with its feature schema, imputation and scaling
+
+    Input is gathered straight into one contiguous float32 array in training
+    column order; missing columns and non-finite values take the fill value
+    of their column. Standard/Robust scaling is applied as precomputed
+    offset and scale arrays, and for linear models it is folded into the
+    coefficients so prediction is a single matrix-vector product.
+
+    Parameters:
+    -----------
+    model : estimator
+        Fitted model, trained on scaled features
+    scaler : transformer, optional
+        Fitted scaler the model was trained behind
+    feature_names : list
+        Model feature columns, in training order
+    fill_values : float or array-like
+        Imputation value per feature (the training fill)
+    """
+
+    def __init__(self, model, scaler, feature_names, fill_values=0.0):
+        self.model = model
+        self.scaler = scaler
+        self.feature_names = list(feature_names)
+        self.fill_values = np.broadcast_to(
+            np.asarray(fill_values, dtype=np.float32), (len(self.feature_names),)
+        ).copy()
+
+        self.affine = _scaler_affine(scaler) if scaler is not None else None
+        if self.affine is not None:
+            self.offset_ = self.affine[0].astype(np.float32)
+            self.scale_ = self.affine[1].astype(np.float32)
+
+        # Linear models: predict = X @ coef + intercept on unscaled features
+        self.coef_ = None
+        if _is_linear(model) and (scaler is None or self.affine is not None):
+            coef = np.asarray(model.coef_, dtype=float)
+            intercept = float(np.ravel(model.intercept_)[0])
+            if self.affine is not None:
+                offset, scale = self.affine
+                coef = coef / scale
+                intercept -= float(coef @ offset)
+            self.coef_, self.intercept_ = coef, intercept
+
+    def missing_features(self, columns):
+        """Feature columns absent from `columns` (they will be filled)"""
+        present = set(columns)
+        return [col for col in self.feature_names if col not in present]
+
+    def to_array(self, X):
+        """Contiguous float32 feature array (imputed, unscaled)"""
+        if isinstance(X, pd.DataFrame):
+            out = np.empty((len(X), len(self.feature_names)), dtype=np.float32)
+            for j, col in enumerate(self.feature_names):
+                if col in X.columns:
+                    out[:, j] = X[col].to_numpy(dtype=np.float32, na_value=np.nan)
+                else:
+                    out[:, j] = self.fill_values[j]
+        else:
+            out = np.array(X, dtype=np.float32, order='C')
+
+        bad = ~np.isfinite(out)
+        if bad.any():
+            np.copyto(out, np.broadcast_to(self.fill_values, out.shape), where=bad)
+        return out
+
+    def transform(self, X):
+        """Imputed and scaled float32 feature array"""
+        out = self.to_array(X)
+        if self.affine is not None:
+            out -= self.offset_
+            out /= self.scale_
+        elif self.scaler is not None:
+            out = np.ascontiguousarray(self.scaler.transform(out), dtype=np.float32)
+        return out
+
+    def predict(self, X, clip_negative=True):
+        """
+        Predict from a DataFrame with the feature columns, or an array in
+        feature order (negative case predictions are clipped to 0)
+        """
+        if self.coef_ is not None:
+            predictions = self.to_array(X) @ self.coef_ + self.intercept_
+        else:
+            predictions = self.model.predict(self.transform(X))
+        return np.maximum(predictions, 0) if clip_negative else predictions
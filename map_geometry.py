@@ -0,0 +1,304 @@
+"""
+Map Geometry Cache
+LGA boundaries prepared once for maps: simplified at a few detail levels
+(shared borders stay shared), serialized to compact GeoJSON with the
+integer lga_id as feature id, and kept with the full-resolution boundaries
+and precomputed centroids, label points and bounds under cache/lga_geometry/
+
+Maps join their values by lga_id at render time, so nothing geometric is
+computed per render.
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.errors import GEOSException
+from panel_index import project_registry, normalize_names
+
+BASE_PATH = Path(__file__).parent
+GEOMETRY_DIR = BASE_PATH / "cache" / "lga_geometry"
+
+MANIFEST_FILE = "manifest.json"
+LGAS_FILE = "lgas.parquet"
+GEOMETRY_FILE = "geometry.parquet"
+
+# Detail level -> simplification tolerance in degrees, about a pixel at
+# the zoom each level is used for (national ~5, state ~7, LGA 9+)
+DETAIL_LEVELS = {
+    'national': 0.01,
+    'state': 0.0025,
+    'lga': 0.0006,
+}
+
+# Map zoom at which each finer level takes over
+LEVEL_ZOOMS = {'state': 6.0, 'lga': 8.0}
+
+# Bump to rebuild existing caches after changing the preparation
+FORMAT_VERSION = 2
+
+def _source_hash(shapefile):
+    """SHA-256 over the shapefile's geometry, attribute and projection files"""
+    digest = hashlib.sha256(f"v{FORMAT_VERSION}".encode())
+    digest.update(json.dumps(DETAIL_LEVELS, sort_keys=True).encode())
+    for suffix in ('.shp', '.dbf', '.prj'):
+        part = Path(shapefile).with_suffix(suffix)
+        if part.exists():
+            with open(part, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+def _simplify(geometries, tolerance):
+    """
+    Simplify polygons as a coverage, so neighbouring LGAs keep identical
+    shared edges (no gaps or overlaps); GEOS < 3.12 or an invalid coverage
+    falls back to simplifying each polygon on its own
+    """
+    if hasattr(shapely, 'coverage_simplify'):
+        try:
+            return shapely.coverage_simplify(geometries, tolerance)
+        except GEOSException:
+            pass
+    return shapely.simplify(geometries, tolerance, preserve_topology=True)
+
+def _feature_collection(lga_ids, geometries, decimals):
+    """GeoJSON text with lga_id feature ids, no properties and rounded coordinates"""
+    rounded = shapely.transform(geometries, lambda coords: np.round(coords, decimals))
+    features = [
+        f'{{"type":"Feature","id":{lga_id},"properties":{{}},"geometry":{geometry}}}'
+        for lga_id, geometry in zip(lga_ids.tolist(), shapely.to_geojson(rounded).tolist())
+    ]
+    return '{"type":"FeatureCollection","features":[' + ",".join(features) + ']}'
+
+def build_geometry(shapefile=None, output_dir=None, registry=None):
+    """
+    Prepare the map geometry cache for a shapefile
+
+    Parameters:
+    -----------
+    shapefile : Path
+        LGA boundaries (default: Data/LGA.shp)
+    output_dir : Path
+        Cache directory (default: cache/lga_geometry)
+    registry : LGARegistry, optional
+        Registry giving the LGA codes (default: the project registry)
+
+    Returns:
+    --------
+    Manifest dict
+    """
+    import geopandas as gpd
+
+    shapefile = Path(shapefile or BASE_PATH / "Data" / "LGA.shp")
+    output_dir = Path(output_dir or GEOMETRY_DIR)
+    registry = registry or project_registry(BASE_PATH)
+
+    gdf = gpd.read_file(shapefile)
+    lga_col = [col for col in gdf.columns if 'lganame' in col.lower()][0]
+    state_cols = [col for col in gdf.columns if 'statename' in col.lower()]
+    states = gdf[state_cols[0]] if state_cols else None
+    if registry.add(gdf[lga_col], states):
+        registry.save()
+
+    gdf = gpd.GeoDataFrame({
+        'lga_id': registry.encode(gdf[lga_col], states),
+        'lga_name': normalize_names(gdf[lga_col]).values,
+        'state_name': normalize_names(states).values if states is not None else ''
+    }, geometry=gdf.geometry.values, crs=gdf.crs)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(epsg=4326)
+    elif gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(epsg=4326)
+
+    # One (multi)polygon per LGA code
+    gdf['geometry'] = shapely.make_valid(gdf.geometry.values)
+    gdf = gdf.dissolve('lga_id', aggfunc='first', sort=True).reset_index()
+    geometries = gdf.geometry.values
+
+    centroids = shapely.centroid(geometries)
+    labels = shapely.point_on_surface(geometries)
+    bounds = shapely.bounds(geometries)
+    lgas = pd.DataFrame({
+        'lga_id': gdf['lga_id'].values.astype(np.int32),
+        'lga_name': gdf['lga_name'].values,
+        'state_name': gdf['state_name'].values,
+        'centroid_lon': shapely.get_x(centroids),
+        'centroid_lat': shapely.get_y(centroids),
+        'label_lon': shapely.get_x(labels),
+        'label_lat': shapely.get_y(labels),
+        'min_lon': bounds[:, 0],
+        'min_lat': bounds[:, 1],
+        'max_lon': bounds[:, 2],
+        'max_lat': bounds[:, 3],
+    })
+
+    output_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".lga_geometry_", dir=output_dir.parent))
+    try:
+        lgas.to_parquet(tmp_dir / LGAS_FILE, index=False)
+        gdf[['lga_id', 'geometry']].to_parquet(tmp_dir / GEOMETRY_FILE, index=False)
+        levels = {}
+        for level, tolerance in DETAIL_LEVELS.items():
+            # Round to about a tenth of the tolerance
+            decimals = math.ceil(-math.log10(tolerance)) + 1
+            text = _feature_collection(lgas['lga_id'].values, _simplify(geometries, tolerance), decimals)
+            (tmp_dir / f"{level}.geojson").write_text(text)
+            levels[level] = {'tolerance': tolerance, 'decimals': decimals, 'bytes': len(text)}
+
+        source_hash = _source_hash(shapefile)
+        manifest = {
+            'version': source_hash[:12],
+            'source_hash': source_hash,
+            'source': str(shapefile),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'n_lgas': len(lgas),
+            'levels': levels
+        }
+        (tmp_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+
+        if output_dir.exists():
+            shutil.rmtree(output_dir)
+        os.replace(tmp_dir, output_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return manifest
+
+def level_for_zoom(zoom):
+    """Detail level to draw at a map zoom"""
+    level = 'national'
+    for name, min_zoom in LEVEL_ZOOMS.items():
+        if zoom >= min_zoom:
+            level = name
+    return level
+
+class LGAGeometry:
+    """
+    Prepared LGA map geometry
+
+    Parameters:
+    -----------
+    geometry_dir : Path
+        Cache directory written by build_geometry
+    """
+
+    def __init__(self, geometry_dir):
+        self.geometry_dir = Path(geometry_dir)
+        self.manifest = json.loads((self.geometry_dir / MANIFEST_FILE).read_text())
+        self.lgas = pd.read_parquet(self.geometry_dir / LGAS_FILE)
+        self._geojson = {}
+
+    @property
+    def version(self):
+        return self.manifest['version']
+
+    def geodataframe(self):
+        """
+        Full-resolution boundaries (WGS84, one row per LGA) with the
+        columns of self.lgas, for static maps
+        """
+        import geopandas as gpd
+
+        geometry = gpd.read_parquet(self.geometry_dir / GEOMETRY_FILE)
+        return geometry.merge(self.lgas, on='lga_id', how='left')
+
+    def _level(self, level):
+        """Parsed GeoJSON of one detail level (read once)"""
+        if level not in self._geojson:
+            self._geojson[level] = json.loads((self.geometry_dir / f"{level}.geojson").read_text())
+        return self._geojson[level]
+
+    def geojson(self, level='national', bounds=None):
+        """
+        GeoJSON FeatureCollection (feature id = lga_id, features in the
+        order of self.lgas)
+
+        With bounds (min_lon, min_lat, max_lon, max_lat), only LGAs within
+        half a span of them get the level's detail and the rest are drawn at
+        national detail, like map tiles: zooming into a few LGAs does not
+        ship the whole country at fine detail.
+        """
+        if bounds is None or level == 'national':
+            return self._level(level)
+
+        min_lon, min_lat, max_lon, max_lat = bounds
+        pad_lon, pad_lat = (max_lon - min_lon) / 2, (max_lat - min_lat) / 2
+        lgas = self.lgas
+        near = ((lgas['max_lon'] >= min_lon - pad_lon) & (lgas['min_lon'] <= max_lon + pad_lon)
+                & (lgas['max_lat'] >= min_lat - pad_lat) & (lgas['min_lat'] <= max_lat + pad_lat)).values
+        detailed = self._level(level)['features']
+        coarse = self._level('national')['features']
+        return {
+            'type': 'FeatureCollection',
+            'features': [fine if is_near else rough for fine, rough, is_near in zip(detailed, coarse, near)]
+        }
+
+    def bounds(self, lga_ids=None):
+        """(min_lon, min_lat, max_lon, max_lat) of some LGAs (default: all)"""
+        lgas = self.lgas if lga_ids is None else self.lgas[self.lgas['lga_id'].isin(lga_ids)]
+        if len(lgas) == 0:
+            lgas = self.lgas
+        return (float(lgas['min_lon'].min()), float(lgas['min_lat'].min()),
+                float(lgas['max_lon'].max()), float(lgas['max_lat'].max()))
+
+    def view(self, lga_ids=None, width=1000, height=650):
+        """
+        Map center and zoom that fit some LGAs (default: all) in a
+        width x height pixel map
+
+        Returns:
+        --------
+        ((center_lat, center_lon), zoom)
+        """
+        min_lon, min_lat, max_lon, max_lat = self.bounds(lga_ids)
+
+        # Web Mercator: 512 px tiles; latitude span measured in projected units
+        def merc(lat):
+            return math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+
+        lon_span = max(max_lon - min_lon, 1e-6) / 360
+        lat_span = max(merc(max_lat) - merc(min_lat), 1e-6) / (2 * math.pi)
+        zoom = min(math.log2(width / 512 / lon_span), math.log2(height / 512 / lat_span)) - 0.2
+        center = ((min_lat + max_lat) / 2, (min_lon + max_lon) / 2)
+        return center, float(np.clip(zoom, 3, 12))
+
+def load_geometry(shapefile=None, geometry_dir=None, registry=None):
+    """
+    The prepared geometry for a shapefile, built first if the cache is
+    missing or was made from a different shapefile
+
+    Returns:
+    --------
+    LGAGeometry
+    """
+    shapefile = Path(shapefile or BASE_PATH / "Data" / "LGA.shp")
+    geometry_dir = Path(geometry_dir or GEOMETRY_DIR)
+    manifest_file = geometry_dir / MANIFEST_FILE
+    if (not manifest_file.exists()
+            or json.loads(manifest_file.read_text()).get('source_hash') != _source_hash(shapefile)):
+        build_geometry(shapefile, geometry_dir, registry)
+    return LGAGeometry(geometry_dir)
+
+def main(shapefile=None):
+    """Prepare the map geometry cache"""
+    print("Preparing LGA map geometry...", flush=True)
+    manifest = build_geometry(shapefile)
+    print(f"  [OK] {manifest['n_lgas']} LGAs (version {manifest['version']})", flush=True)
+    for level, info in manifest['levels'].items():
+        print(f"  [OK] {level}: tolerance {info['tolerance']}, {info['bytes'] / 1e6:.2f} MB", flush=True)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Prepare simplified LGA geometry for the web map')
+    parser.add_argument('--shapefile', default=None, help='LGA shapefile (default: Data/LGA.shp)')
+    args = parser.parse_args()
+
+    main(shapefile=args.shapefile)
@@ -0,0 +1,56 @@
+"""
+Map Rendering Helpers
+Hover text and value labels for LGA maps built from whole columns at once:
+Plotly hover text is a customdata array plus one hovertemplate (formatted
+in the browser), and matplotlib labels sit at the label points precomputed
+with the map geometry (map_geometry.py)
+"""
+
+import numpy as np
+
+# Choropleth hover fields: (column, label, Plotly number format)
+HOVER_FIELDS = [
+    ('predicted_cases', 'Predicted Cases', ':.1f'),
+    ('case_count', 'Actual Cases', ':.0f'),
+]
+
+def hover_template(fields=HOVER_FIELDS):
+    """
+    Plotly hovertemplate for hover_data: the name in bold, then one
+    'label: value' line per field
+    """
+    lines = ["<b>%{customdata[0]}</b>"]
+    lines += [f"{label}: %{{customdata[{i}]{fmt}}}" for i, (_, label, fmt) in enumerate(fields, start=1)]
+    return "<br>".join(lines) + "<extra></extra>"
+
+def hover_data(df, fields=HOVER_FIELDS, name_col='lga_name'):
+    """customdata array for hover_template (name column, then the field columns)"""
+    columns = [df[name_col].to_numpy(dtype=object)]
+    columns += [df[col].to_numpy(dtype=float) for col, _, _ in fields]
+    return np.column_stack(columns)
+
+def value_labels(df, value_col, min_value=0, x_col='label_lon', y_col='label_lat'):
+    """
+    Positions and text of integer value labels for LGAs above min_value
+
+    Parameters:
+    -----------
+    df : DataFrame
+        One row per LGA with the value and label point columns
+        (LGAGeometry.lgas or LGAGeometry.geodataframe() merged with values)
+    value_col : str
+        Column to label
+
+    Returns:
+    --------
+    (x, y, text) arrays
+    """
+    values = df[value_col].to_numpy(dtype=float)
+    keep = values > min_value
+    text = values[keep].astype(np.int64).astype(str)
+    return df[x_col].to_numpy()[keep], df[y_col].to_numpy()[keep], text
+
+def draw_labels(ax, x, y, text, **kwargs):
+    """Place labels from value_labels on a matplotlib axis (kwargs go to ax.text)"""
+    for xi, yi, label in zip(x.tolist(), y.tolist(), text.tolist()):
+        ax.text(xi, yi, label, **kwargs)
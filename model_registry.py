@@ -0,0 +1,244 @@
+"""
+Model Artifact Registry
+Versioned, content-hashed model bundles (one fused inference pipeline plus
+a manifest with the feature schema and training data fingerprint) under
+model_output/registry, opened once per process and shared between
+callers
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+import joblib
+import pandas as pd
+from inference import InferencePipeline
+
+REGISTRY_DIR = Path(__file__).parent / "model_output" / "registry"
+
+# Registry tasks: one model lineage per kind of training data
+TASK_WEEKLY = "weekly"   # (LGA x week) case model from 03_train_predict_visualize.py
+TASK_LGA = "lga"         # LGA-level model on model_data from 04_train_model.py
+
+LATEST_FILE = "LATEST"
+MANIFEST_FILE = "manifest.json"
+PIPELINE_FILE = "pipeline.joblib"
+
+# Last bundle opened in this process for each task directory (opening
+# another version replaces it, so old versions are not kept alive)
+_loaded = {}
+
+# A feature only the (LGA x week) model from 03 has, telling which script
+# wrote a pre-registry best_model.pkl (03 and 04 both wrote that file)
+LEGACY_WEEKLY_FEATURE = 'cases_lag_1w'
+
+class ModelBundle:
+    """
+    A registered model version
+
+    Parameters:
+    -----------
+    pipeline : InferencePipeline
+        Model with its feature schema, imputation and scaling
+    manifest : dict
+        Version, content hash, data fingerprint, metrics and other metadata
+    path : Path, optional
+        Bundle directory (None for legacy flat-file artifacts)
+    """
+
+    def __init__(self, pipeline, manifest, path=None):
+        self.pipeline = pipeline
+        self.manifest = manifest
+        self.path = path
+
+    @property
+    def version(self):
+        return self.manifest.get('version')
+
+    @property
+    def model(self):
+        return self.pipeline.model
+
+    @property
+    def scaler(self):
+        return self.pipeline.scaler
+
+    @property
+    def feature_names(self):
+        return self.pipeline.feature_names
+
+    def predict(self, X):
+        """Predict from a DataFrame with the feature columns (or an array in that order)"""
+        return self.pipeline.predict(X)
+
+def _task_dir(task, registry_dir=None):
+    return Path(registry_dir or REGISTRY_DIR) / task
+
+def _content_hash(bundle_dir, feature_names):
+    """SHA-256 over the pipeline artifact and the feature schema"""
+    digest = hashlib.sha256(json.dumps(list(feature_names)).encode())
+    with open(bundle_dir / PIPELINE_FILE, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _set_latest(task_dir, version):
+    """Point LATEST at a version (atomic replace)"""
+    tmp = task_dir / f"{LATEST_FILE}.tmp"
+    tmp.write_text(version)
+    os.replace(tmp, task_dir / LATEST_FILE)
+
+def list_versions(task=TASK_WEEKLY, registry_dir=None):
+    """Manifests of a task's bundles, oldest first"""
+    task_dir = _task_dir(task, registry_dir)
+    manifests = []
+    if task_dir.exists():
+        for manifest_file in task_dir.glob(f"*/{MANIFEST_FILE}"):
+            manifests.append(json.loads(manifest_file.read_text()))
+    df = pd.DataFrame(manifests)
+    return df.sort_values('created').reset_index(drop=True) if not df.empty else df
+
+def save_bundle(pipeline, task=TASK_WEEKLY, registry_dir=None,
+                data_fingerprint=None, model_name=None, metrics=None, **metadata):
+    """
+    Register a trained model as a new version and make it the latest
+
+    The pipeline is written uncompressed into a temporary directory that
+    is renamed into place, so a crash never leaves a partial bundle. If the
+    content is identical to an existing version, that version becomes the
+    latest instead of adding a copy.
+
+    Parameters:
+    -----------
+    pipeline : InferencePipeline
+        Fitted model with its feature schema, imputation and scaling
+    task : str
+        Model lineage (TASK_WEEKLY or TASK_LGA)
+    data_fingerprint : str, optional
+        Fingerprint of the training data (storage.frame_fingerprint)
+    model_name, metrics, **metadata
+        Stored in the manifest
+
+    Returns:
+    --------
+    ModelBundle of the registered version
+    """
+    task_dir = _task_dir(task, registry_dir)
+    task_dir.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".bundle_", dir=task_dir))
+    try:
+        joblib.dump(pipeline, tmp_dir / PIPELINE_FILE)
+        content_hash = _content_hash(tmp_dir, pipeline.feature_names)
+
+        for manifest_file in task_dir.glob(f"*/{MANIFEST_FILE}"):
+            existing = json.loads(manifest_file.read_text())
+            if existing.get('content_hash') == content_hash:
+                _set_latest(task_dir, existing['version'])
+                return ModelBundle(pipeline, existing, manifest_file.parent)
+
+        created = datetime.now()
+        version = f"{created.strftime('%Y%m%d-%H%M%S')}-{content_hash[:8]}"
+        manifest = {
+            'version': version,
+            'task': task,
+            'created': created.isoformat(timespec='seconds'),
+            'content_hash': content_hash,
+            'model_name': model_name or type(pipeline.model).__name__,
+            'model_type': type(pipeline.model).__name__,
+            'feature_names': list(pipeline.feature_names),
+            'data_fingerprint': data_fingerprint,
+            'metrics': metrics or {},
+            **metadata
+        }
+        (tmp_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2, default=str))
+        bundle_dir = task_dir / version
+        os.replace(tmp_dir, bundle_dir)
+        _set_latest(task_dir, version)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return ModelBundle(pipeline, manifest, bundle_dir)
+
+def load_bundle(bundle_dir, mmap=True):
+    """
+    Open one bundle directory
+
+    With mmap, plain numpy array attributes (scaler statistics, linear
+    model coefficients) are memory-mapped read-only; scikit-learn trees
+    copy their node and value arrays when unpickled, so forests are still
+    read in full. Repeat opens are cheap because the last bundle opened
+    for each task is kept in memory; bundles never change once written.
+    """
+    bundle_dir = Path(bundle_dir)
+    cached = _loaded.get(bundle_dir.parent)
+    if cached is not None and cached.path == bundle_dir:
+        return cached
+    manifest = json.loads((bundle_dir / MANIFEST_FILE).read_text())
+    pipeline = joblib.load(bundle_dir / PIPELINE_FILE, mmap_mode='r' if mmap else None)
+    bundle = ModelBundle(pipeline, manifest, bundle_dir)
+    _loaded[bundle_dir.parent] = bundle
+    return bundle
+
+def _legacy_feature_names(model_dir):
+    """
+    Feature names saved with a flat best_model.pkl: feature_names.pkl (04)
+    or feature_names.txt (03), the newer one if both are left over
+    """
+    files = [f for f in (model_dir / 'feature_names.pkl', model_dir / 'feature_names.txt') if f.exists()]
+    if not files:
+        raise FileNotFoundError(f"No feature names next to {model_dir / 'best_model.pkl'}")
+    newest = max(files, key=lambda f: f.stat().st_mtime)
+    if newest.suffix == '.pkl':
+        return list(joblib.load(newest))
+    return newest.read_text().splitlines()
+
+def _legacy_task(feature_names):
+    """Task of a flat best_model.pkl, from its feature names"""
+    if LEGACY_WEEKLY_FEATURE in feature_names:
+        return TASK_WEEKLY
+    return TASK_LGA
+
+def _load_legacy(model_dir):
+    """Flat best_model.pkl / scaler.pkl / feature_names.(pkl|txt) from older runs"""
+    model_dir = Path(model_dir)
+    feature_names = _legacy_feature_names(model_dir)
+    model = joblib.load(model_dir / 'best_model.pkl')
+    manifest = {'version': 'legacy', 'task': _legacy_task(feature_names), 'model_name': type(model).__name__,
+                'model_type': type(model).__name__, 'feature_names': feature_names}
+    pipeline = InferencePipeline(model, joblib.load(model_dir / 'scaler.pkl'), feature_names)
+    return ModelBundle(pipeline, manifest)
+
+def load_latest(task=TASK_WEEKLY, registry_dir=None, mmap=True):
+    """
+    The latest registered model of a task
+
+    LATEST is re-read on every call, so a long-running process picks up a
+    newly trained model on its next call. Model directories from before the
+    registry (flat best_model.pkl files) are still loaded when the flat
+    model was trained for this task.
+
+    Returns:
+    --------
+    ModelBundle
+
+    Raises:
+    -------
+    FileNotFoundError if no model has been trained
+    """
+    task_dir = _task_dir(task, registry_dir)
+    latest = task_dir / LATEST_FILE
+    if latest.exists():
+        return load_bundle(task_dir / latest.read_text().strip(), mmap=mmap)
+
+    legacy_dir = Path(registry_dir or REGISTRY_DIR).parent
+    if (legacy_dir / 'best_model.pkl').exists():
+        try:
+            legacy_task = _legacy_task(_legacy_feature_names(legacy_dir))
+        except FileNotFoundError:
+            legacy_task = None
+        if legacy_task == task:
+            return _load_legacy(legacy_dir)
+    raise FileNotFoundError(f"No trained '{task}' model in {task_dir}")
@@ -0,0 +1,154 @@
+"""
+Parallel Model Zoo Training
+Schedules every (model, fold) fit of a set of candidate models across one
+joblib process pool. The training data is memory-mapped once and shared by
+all workers, and successive halving can drop clearly losing candidates
+after the first cross-validation folds
+"""
+
+import math
+import shutil
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import joblib
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import check_cv
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
+DEFAULT_N_JOBS = -1
+
+def _single_threaded(model):
+    """Clone of a model with its own parallelism off (the pool is the parallelism)"""
+    model = clone(model)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+    return model
+
+def _fit_holdout(name, model, data):
+    """Fit on the training set and score on train and test"""
+    X_train, y_train, X_test, y_test = data
+    start = time.time()
+    model = _single_threaded(model)
+    model.fit(X_train, y_train)
+
+    result = {'name': name, 'model': model, 'Train_R2': r2_score(y_train, model.predict(X_train))}
+    if X_test is not None:
+        y_pred = model.predict(X_test)
+        result.update({
+            'Test_R2': r2_score(y_test, y_pred),
+            'Test_RMSE': np.sqrt(mean_squared_error(y_test, y_pred)),
+            'Test_MAE': mean_absolute_error(y_test, y_pred)
+        })
+    result['seconds'] = time.time() - start
+    return result
+
+def _fit_fold(name, fold, model, data, train_idx, test_idx):
+    """Fit one cross-validation fold and return its R²"""
+    X_train, y_train = data[0], data[1]
+    model = _single_threaded(model)
+    model.fit(X_train[train_idx], y_train[train_idx])
+    return {'name': name, 'fold': fold, 'r2': r2_score(y_train[test_idx], model.predict(X_train[test_idx]))}
+
+def _shared_data(X_train, y_train, X_test, y_test, tmp_dir):
+    """Dump the arrays once and reopen them memory-mapped for the workers"""
+    path = Path(tmp_dir) / "zoo_data.joblib"
+    arrays = [None if a is None else np.ascontiguousarray(np.asarray(a, dtype=float))
+              for a in (X_train, y_train, X_test, y_test)]
+    joblib.dump(arrays, path)
+    return joblib.load(path, mmap_mode='r')
+
+def train_zoo(models, X_train, y_train, X_test=None, y_test=None, cv=5,
+              n_jobs=DEFAULT_N_JOBS, halving=False, halving_folds=2, eta=2, verbose=True):
+    """
+    Fit and score candidate models in parallel
+
+    Every model's holdout fit and cross-validation folds are independent
+    tasks in one process pool, so wall time is roughly the slowest single
+    fit rather than the sum of all fits.
+
+    Parameters:
+    -----------
+    models : dict
+        Name -> unfitted estimator
+    X_train, y_train : array-like
+        Training data (also split for cross-validation)
+    X_test, y_test : array-like, optional
+        Holdout data for Test_R2 / Test_RMSE / Test_MAE
+    cv : int, splitter or None
+        Cross-validation folds on the training data (None: no CV)
+    n_jobs : int
+        Worker processes (-1: all cores)
+    halving : bool
+        Successive halving: run the first `halving_folds` folds for every
+        model, then the remaining folds only for the best 1/eta of them
+        (by mean CV R² so far; the best holdout model always survives)
+
+    Returns:
+    --------
+    (results DataFrame with one row per model, dict of models fitted on the
+    full training set)
+    """
+    names = list(models)
+    tmp_dir = tempfile.mkdtemp(prefix="model_zoo_")
+    try:
+        data = _shared_data(X_train, y_train, X_test, y_test, tmp_dir)
+        folds = list(check_cv(cv).split(data[0], data[1])) if cv is not None else []
+
+        def run(tasks):
+            return Parallel(n_jobs=n_jobs)(tasks)
+
+        # Rung 1: every holdout fit plus the first folds of every model
+        first = folds[:halving_folds] if halving else folds
+        tasks = [delayed(_fit_holdout)(name, models[name], data) for name in names]
+        tasks += [delayed(_fit_fold)(name, i, models[name], data, train_idx, test_idx)
+                  for name in names for i, (train_idx, test_idx) in enumerate(first)]
+        outputs = run(tasks)
+
+        holdout = {out['name']: out for out in outputs if 'model' in out}
+        fold_scores = {name: [] for name in names}
+        for out in outputs:
+            if 'fold' in out:
+                fold_scores[out['name']].append(out['r2'])
+
+        # Rung 2: remaining folds for the surviving candidates
+        rest = folds[len(first):]
+        if rest:
+            ranked = sorted(names, key=lambda name: np.mean(fold_scores[name]), reverse=True)
+            survivors = set(ranked[:max(1, math.ceil(len(names) / eta))])
+            if X_test is not None:
+                survivors.add(max(names, key=lambda name: holdout[name]['Test_R2']))
+            if verbose:
+                dropped = [name for name in names if name not in survivors]
+                print(f"  Successive halving: dropped {dropped} after {len(first)} folds", flush=True)
+
+            outputs = run([
+                delayed(_fit_fold)(name, len(first) + i, models[name], data, train_idx, test_idx)
+                for name in names if name in survivors
+                for i, (train_idx, test_idx) in enumerate(rest)
+            ])
+            for out in outputs:
+                fold_scores[out['name']].append(out['r2'])
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    rows = []
+    for name in names:
+        row = {'Model': name, **{k: v for k, v in holdout[name].items() if k not in ('name', 'model')}}
+        if folds:
+            row['CV_R2_Mean'] = float(np.mean(fold_scores[name]))
+            row['CV_R2_Std'] = float(np.std(fold_scores[name]))
+            row['CV_Folds'] = len(fold_scores[name])
+        rows.append(row)
+
+    results_df = pd.DataFrame(rows)
+    fitted = {}
+    for name in names:
+        model = holdout[name]['model']
+        if 'n_jobs' in model.get_params():
+            model.set_params(n_jobs=models[name].get_params()['n_jobs'])
+        fitted[name] = model
+    return results_df, fitted
@@ -0,0 +1,226 @@
+"""
+Dense Panel Lag / Rolling Feature Engine
+Builds lag, rolling and exponentially weighted features on a dense
+(LGA x week) array, so every feature is a handful of vectorized passes
+instead of a Python function per LGA
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+# Default case-history features (matches the original merged dataset)
+DEFAULT_LAGS = (1, 2, 4)
+DEFAULT_ROLLING_MEANS = (4, 8)
+
+def week_ordinal(dates):
+    """
+    Contiguous integer week index for dates
+
+    Weeks run Monday-Sunday; consecutive weeks differ by exactly 1, so
+    gaps in the data show up as gaps in the ordinal.
+    """
+    days = pd.to_datetime(dates).values.astype('datetime64[D]').astype(np.int64)
+    return (days - 4) // 7  # 1970-01-05 was a Monday
+
+class DensePanel:
+    """
+    Values of one column laid out as a dense (entity x week) array
+
+    Rows missing from the long table are NaN, so lags and windows are
+    measured in calendar weeks rather than rows.
+
+    Parameters:
+    -----------
+    entity_codes : ndarray of int
+        Row entity codes (0..n_entities-1)
+    week_codes : ndarray of int
+        Row week ordinals
+    """
+
+    def __init__(self, entity_codes, week_codes):
+        self.entity_codes = np.asarray(entity_codes, dtype=np.int64)
+        week_codes = np.asarray(week_codes, dtype=np.int64)
+        self.week_start = week_codes.min() if len(week_codes) else 0
+        self.week_codes = week_codes - self.week_start
+        self.shape = (
+            int(self.entity_codes.max()) + 1 if len(self.entity_codes) else 0,
+            int(self.week_codes.max()) + 1 if len(self.week_codes) else 0
+        )
+
+    @classmethod
+    def from_frame(cls, df, entity_col='lga_name', date_col='week_start', week_col=None):
+        """
+        Panel layout for a long table keyed by entity and week start date
+
+        Integer entity columns (e.g. registry lga_id) are used as codes
+        directly; week_col names a precomputed week ordinal column.
+        """
+        entity = df[entity_col]
+        if pd.api.types.is_integer_dtype(entity) and (len(entity) == 0 or entity.min() >= 0):
+            entity_codes = entity.values
+        else:
+            entity_codes, _ = pd.factorize(entity)
+        weeks = df[week_col].values if week_col else week_ordinal(df[date_col])
+        return cls(entity_codes, weeks)
+
+    def to_dense(self, values):
+        """Scatter row values into the dense array (NaN where no row)"""
+        dense = np.full(self.shape, np.nan)
+        dense[self.entity_codes, self.week_codes] = np.asarray(values, dtype=float)
+        return dense
+
+    def to_rows(self, dense):
+        """Gather a dense array back to the long table's row order"""
+        return dense[self.entity_codes, self.week_codes]
+
+def lag(dense, k):
+    """Value k weeks earlier (NaN before the first week)"""
+    out = np.full(dense.shape, np.nan)
+    if k < dense.shape[1]:
+        out[:, k:] = dense[:, :dense.shape[1] - k]
+    return out
+
+def _window_sum(x, window):
+    """Trailing window sums along weeks via one cumulative sum"""
+    csum = np.cumsum(x, axis=1)
+    out = csum.copy()
+    out[:, window:] -= csum[:, :-window]
+    return out
+
+def rolling_sum(dense, window, min_periods=1):
+    """Trailing `window`-week sum of observed values"""
+    valid = ~np.isnan(dense)
+    total = _window_sum(np.where(valid, dense, 0.0), window)
+    count = _window_sum(valid.astype(np.int64), window)
+    return np.where(count >= min_periods, total, np.nan)
+
+def rolling_mean(dense, window, min_periods=1):
+    """Trailing `window`-week mean of observed values"""
+    valid = ~np.isnan(dense)
+    total = _window_sum(np.where(valid, dense, 0.0), window)
+    count = _window_sum(valid.astype(np.int64), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count >= min_periods, total / count, np.nan)
+
+def rolling_max(dense, window, min_periods=1):
+    """
+    Trailing `window`-week max of observed values
+
+    Van Herk / Gil-Werman: running maxima within fixed blocks of `window`
+    weeks, forward and backward, combine into any window's max in O(N)
+    regardless of window size.
+    """
+    n_entities, n_weeks = dense.shape
+    valid = ~np.isnan(dense)
+    x = np.where(valid, dense, -np.inf)
+
+    # Pad on the left so window i covers padded columns i..i+window-1
+    pad = window - 1
+    n_padded = n_weeks + pad
+    n_blocks = -(-n_padded // window)
+    padded = np.full((n_entities, n_blocks * window), -np.inf)
+    padded[:, pad:pad + n_weeks] = x
+
+    blocks = padded.reshape(n_entities, n_blocks, window)
+    prefix = np.maximum.accumulate(blocks, axis=2).reshape(n_entities, -1)
+    suffix = np.maximum.accumulate(blocks[:, :, ::-1], axis=2)[:, :, ::-1].reshape(n_entities, -1)
+
+    starts = np.arange(n_weeks)
+    out = np.maximum(suffix[:, starts], prefix[:, starts + window - 1])
+
+    count = _window_sum(valid.astype(np.int64), window)
+    return np.where(count >= min_periods, out, np.nan)
+
+def ewm_mean(dense, span=None, alpha=None):
+    """
+    Exponentially weighted mean along weeks (pandas ewm(adjust=True))
+
+    Weighted sums of values and of observation indicators are each one
+    linear recursion, run for all entities at once with lfilter; missing
+    weeks decay the weights without contributing.
+    """
+    if alpha is None:
+        alpha = 2.0 / (span + 1.0)
+    valid = ~np.isnan(dense)
+    b, a = [1.0], [1.0, -(1.0 - alpha)]
+    num = lfilter(b, a, np.where(valid, dense, 0.0), axis=1)
+    den = lfilter(b, a, valid.astype(float), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(den > 0, num / den, np.nan)
+
+def history_weeks(lags=DEFAULT_LAGS, rolling_windows=DEFAULT_ROLLING_MEANS, ewm_spans=(), tol=1e-6):
+    """
+    Weeks of earlier data a week's features depend on
+
+    Lags and rolling windows are exact; EWM weights never reach zero, so
+    they are cut where the remaining weight falls below `tol`.
+    """
+    weeks = max([0, *lags, *[w - 1 for w in rolling_windows]])
+    for span in ewm_spans:
+        alpha = 2.0 / (span + 1.0)
+        weeks = max(weeks, int(np.ceil(np.log(tol) / np.log(1.0 - alpha))))
+    return weeks
+
+def history_feature_names(prefix='cases', lags=DEFAULT_LAGS, rolling_means=DEFAULT_ROLLING_MEANS,
+                          rolling_sums=(), rolling_maxes=(), ewm_spans=()):
+    """Names of the columns add_history_features adds, in the order it adds them"""
+    return (
+        [f'{prefix}_lag_{k}w' for k in lags]
+        + [f'{prefix}_rolling_{w}w' for w in rolling_means]
+        + [f'{prefix}_rolling_sum_{w}w' for w in rolling_sums]
+        + [f'{prefix}_rolling_max_{w}w' for w in rolling_maxes]
+        + [f'{prefix}_ewm_{s}w' for s in ewm_spans]
+    )
+
+def add_history_features(df, value_col='case_count', prefix='cases',
+                         entity_col='lga_name', date_col='week_start', week_col=None,
+                         lags=DEFAULT_LAGS, rolling_means=DEFAULT_ROLLING_MEANS,
+                         rolling_sums=(), rolling_maxes=(), ewm_spans=(),
+                         fill_value=0):
+    """
+    Add lag / rolling / EWM features of one column to a long weekly table
+
+    Parameters:
+    -----------
+    df : DataFrame
+        One row per (entity, week), in any order
+    value_col : str
+        Column to build history features from
+    prefix : str
+        Feature name prefix, e.g. cases -> cases_lag_1w, cases_rolling_4w
+    entity_col, date_col : str
+        Entity and week start date columns
+    week_col : str, optional
+        Precomputed week ordinal column (used instead of date_col)
+    lags : sequence of int
+        Lags in weeks ({prefix}_lag_{k}w)
+    rolling_means, rolling_sums, rolling_maxes : sequence of int
+        Trailing windows in weeks including the current week
+        ({prefix}_rolling_{w}w, {prefix}_rolling_sum_{w}w, {prefix}_rolling_max_{w}w)
+    ewm_spans : sequence of int
+        Spans of exponentially weighted means ({prefix}_ewm_{s}w)
+    fill_value : float
+        Value for features with no history (e.g. lags before the first week)
+
+    Returns:
+    --------
+    DataFrame with the feature columns added
+    """
+    panel = DensePanel.from_frame(df, entity_col, date_col, week_col)
+    dense = panel.to_dense(df[value_col])
+
+    features = (
+        [lag(dense, k) for k in lags]
+        + [rolling_mean(dense, w) for w in rolling_means]
+        + [rolling_sum(dense, w) for w in rolling_sums]
+        + [rolling_max(dense, w) for w in rolling_maxes]
+        + [ewm_mean(dense, span=s) for s in ewm_spans]
+    )
+    names = history_feature_names(prefix, lags, rolling_means, rolling_sums, rolling_maxes, ewm_spans)
+
+    df = df.copy()
+    for name, values in zip(names, features):
+        rows = panel.to_rows(values)
+        df[name] = np.where(np.isnan(rows), fill_value, rows)
+    return df
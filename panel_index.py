@@ -0,0 +1,200 @@
+"""
+Canonical LGA / Week Panel Index
+One registry gives every LGA in LGA.shp a stable integer code, and weeks
+are a contiguous integer ordinal, so joins, lags and groupbys run on
+integer arrays instead of hashing name strings and (year, epi_week) pairs
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from panel_features import week_ordinal
+
+UNKNOWN_LGA = -1
+
+def normalize_names(values):
+    """Strip and title-case names (the canonical LGA / state spelling)"""
+    return pd.Series(values, dtype=object).str.strip().str.title()
+
+def _factorize_names(values):
+    """Codes and normalized uniques, normalizing each distinct name once"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    return codes, normalize_names(uniques).fillna('').values
+
+class LGARegistry:
+    """
+    Stable integer codes for LGAs
+
+    Codes are row positions in the registry table (lga_id, lga_name,
+    state_name). New LGAs are appended, so existing codes never change;
+    persist the registry with save() to keep codes stable across runs.
+
+    Parameters:
+    -----------
+    frame : DataFrame, optional
+        Registry table with lga_id = 0..n-1
+    """
+
+    def __init__(self, frame=None):
+        if frame is None:
+            frame = pd.DataFrame({'lga_id': [], 'lga_name': [], 'state_name': []})
+        frame = frame.sort_values('lga_id').reset_index(drop=True)
+        frame['lga_id'] = np.arange(len(frame), dtype=np.int32)
+        frame['state_name'] = frame['state_name'].fillna('')
+        self.frame = frame[['lga_id', 'lga_name', 'state_name']]
+        self.registry_file = None
+        self._index()
+
+    def _index(self):
+        self._pairs = pd.MultiIndex.from_arrays(
+            [self.frame['state_name'].values, self.frame['lga_name'].values]
+        )
+        first = self.frame.drop_duplicates('lga_name')
+        self._names = pd.Index(first['lga_name'].values)
+        self._name_ids = first['lga_id'].values
+
+    def __len__(self):
+        return len(self.frame)
+
+    @classmethod
+    def from_shapefile(cls, shapefile):
+        """Registry of the LGAs in a shapefile, ordered by state then LGA"""
+        registry = cls()
+        registry.add_shapefile(shapefile)
+        return registry
+
+    @classmethod
+    def load(cls, shapefile, registry_file=None):
+        """
+        Registry for a project
+
+        Parameters:
+        -----------
+        shapefile : Path
+            LGA boundaries; LGAs not yet registered are added
+        registry_file : Path, optional
+            Persisted registry (created or updated when LGAs are added)
+
+        Returns:
+        --------
+        LGARegistry (empty if neither file exists)
+        """
+        registry = cls()
+        if registry_file is not None and Path(registry_file).exists():
+            registry = cls(pd.read_parquet(registry_file))
+        registry.registry_file = registry_file
+
+        added = registry.add_shapefile(shapefile) if Path(shapefile).exists() else 0
+        if added and registry_file is not None:
+            registry.save()
+        return registry
+
+    def save(self, registry_file=None):
+        """Persist the registry (default: the file it was loaded from)"""
+        registry_file = registry_file or self.registry_file
+        if registry_file is None:
+            return
+        registry_file = Path(registry_file)
+        registry_file.parent.mkdir(parents=True, exist_ok=True)
+        self.frame.to_parquet(registry_file, index=False)
+
+    def add_shapefile(self, shapefile):
+        """Register the LGAs of a shapefile (reads attributes only)"""
+        import geopandas as gpd
+
+        gdf = gpd.read_file(shapefile, ignore_geometry=True)
+        lga_col = [col for col in gdf.columns if 'lganame' in col.lower()][0]
+        state_cols = [col for col in gdf.columns if 'statename' in col.lower()]
+        states = gdf[state_cols[0]] if state_cols else None
+        return self.add(gdf[lga_col], states)
+
+    def add(self, names, states=None):
+        """
+        Register LGAs not yet in the registry
+
+        Returns:
+        --------
+        Number of LGAs added
+        """
+        names = pd.Series(names, dtype=object).reset_index(drop=True)
+        if states is None:
+            known = self.encode(names) != UNKNOWN_LGA
+            states = pd.Series('', index=names.index, dtype=object)
+        else:
+            states = pd.Series(states, dtype=object).reset_index(drop=True)
+            known = self.encode(names, states) != UNKNOWN_LGA
+        if known.all():
+            return 0
+
+        new = pd.DataFrame({
+            'state_name': normalize_names(states[~known]).fillna('').values,
+            'lga_name': normalize_names(names[~known]).values
+        }).dropna(subset=['lga_name'])
+        new = new[new['lga_name'] != ''].drop_duplicates().sort_values(['state_name', 'lga_name'])
+        if len(new) == 0:
+            return 0
+
+        new['lga_id'] = np.arange(len(self), len(self) + len(new))
+        self.frame = pd.concat([self.frame, new[['lga_id', 'lga_name', 'state_name']]], ignore_index=True)
+        self.frame['lga_id'] = self.frame['lga_id'].astype(np.int32)
+        self._index()
+        return len(new)
+
+    def encode(self, names, states=None):
+        """
+        LGA codes for names (and optionally states)
+
+        Names are normalized once per distinct value. Without states, a name
+        shared by LGAs in different states maps to the first registered one,
+        so pass states for national data.
+
+        Returns:
+        --------
+        ndarray of int32 (UNKNOWN_LGA for names not in the registry)
+        """
+        name_codes, name_uniques = _factorize_names(names)
+
+        if states is None:
+            lookup = self._names.get_indexer(name_uniques)
+            ids = np.where(lookup >= 0, self._name_ids[lookup], UNKNOWN_LGA)
+            codes = name_codes
+        else:
+            state_codes, state_uniques = _factorize_names(states)
+            state_codes = np.where(state_codes < 0, len(state_uniques), state_codes)
+            state_uniques = np.append(state_uniques, '')
+
+            # One integer key per (state, name) pair, then look up each pair once
+            keys = np.where(name_codes < 0, -1, state_codes.astype(np.int64) * len(name_uniques) + name_codes)
+            codes, key_uniques = pd.factorize(keys)
+            valid = key_uniques >= 0
+            pairs = pd.MultiIndex.from_arrays([
+                state_uniques[key_uniques[valid] // max(len(name_uniques), 1)],
+                name_uniques[key_uniques[valid] % max(len(name_uniques), 1)]
+            ])
+            ids = np.full(len(key_uniques), UNKNOWN_LGA)
+            ids[valid] = self._pairs.get_indexer(pairs)
+
+        ids = np.append(np.asarray(ids, dtype=np.int32), UNKNOWN_LGA)
+        return ids[np.where(codes < 0, len(ids) - 1, codes)]
+
+    def decode(self, lga_ids):
+        """LGA names for codes"""
+        return self.frame['lga_name'].values[np.asarray(lga_ids)]
+
+def add_panel_index(df, registry, lga_col='lga_name', state_col='state_name', date_col='week_start'):
+    """
+    Add integer lga_id and week_id columns to a long (LGA x week) table
+
+    LGAs missing from the registry are registered first, so every row gets
+    a code. week_id is the contiguous Monday-based week ordinal of date_col.
+    """
+    states = df[state_col] if state_col in df.columns else None
+    registry.add(df[lga_col], states)
+    df['lga_id'] = registry.encode(df[lga_col], states)
+    df['week_id'] = week_ordinal(df[date_col]).astype(np.int32)
+    return df
+
+def project_registry(base_path):
+    """The project's registry (Data/LGA.shp, persisted under cache/)"""
+    base_path = Path(base_path)
+    return LGARegistry.load(base_path / "Data" / "LGA.shp", base_path / "cache" / "lga_registry.parquet")
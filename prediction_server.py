@@ -0,0 +1,276 @@
+"""
+Local Prediction Server
+Long-lived HTTP/JSON service that keeps the latest model bundle and the
+merged feature panel in memory, serves batched predictions and recursive
+forecasts in milliseconds, and hot-reloads when a new model version or
+dataset lands
+
+Endpoints:
+    GET  /health     model version, panel size and load times
+    POST /predict    {"lga_ids" | "lga_names", "week_ids" | "start"/"end"}
+    POST /forecast   {"horizon", "lga_ids" | "lga_names"}
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+import numpy as np
+import pandas as pd
+from storage import read_table, find_table, file_signature
+from panel_index import project_registry, add_panel_index, normalize_names
+from model_registry import load_latest, TASK_WEEKLY
+from forecasting import RecursiveForecaster, DEFAULT_HORIZON
+from risk import classify_risk
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_HORIZON = 52
+
+def _to_native(value):
+    """JSON fallback for numpy scalars and timestamps"""
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+def _records(df):
+    """JSON-ready records with dates as YYYY-MM-DD"""
+    df = df.copy()
+    for col in ('week_start', 'week_end'):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
+    if 'risk_category' in df.columns:
+        df['risk_category'] = df['risk_category'].astype(str)
+    return df.to_dict(orient='records')
+
+class PredictionService:
+    """
+    Model bundle and feature panel held in memory
+
+    Every request first checks whether the registry's LATEST version or the
+    merged dataset file changed (one small read and one stat) and swaps in
+    the new one if so. Forecasts are cached per (model version, horizon)
+    until then.
+
+    Parameters:
+    -----------
+    base_path : Path
+        Project directory (merged_data/, model_output/, Data/)
+    task : str
+        Registry task to serve
+    """
+
+    def __init__(self, base_path=None, task=TASK_WEEKLY, registry_dir=None):
+        self.base_path = Path(base_path or Path(__file__).parent)
+        self.task = task
+        self.registry_dir = Path(registry_dir) if registry_dir else self.base_path / "model_output" / "registry"
+        self.data_file = self.base_path / "merged_data" / "cholera_merged_dataset.parquet"
+        self.lock = threading.Lock()
+        self.bundle = None
+        self.panel = None
+        self.panel_signature = None
+        self.lga_lookup = {}
+        self.forecasts = {}
+        self.loaded_at = {}
+        self.refresh()
+
+    def _data_signature(self):
+        found = find_table(self.data_file)
+        if found is None:
+            raise FileNotFoundError(f"No merged dataset at {self.data_file}")
+        return file_signature(found)
+
+    def _load_panel(self):
+        df = read_table(self.data_file)
+        df['week_start'] = pd.to_datetime(df['week_start'])
+        df['week_end'] = pd.to_datetime(df['week_end'])
+        if 'lga_id' not in df.columns:
+            add_panel_index(df, project_registry(self.base_path))
+        return df.sort_values(['lga_id', 'week_id']).reset_index(drop=True)
+
+    def refresh(self):
+        """Reload the model and/or panel if a newer one is on disk"""
+        bundle = load_latest(self.task, registry_dir=self.registry_dir)
+        signature = self._data_signature()
+        with self.lock:
+            if self.bundle is None or bundle.version != self.bundle.version:
+                self.bundle = bundle
+                self.forecasts = {}
+                self.loaded_at['model'] = datetime.now().isoformat(timespec='seconds')
+            if signature != self.panel_signature:
+                self.panel = self._load_panel()
+                self.panel_signature = signature
+                lgas = self.panel.drop_duplicates('lga_id')
+                self.lga_lookup = dict(zip(normalize_names(lgas['lga_name']), lgas['lga_id']))
+                self.forecasts = {}
+                self.loaded_at['panel'] = datetime.now().isoformat(timespec='seconds')
+            return self.bundle, self.panel
+
+    def status(self):
+        bundle, panel = self.refresh()
+        return {
+            'model_version': bundle.version,
+            'model_name': bundle.manifest.get('model_name'),
+            'panel_rows': int(len(panel)),
+            'lgas': int(panel['lga_id'].nunique()),
+            'first_week': panel['week_start'].min().strftime('%Y-%m-%d'),
+            'last_week': panel['week_start'].max().strftime('%Y-%m-%d'),
+            'loaded_at': dict(self.loaded_at)
+        }
+
+    def _lga_mask(self, df, lga_ids=None, lga_names=None):
+        """Rows of the LGAs selected by id or name (all rows when none are given)"""
+        if not lga_ids and not lga_names:
+            return np.ones(len(df), dtype=bool)
+        selected = set(lga_ids or [])
+        selected.update(self.lga_lookup[name] for name in normalize_names(lga_names or [])
+                        if name in self.lga_lookup)
+        return df['lga_id'].isin(selected).values
+
+    def predict(self, lga_ids=None, lga_names=None, week_ids=None, start=None, end=None):
+        """
+        Predictions for panel rows selected by LGA and week
+
+        Returns:
+        --------
+        (model version, DataFrame of lga_id, lga_name, week_start, week_id,
+        case_count, predicted_cases, risk_category)
+        """
+        bundle, panel = self.refresh()
+        mask = self._lga_mask(panel, lga_ids, lga_names)
+        if week_ids:
+            mask = mask & panel['week_id'].isin(week_ids).values
+        if start:
+            mask = mask & (panel['week_start'] >= pd.Timestamp(start)).values
+        if end:
+            mask = mask & (panel['week_start'] <= pd.Timestamp(end)).values
+
+        rows = panel.loc[mask]
+        out = rows[['lga_id', 'lga_name', 'week_start', 'week_id', 'case_count']].copy()
+        out['predicted_cases'] = bundle.predict(rows) if len(rows) else np.empty(0)
+        out['risk_category'] = classify_risk(out['predicted_cases'], scheme='fixed', right=True)
+        return bundle.version, out
+
+    def forecast(self, horizon=DEFAULT_HORIZON, lga_ids=None, lga_names=None):
+        """
+        Recursive forecast of the weeks after the panel (all LGAs are
+        forecast together and cached; the selection is applied afterwards)
+
+        Returns:
+        --------
+        (model version, DataFrame as in future_predictions_12weeks)
+        """
+        horizon = int(horizon)
+        if not 1 <= horizon <= MAX_HORIZON:
+            raise ValueError(f"horizon must be between 1 and {MAX_HORIZON}")
+        bundle, panel = self.refresh()
+        key = (bundle.version, horizon)
+        df_future = self.forecasts.get(key)
+        if df_future is None:
+            forecaster = RecursiveForecaster(bundle.pipeline, None, bundle.feature_names)
+            df_future = forecaster.forecast(panel, horizon=horizon)
+            df_future['predicted_cases'] = df_future['predicted_cases'].round(2)
+            df_future['risk_category'] = classify_risk(df_future['predicted_cases'], scheme='fixed')
+            with self.lock:
+                # A reload during the forecast cleared the cache; do not put
+                # a forecast of the old model or panel back into it
+                if self.bundle is bundle and self.panel is panel:
+                    self.forecasts[key] = df_future
+        return bundle.version, df_future[self._lga_mask(df_future, lga_ids, lga_names)]
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """JSON request handler bound to a PredictionService (server.service)"""
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, default=_to_native).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self._handle(lambda: self.server.service.status())
+        else:
+            self._send(404, {'error': f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        route = urlparse(self.path).path
+        if route == "/predict":
+            def run():
+                args = self._body()
+                version, df = service.predict(
+                    args.get('lga_ids'), args.get('lga_names'), args.get('week_ids'),
+                    args.get('start'), args.get('end')
+                )
+                return {'model_version': version, 'predictions': _records(df)}
+        elif route == "/forecast":
+            def run():
+                args = self._body()
+                version, df = service.forecast(
+                    args.get('horizon', DEFAULT_HORIZON), args.get('lga_ids'), args.get('lga_names')
+                )
+                return {'model_version': version, 'forecast': _records(df)}
+        else:
+            self._send(404, {'error': f"Unknown endpoint: {self.path}"})
+            return
+        self._handle(run)
+
+    def _handle(self, run):
+        start = time.perf_counter()
+        try:
+            payload = run()
+        except (ValueError, TypeError, json.JSONDecodeError) as e:
+            self._send(400, {'error': str(e)})
+            return
+        except FileNotFoundError as e:
+            self._send(503, {'error': str(e)})
+            return
+        payload['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        self._send(200, payload)
+
+    def log_message(self, format, *args):
+        print(f"  {self.address_string()} {format % args}", flush=True)
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, base_path=None, task=TASK_WEEKLY):
+    """Threaded HTTP server with a loaded PredictionService"""
+    server = ThreadingHTTPServer((host, port), PredictionHandler)
+    server.service = PredictionService(base_path, task)
+    return server
+
+def main(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Load the model and panel, then serve until interrupted"""
+    print("Starting prediction server...", flush=True)
+    server = make_server(host, port)
+    status = server.service.status()
+    print(f"  [OK] Model {status['model_name']} (version {status['model_version']})", flush=True)
+    print(f"  [OK] Panel: {status['panel_rows']} rows, {status['lgas']} LGAs, "
+          f"{status['first_week']} to {status['last_week']}", flush=True)
+    print(f"Serving on http://{host}:{port} (Ctrl+C to stop)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve cholera predictions and forecasts over HTTP')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Bind address (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port (default: {DEFAULT_PORT})')
+    args = parser.parse_args()
+
+    main(host=args.host, port=args.port)
@@ -0,0 +1,91 @@
+"""
+Risk Classification
+Maps predicted cases to risk levels in one vectorized pass, with fixed case
+bins or percentile thresholds, either global or per group (LGA or state)
+"""
+
+import numpy as np
+import pandas as pd
+
+RISK_LEVELS = ['Low', 'Medium', 'High', 'Very High']
+
+# Fixed scheme: weekly predicted cases separating the levels
+FIXED_BINS = (1, 5, 10)
+
+# Percentile scheme: quartiles of the predictions
+PERCENTILES = (25, 50, 75)
+
+class RiskClassifier:
+    """
+    Risk levels from precomputed thresholds
+
+    Parameters:
+    -----------
+    scheme : str
+        'fixed' (thresholds = bins) or 'percentile' (thresholds = these
+        percentiles of the values being fitted)
+    bins : sequence
+        Thresholds of the fixed scheme
+    percentiles : sequence
+        Percentiles of the percentile scheme
+    right : bool
+        False: a value equal to a threshold falls in the higher level
+        (value < threshold is the lower level); True: in the lower level
+    """
+
+    def __init__(self, scheme='percentile', bins=FIXED_BINS, percentiles=PERCENTILES, right=False):
+        if scheme not in ('fixed', 'percentile'):
+            raise ValueError(f"Unknown risk scheme: {scheme}")
+        self.scheme = scheme
+        self.bins = np.asarray(bins, dtype=float)
+        self.percentiles = np.asarray(percentiles, dtype=float)
+        self.right = right
+        self.thresholds_ = None
+        self.groups_ = None
+
+    def fit(self, values, groups=None):
+        """
+        Compute thresholds: one row for all values, or one row per group
+        (percentile scheme only; fixed bins are the same for every group)
+        """
+        values = np.asarray(values, dtype=float)
+        if self.scheme == 'fixed':
+            self.thresholds_, self.groups_ = self.bins[None, :], None
+        elif groups is None:
+            self.thresholds_ = np.nanpercentile(values, self.percentiles)[None, :]
+            self.groups_ = None
+        else:
+            table = pd.Series(values).groupby(np.asarray(groups)).quantile(self.percentiles / 100).unstack()
+            self.thresholds_, self.groups_ = table.values, table.index
+        return self
+
+    def thresholds(self):
+        """Thresholds as a DataFrame (indexed by group when fitted per group)"""
+        return pd.DataFrame(self.thresholds_, index=self.groups_,
+                            columns=[f"{a}/{b}" for a, b in zip(RISK_LEVELS, RISK_LEVELS[1:])])
+
+    def transform(self, values, groups=None):
+        """
+        Ordered categorical of risk levels (NaN for missing values or
+        groups without thresholds)
+        """
+        values = np.asarray(values, dtype=float)
+        if self.groups_ is None:
+            edges = self.thresholds_
+            valid = ~np.isnan(values)
+        else:
+            rows = self.groups_.get_indexer(np.asarray(groups))
+            edges = self.thresholds_[rows]
+            valid = ~np.isnan(values) & (rows >= 0)
+
+        # Level = number of thresholds the value is past (np.digitize per row)
+        past = values[:, None] > edges if self.right else values[:, None] >= edges
+        codes = np.where(valid, past.sum(axis=1), -1)
+        return pd.Categorical.from_codes(codes, categories=RISK_LEVELS, ordered=True)
+
+    def fit_transform(self, values, groups=None):
+        return self.fit(values, groups).transform(values, groups)
+
+def classify_risk(values, scheme='percentile', groups=None, right=False, **kwargs):
+    """Risk levels of `values` (fitted on the values themselves)"""
+    return RiskClassifier(scheme, right=right, **kwargs).fit_transform(values, groups)
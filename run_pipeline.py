@@ -176,12 +176,12 @@ def main():
     
     key_outputs = [
         ("predictions/Cholera_Prediction_Report_Complete.pdf", "📄 Final PDF Report"),
-        ("predictions/cholera_predictions.xlsx", "📊 All Predictions"),
-        ("predictions/future_predictions_12weeks.xlsx", "🔮 12-Week Forecast"),
+        ("predictions/cholera_predictions.parquet", "📊 All Predictions"),
+        ("predictions/future_predictions_12weeks.parquet", "🔮 12-Week Forecast"),
         ("predictions/cholera_maps.png", "🗺️  Choropleth Maps"),
         ("predictions/analysis_charts.png", "📈 Analysis Charts"),
-        ("merged_data/cholera_merged_dataset.csv", "📋 Complete Dataset"),
-        ("model_output/best_model.pkl", "🤖 Trained Model"),
+        ("merged_data/cholera_merged_dataset.parquet", "📋 Complete Dataset"),
+        ("model_output/registry/weekly/LATEST", "🤖 Trained Model"),
     ]
     
     for file_path, description in key_outputs:
@@ -200,9 +200,10 @@ def main():
     print("1. Review the PDF report:")
     print(f"   predictions/Cholera_Prediction_Report_Complete.pdf")
     print("\n2. Share predictions with stakeholders:")
-    print(f"   predictions/future_predictions_12weeks.xlsx")
+    print(f"   predictions/future_predictions_12weeks.parquet")
+    print(f"   (Excel copies: set CHOLERA_EXPORT_EXCEL=1, or download from the web app)")
     print("\n3. Use the trained model for future predictions:")
-    print(f"   model_output/best_model.pkl")
+    print(f"   model_registry.load_latest()  (bundles in model_output/registry/)")
     
     return True
 
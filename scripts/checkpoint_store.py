@@ -0,0 +1,105 @@
+"""
+Week-Granular Checkpoint Store
+Append-only SQLite store of weekly environmental records keyed by
+(LGA, week), so interrupted extractions resume at the first missing week
+"""
+
+import json
+import sqlite3
+import threading
+import pandas as pd
+
+def _to_native(value):
+    """JSON fallback for numpy scalars and timestamps"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+class WeeklyCheckpointStore:
+    """
+    One row per (lga_name, week_end) holding the full weekly record
+
+    Each record is committed as soon as its week is extracted, so a crash
+    loses at most the weeks still in flight. The store is safe to append to
+    from scheduler worker threads.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS weekly_records ("
+            "lga_name TEXT NOT NULL, week_end TEXT NOT NULL, record TEXT NOT NULL, "
+            "PRIMARY KEY (lga_name, week_end))"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def append(self, records):
+        """Commit weekly records (dicts with lga_name and week_end)"""
+        rows = [(r['lga_name'], r['week_end'], json.dumps(r, default=_to_native)) for r in records]
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO weekly_records (lga_name, week_end, record) VALUES (?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+
+    def completed_weeks(self, lga_name):
+        """Set of week_end strings already stored for an LGA"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT week_end FROM weekly_records WHERE lga_name = ?", (lga_name,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def missing_weeks(self, lga_name, weeks):
+        """Week end dates from `weeks` not yet stored for an LGA"""
+        done = self.completed_weeks(lga_name)
+        return weeks[[week.strftime('%Y-%m-%d') not in done for week in weeks]]
+
+    def has_lga(self, lga_name):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM weekly_records WHERE lga_name = ? LIMIT 1", (lga_name,)
+            ).fetchone()
+        return row is not None
+
+    def load(self, lga_names, weeks):
+        """
+        Stored records for the given LGAs and weeks
+
+        Returns:
+        --------
+        DataFrame ordered by LGA (in the order given) then week
+        """
+        week_strs = [week.strftime('%Y-%m-%d') for week in weeks]
+        wanted = set(week_strs)
+        lga_order = {name: i for i, name in enumerate(lga_names)}
+        if not lga_order or not wanted:
+            return pd.DataFrame()
+
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT lga_name, week_end, record FROM weekly_records "
+                f"WHERE lga_name IN ({','.join('?' * len(lga_order))})",
+                list(lga_order)
+            ).fetchall()
+
+        rows = [row for row in rows if row[1] in wanted]
+        rows.sort(key=lambda row: (lga_order[row[0]], row[1]))
+        return pd.DataFrame([json.loads(row[2]) for row in rows])
+
+    def import_excel_checkpoint(self, checkpoint_file):
+        """Load a legacy per-LGA checkpoint_{lga}.xlsx into the store"""
+        df = pd.read_excel(checkpoint_file)
+        for col in ['week_start', 'week_end']:
+            df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
+        self.append(df.to_dict('records'))
+        return len(df)
@@ -9,8 +9,14 @@ import geopandas as gpd
 import pandas as pd
 from pathlib import Path
 from datetime import datetime, timedelta
-import time
 import numpy as np
+import sys
+from gee_scheduler import RequestScheduler, add_scheduler_arguments, DEFAULT_CONCURRENCY, DEFAULT_RATE
+from static_features import StaticFeatureStore, get_static_features
+
+# Project root holds the shared storage module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from storage import write_table
 
 def initialize_gee(service_account_key):
     """Initialize Google Earth Engine with service account"""
@@ -85,45 +91,7 @@ def get_dates_and_locations_from_epi_data(epi_file):
     
     return date_range, start_date, end_date, affected_states, affected_lgas
 
-def extract_static_features(geometry):
-    """Extract static features (elevation, slope, aspect) - same for all dates"""
-    # SRTM Digital Elevation Model
-    dem = ee.Image("USGS/SRTMGL1_003")
-    slope = ee.Terrain.slope(dem)
-    aspect = ee.Terrain.aspect(dem)
-    
-    elev_stats = dem.reduceRegion(
-        reducer=ee.Reducer.mean(),
-        geometry=geometry,
-        scale=90,  # Using 90m for faster processing
-        maxPixels=1e9
-    )
-    
-    slope_stats = slope.reduceRegion(
-        reducer=ee.Reducer.mean(),
-        geometry=geometry,
-        scale=90,
-        maxPixels=1e9
-    )
-    
-    aspect_stats = aspect.reduceRegion(
-        reducer=ee.Reducer.mean(),
-        geometry=geometry,
-        scale=90,
-        maxPixels=1e9
-    )
-    
-    result = elev_stats.getInfo()
-    result.update(slope_stats.getInfo())
-    result.update(aspect_stats.getInfo())
-    
-    return {
-        'elevation_mean': result.get('elevation', None),
-        'slope_mean': result.get('slope', None),
-        'aspect_mean': result.get('aspect', None)
-    }
-
-def extract_daily_precipitation(geometry, date):
+def extract_daily_precipitation(geometry, date, scheduler):
     """Extract daily precipitation for a specific date"""
     date_str = date.strftime('%Y-%m-%d')
     next_date = (date + timedelta(days=1)).strftime('%Y-%m-%d')
@@ -140,10 +108,10 @@ def extract_daily_precipitation(geometry, date):
         maxPixels=1e9
     )
     
-    result = stats.getInfo()
+    result = scheduler.get_info(stats)
     return result.get('precipitation', None)
 
-def extract_lst_for_period(geometry, date):
+def extract_lst_for_period(geometry, date, scheduler):
     """Extract LST for 8-day period around the date (MODIS has 8-day composites)"""
     date_str = date.strftime('%Y-%m-%d')
     start = (date - timedelta(days=4)).strftime('%Y-%m-%d')
@@ -164,13 +132,13 @@ def extract_lst_for_period(geometry, date):
         maxPixels=1e9
     )
     
-    result = stats.getInfo()
+    result = scheduler.get_info(stats)
     return {
         'lst_day': result.get('LST_Day_1km', None),
         'lst_night': result.get('LST_Night_1km', None)
     }
 
-def extract_ndvi_for_period(geometry, date):
+def extract_ndvi_for_period(geometry, date, scheduler):
     """Extract NDVI for 16-day period around the date (MODIS has 16-day composites)"""
     start = (date - timedelta(days=8)).strftime('%Y-%m-%d')
     end = (date + timedelta(days=8)).strftime('%Y-%m-%d')
@@ -190,10 +158,10 @@ def extract_ndvi_for_period(geometry, date):
         maxPixels=1e9
     )
     
-    result = stats.getInfo()
+    result = scheduler.get_info(stats)
     return result.get('NDVI', None)
 
-def extract_ndwi_for_period(geometry, date):
+def extract_ndwi_for_period(geometry, date, scheduler):
     """Extract NDWI from Sentinel-2 for period around the date"""
     start = (date - timedelta(days=7)).strftime('%Y-%m-%d')
     end = (date + timedelta(days=7)).strftime('%Y-%m-%d')
@@ -217,12 +185,12 @@ def extract_ndwi_for_period(geometry, date):
             maxPixels=1e9
         )
         
-        result = stats.getInfo()
+        result = scheduler.get_info(stats)
         return result.get('NDWI', None)
     except:
         return None
 
-def extract_lulc_for_year(geometry, year):
+def extract_lulc_for_year(geometry, year, scheduler):
     """Extract LULC proportions for a specific year"""
     try:
         lulc_collection = ee.ImageCollection("projects/sat-io/open-datasets/landcover/ESRI_Global-LULC_10m_TS")
@@ -236,17 +204,15 @@ def extract_lulc_for_year(geometry, year):
             maxPixels=1e9
         )
         
-        result = lulc_mode.getInfo()
+        result = scheduler.get_info(lulc_mode)
         return result.get('b1', None)  # Returns dominant class
     except:
         return None
 
-def process_lga_daily_data(lga_name, state_name, geometry, date_range, static_features):
+def process_lga_daily_data(lga_name, state_name, geometry, date_range, static_features, scheduler):
     """Extract daily environmental data for one LGA across all dates"""
     print(f"    Processing {lga_name}...")
     
-    results = []
-    
     # Sample dates to reduce processing time (can be adjusted)
     # For very large date ranges, sample every N days
     if len(date_range) > 365:
@@ -257,7 +223,10 @@ def process_lga_daily_data(lga_name, state_name, geometry, date_range, static_fe
     
     print(f"      Processing {len(date_sample)} dates...")
     
-    for i, date in enumerate(date_sample):
+    # Dates run concurrently on the scheduler; rate limiting and retries
+    # replace the fixed sleeps between requests
+    def process_date(item):
+        i, date = item
         if i % 30 == 0:
             print(f"      Progress: {i}/{len(date_sample)} dates")
         
@@ -276,25 +245,25 @@ def process_lga_daily_data(lga_name, state_name, geometry, date_range, static_fe
             row_data.update(static_features)
             
             # Extract daily precipitation
-            row_data['precipitation'] = extract_daily_precipitation(geometry, date) or 0
+            row_data['precipitation'] = extract_daily_precipitation(geometry, date, scheduler) or 0
             
             # Extract LST (8-day composite)
-            lst_data = extract_lst_for_period(geometry, date)
+            lst_data = extract_lst_for_period(geometry, date, scheduler)
             row_data['lst_day'] = lst_data.get('lst_day', 0) or 0
             row_data['lst_night'] = lst_data.get('lst_night', 0) or 0
             
             # Extract NDVI (16-day composite)
-            row_data['ndvi'] = extract_ndvi_for_period(geometry, date) or 0
+            row_data['ndvi'] = extract_ndvi_for_period(geometry, date, scheduler) or 0
             
             # Extract NDWI (when available)
             if i % 30 == 0:  # Sample NDWI monthly to reduce processing
-                row_data['ndwi'] = extract_ndwi_for_period(geometry, date) or 0
+                row_data['ndwi'] = extract_ndwi_for_period(geometry, date, scheduler) or 0
             else:
                 row_data['ndwi'] = 0
             
             # LULC by year (same for all dates in that year)
             if i % 365 == 0:  # Get once per year
-                row_data['lulc_class'] = extract_lulc_for_year(geometry, date.year) or 0
+                row_data['lulc_class'] = extract_lulc_for_year(geometry, date.year, scheduler) or 0
             else:
                 row_data['lulc_class'] = 0
             
@@ -303,11 +272,7 @@ def process_lga_daily_data(lga_name, state_name, geometry, date_range, static_fe
                 if row_data[key] is None:
                     row_data[key] = 0
             
-            results.append(row_data)
-            
-            # Small delay to avoid rate limits
-            if i % 10 == 0:
-                time.sleep(0.2)
+            return row_data
                 
         except Exception as e:
             print(f"      Error on {date.date()}: {e}")
@@ -330,11 +295,11 @@ def process_lga_daily_data(lga_name, state_name, geometry, date_range, static_fe
                 'ndwi': 0,
                 'lulc_class': 0
             }
-            results.append(row_data)
+            return row_data
     
-    return results
+    return scheduler.map(process_date, enumerate(date_sample))
 
-def main():
+def main(concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE):
     """Main extraction function"""
     print("="*70)
     print("DAILY ENVIRONMENTAL DATA EXTRACTION")
@@ -354,6 +319,8 @@ def main():
     
     # Initialize GEE
     initialize_gee(service_account_key)
+    scheduler = RequestScheduler(concurrency=concurrency, rate=rate)
+    static_store = StaticFeatureStore(output_dir / "static_features.sqlite")
     
     # Get date range AND affected locations from epi data
     date_range, start_date, end_date, affected_states, affected_lgas = get_dates_and_locations_from_epi_data(epi_file)
@@ -431,14 +398,14 @@ def main():
         geom_json = row.geometry.__geo_interface__
         ee_geometry = ee.Geometry(geom_json)
         
-        # Extract static features once
+        # Static features (fetched from GEE only on a store miss)
         print(f"  Extracting static features...")
-        static_features = extract_static_features(ee_geometry)
+        static_features = get_static_features(geom_json, scheduler, static_store)
         
         # Extract daily data
         lga_daily_data = process_lga_daily_data(
             lga_name, state_name, ee_geometry, 
-            date_range, static_features
+            date_range, static_features, scheduler
         )
         
         all_results.extend(lga_daily_data)
@@ -448,16 +415,14 @@ def main():
         # Save intermediate results every 10 LGAs
         if (idx + 1) % 10 == 0:
             df_temp = pd.DataFrame(all_results)
-            temp_file = output_dir / f"environmental_daily_data_temp_{idx+1}.xlsx"
-            df_temp.to_excel(temp_file, index=False)
+            temp_file = write_table(df_temp, output_dir / f"environmental_daily_data_temp_{idx+1}.parquet")
             print(f"\n  [CHECKPOINT] Saved {len(all_results)} records to {temp_file}")
     
     # Create final DataFrame
     df_results = pd.DataFrame(all_results)
     
     # Save to Excel
-    output_file = output_dir / f"environmental_daily_data_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.xlsx"
-    df_results.to_excel(output_file, index=False)
+    output_file = write_table(df_results, output_dir / f"environmental_daily_data_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.parquet")
     
     print("\n" + "="*70)
     print("EXTRACTION COMPLETE!")
@@ -477,4 +442,10 @@ def main():
     return df_results
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Daily environmental data extraction')
+    add_scheduler_arguments(parser)
+    args = parser.parse_args()
+    
+    main(concurrency=args.concurrency, rate=args.rate)
@@ -9,6 +9,12 @@ import pandas as pd
 from pathlib import Path
 from datetime import datetime
 import sys
+from gee_scheduler import RequestScheduler, add_scheduler_arguments, DEFAULT_CONCURRENCY, DEFAULT_RATE
+from static_features import StaticFeatureStore, get_static_features
+
+# Project root holds the shared storage module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from storage import write_table
 
 def initialize_gee(service_account_key):
     """Initialize Google Earth Engine"""
@@ -56,7 +62,7 @@ def get_epi_info(epi_file):
     
     return start_date, end_date, affected_states, affected_lgas
 
-def extract_monthly_data(geometry, year, month):
+def extract_monthly_data(geometry, year, month, scheduler, static_features):
     """Extract all environmental data for one month - OPTIMIZED"""
     start_date = f'{year}-{month:02d}-01'
     
@@ -80,46 +86,38 @@ def extract_monthly_data(geometry, year, month):
         'ndwi_mean': 0
     }
     
+    # Static features come from the per-LGA store, not a monthly query
+    result.update(static_features)
+    
     try:
-        # Static features (only need once but including for completeness)
-        dem = ee.Image("USGS/SRTMGL1_003")
-        elev = dem.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=90, maxPixels=1e9).getInfo()
-        result['elevation_mean'] = elev.get('elevation', 0) or 0
-        
-        slope = ee.Terrain.slope(dem).reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=90, maxPixels=1e9).getInfo()
-        result['slope_mean'] = slope.get('slope', 0) or 0
-        
-        aspect = ee.Terrain.aspect(dem).reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=90, maxPixels=1e9).getInfo()
-        result['aspect_mean'] = aspect.get('aspect', 0) or 0
-        
         # Precipitation - monthly total and mean
         precip = ee.ImageCollection('UCSB-CHG/CHIRPS/DAILY').filterDate(start_date, end_date).select('precipitation')
-        precip_stats = precip.sum().addBands(precip.mean()).reduceRegion(
+        precip_stats = scheduler.get_info(precip.sum().addBands(precip.mean()).reduceRegion(
             reducer=ee.Reducer.mean(),
             geometry=geometry,
             scale=5566,
             maxPixels=1e9
-        ).getInfo()
+        ))
         result['precipitation_total'] = precip_stats.get('precipitation', 0) or 0
         result['precipitation_mean'] = precip_stats.get('precipitation_1', 0) or 0
         
         # LST - monthly mean
         lst = ee.ImageCollection('MODIS/061/MOD11A2').filterDate(start_date, end_date).select(['LST_Day_1km', 'LST_Night_1km']).mean().multiply(0.02).subtract(273.15)
-        lst_stats = lst.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=1000, maxPixels=1e9).getInfo()
+        lst_stats = scheduler.get_info(lst.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=1000, maxPixels=1e9))
         result['lst_day_mean'] = lst_stats.get('LST_Day_1km', 0) or 0
         result['lst_night_mean'] = lst_stats.get('LST_Night_1km', 0) or 0
         
         # NDVI - monthly mean
         ndvi = ee.ImageCollection('MODIS/061/MOD13A2').filterDate(start_date, end_date).select('NDVI').mean().multiply(0.0001)
-        ndvi_stats = ndvi.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=1000, maxPixels=1e9).getInfo()
+        ndvi_stats = scheduler.get_info(ndvi.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=1000, maxPixels=1e9))
         result['ndvi_mean'] = ndvi_stats.get('NDVI', 0) or 0
         
         # NDWI - monthly mean (if available)
         try:
             s2 = ee.ImageCollection('COPERNICUS/S2_SR_HARMONIZED').filterDate(start_date, end_date).filterBounds(geometry).filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 30))
-            if s2.size().getInfo() > 0:
+            if scheduler.get_info(s2.size()) > 0:
                 ndwi = s2.map(lambda img: img.normalizedDifference(['B3', 'B8'])).mean()
-                ndwi_stats = ndwi.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=20, maxPixels=1e9).getInfo()
+                ndwi_stats = scheduler.get_info(ndwi.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=20, maxPixels=1e9))
                 result['ndwi_mean'] = ndwi_stats.get('nd', 0) or 0
         except:
             result['ndwi_mean'] = 0
@@ -129,7 +127,7 @@ def extract_monthly_data(geometry, year, month):
     
     return result
 
-def main():
+def main(concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE):
     """Main extraction - FAST VERSION"""
     print("="*70, flush=True)
     print("MONTHLY ENVIRONMENTAL DATA EXTRACTION (OPTIMIZED)", flush=True)
@@ -148,6 +146,8 @@ def main():
     
     # Initialize
     initialize_gee(service_account_key)
+    scheduler = RequestScheduler(concurrency=concurrency, rate=rate)
+    static_store = StaticFeatureStore(output_dir / "static_features.sqlite")
     
     # Get info from epi data
     start_date, end_date, affected_states, affected_lgas = get_epi_info(epi_file)
@@ -187,24 +187,27 @@ def main():
         
         geom_json = row.geometry.__geo_interface__
         ee_geometry = ee.Geometry(geom_json)
+        static_features = get_static_features(geom_json, scheduler, static_store)
         
-        for i, month_date in enumerate(months):
+        def extract_month(item):
+            i, month_date = item
             if i % 12 == 0:
                 print(f"  Year {month_date.year}...", flush=True)
             
-            monthly_data = extract_monthly_data(ee_geometry, month_date.year, month_date.month)
+            monthly_data = extract_monthly_data(ee_geometry, month_date.year, month_date.month, scheduler, static_features)
             monthly_data['lga_name'] = lga_name
             monthly_data['state_name'] = state_name
             monthly_data['date'] = month_date.strftime('%Y-%m-%d')
-            
-            all_results.append(monthly_data)
+            return monthly_data
+        
+        # Months run concurrently; results keep month order
+        all_results.extend(scheduler.map(extract_month, enumerate(months)))
         
         print(f"  [OK] {len(months)} months extracted\n", flush=True)
     
     # Save results
     df = pd.DataFrame(all_results)
-    output_file = output_dir / f"environmental_monthly_data_{start_date.strftime('%Y%m')}_to_{end_date.strftime('%Y%m')}.xlsx"
-    df.to_excel(output_file, index=False)
+    output_file = write_table(df, output_dir / f"environmental_monthly_data_{start_date.strftime('%Y%m')}_to_{end_date.strftime('%Y%m')}.parquet")
     
     print("\n" + "="*70, flush=True)
     print("EXTRACTION COMPLETE!", flush=True)
@@ -217,4 +220,10 @@ def main():
     return df
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Monthly environmental data extraction')
+    add_scheduler_arguments(parser)
+    args = parser.parse_args()
+    
+    main(concurrency=args.concurrency, rate=args.rate)
@@ -1,6 +1,6 @@
 """
 Extract WEEKLY Environmental Data with CHECKPOINTS
-Saves progress after each LGA to prevent data loss
+Saves progress after each week to prevent data loss
 """
 
 import ee
@@ -8,6 +8,15 @@ import geopandas as gpd
 import pandas as pd
 from pathlib import Path
 import json
+import sys
+from gee_batch import BatchWeeklyExtractor
+from checkpoint_store import WeeklyCheckpointStore
+from static_features import StaticFeatureStore, get_static_features
+from gee_scheduler import RequestScheduler, add_scheduler_arguments, is_no_data, DEFAULT_CONCURRENCY, DEFAULT_RATE
+
+# Project root holds the shared storage module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from storage import write_table
 
 def initialize_gee(service_account_key):
     """Initialize Google Earth Engine"""
@@ -53,8 +62,14 @@ def get_epi_info(epi_file):
     
     return start_date, end_date, affected_states, affected_lgas
 
-def extract_weekly_data_simple(geometry, week_start, week_end):
-    """Extract environmental data for one week - SIMPLIFIED"""
+def extract_weekly_data_simple(geometry, week_start, week_end, scheduler):
+    """
+    Extract environmental data for one week - SIMPLIFIED
+    
+    Variables without imagery for the week stay 0. Any other failure
+    (retries exhausted, timeout, auth) returns None, so the week is not
+    checkpointed and is retried on the next run.
+    """
     
     start_str = week_start.strftime('%Y-%m-%d')
     end_str = week_end.strftime('%Y-%m-%d')
@@ -73,31 +88,33 @@ def extract_weekly_data_simple(geometry, week_start, week_end):
     try:
         # Precipitation
         precip = ee.ImageCollection('UCSB-CHG/CHIRPS/DAILY').filterDate(start_str, end_str).select('precipitation').sum()
-        precip_val = precip.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=5566, maxPixels=1e9).getInfo()
+        precip_val = scheduler.get_info(precip.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=5566, maxPixels=1e9))
         result['precipitation_total'] = precip_val.get('precipitation', 0) or 0
         
         # LST
         lst = ee.ImageCollection('MODIS/061/MOD11A2').filterDate(start_str, end_str).select(['LST_Day_1km', 'LST_Night_1km']).mean()
-        if lst.bandNames().size().getInfo() > 0:
+        if scheduler.get_info(lst.bandNames().size()) > 0:
             lst_c = lst.multiply(0.02).subtract(273.15)
-            lst_val = lst_c.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=1000, maxPixels=1e9).getInfo()
+            lst_val = scheduler.get_info(lst_c.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=1000, maxPixels=1e9))
             result['lst_day_mean'] = lst_val.get('LST_Day_1km', 0) or 0
             result['lst_night_mean'] = lst_val.get('LST_Night_1km', 0) or 0
         
         # NDVI
         ndvi = ee.ImageCollection('MODIS/061/MOD13A2').filterDate(start_str, end_str).select('NDVI').mean()
-        if ndvi.bandNames().size().getInfo() > 0:
+        if scheduler.get_info(ndvi.bandNames().size()) > 0:
             ndvi_s = ndvi.multiply(0.0001)
-            ndvi_val = ndvi_s.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=1000, maxPixels=1e9).getInfo()
+            ndvi_val = scheduler.get_info(ndvi_s.reduceRegion(reducer=ee.Reducer.mean(), geometry=geometry, scale=1000, maxPixels=1e9))
             result['ndvi_mean'] = ndvi_val.get('NDVI', 0) or 0
             
-    except:
-        pass
+    except Exception as e:
+        if not is_no_data(e):
+            print(f"    [FAILED] week {start_str}: {e}", flush=True)
+            return None
     
     return result
 
-def process_one_lga(lga_row, weeks, lga_col, state_col):
-    """Process all weeks for ONE LGA"""
+def process_one_lga(lga_row, weeks, lga_col, state_col, scheduler, store=None, static_store=None):
+    """Process the given weeks for ONE LGA, checkpointing each week to `store`"""
     lga_name = lga_row[lga_col]
     state_name = lga_row[state_col]
     
@@ -106,44 +123,128 @@ def process_one_lga(lga_row, weeks, lga_col, state_col):
     geom_json = lga_row.geometry.__geo_interface__
     ee_geometry = ee.Geometry(geom_json)
     
-    # Static features
+    # Static features (fetched from GEE only on a store miss)
     print("  Extracting static features...", flush=True)
-    try:
-        dem = ee.Image("USGS/SRTMGL1_003")
-        elev = dem.reduceRegion(reducer=ee.Reducer.mean(), geometry=ee_geometry, scale=90, maxPixels=1e9).getInfo()
-        slope = ee.Terrain.slope(dem).reduceRegion(reducer=ee.Reducer.mean(), geometry=ee_geometry, scale=90, maxPixels=1e9).getInfo()
-        aspect = ee.Terrain.aspect(dem).reduceRegion(reducer=ee.Reducer.mean(), geometry=ee_geometry, scale=90, maxPixels=1e9).getInfo()
-        
-        static_features = {
-            'elevation_mean': elev.get('elevation', 0) or 0,
-            'slope_mean': slope.get('slope', 0) or 0,
-            'aspect_mean': aspect.get('aspect', 0) or 0
-        }
-    except:
-        static_features = {'elevation_mean': 0, 'slope_mean': 0, 'aspect_mean': 0}
-    
-    # Process weeks
+    static_features = get_static_features(geom_json, scheduler, static_store)
+    
+    # Process weeks concurrently (results keep week order)
     print(f"  Extracting {len(weeks)} weeks...", flush=True)
-    results = []
     
-    for i, week_end in enumerate(weeks):
+    def extract_week(item):
+        i, week_end = item
         if i % 52 == 0:
             print(f"    Year {week_end.year}...", flush=True)
         
         week_start = week_end - pd.Timedelta(days=6)
         
-        weekly_data = extract_weekly_data_simple(ee_geometry, week_start, week_end)
+        weekly_data = extract_weekly_data_simple(ee_geometry, week_start, week_end, scheduler)
+        if weekly_data is None:
+            # Left out of the checkpoint so a resume retries it
+            return None
         weekly_data['lga_name'] = lga_name
         weekly_data['state_name'] = state_name
         weekly_data.update(static_features)
-        
-        results.append(weekly_data)
+        if store is not None:
+            store.append([weekly_data])
+        return weekly_data
+    
+    results = scheduler.map(extract_week, enumerate(weeks))
+    failed = sum(result is None for result in results)
+    results = [result for result in results if result is not None]
     
     print(f"  [OK] {len(results)} weeks extracted", flush=True)
+    if failed:
+        print(f"  [WARNING] {failed} weeks failed - rerun to retry them", flush=True)
+    return results
+
+def process_lgas_batched(gdf, weeks, lga_col, state_col, extractor=None, scheduler=None,
+                         store=None, missing=None, static_store=None):
+    """
+    Process weeks for MANY LGAs with batched reduceRegions requests
+    
+    Parameters:
+    -----------
+    missing : dict, optional
+        {lga_name: week end dates still to extract}; defaults to all weeks.
+        LGAs missing the same weeks are batched together.
+    store : WeeklyCheckpointStore, optional
+        Each reduced chunk is checkpointed as soon as it arrives
+    static_store : StaticFeatureStore, optional
+        Static features are only requested for LGAs it does not hold
+    
+    Returns:
+    --------
+    dict {lga_name: list of weekly records}
+    """
+    if extractor is None:
+        extractor = BatchWeeklyExtractor(ee, scheduler=scheduler)
+    
+    lgas = [
+        {'lga_name': row[lga_col], 'state_name': row[state_col],
+         'geometry': row.geometry.__geo_interface__}
+        for _, row in gdf.iterrows()
+    ]
+    if missing is None:
+        missing = {lga['lga_name']: weeks for lga in lgas}
+    
+    print(f"\nBatch processing {len(lgas)} LGAs x {len(weeks)} weeks...", flush=True)
+    
+    print("  Extracting static features...", flush=True)
+    static_features = {}
+    if static_store is not None:
+        for lga in lgas:
+            cached = static_store.get(lga['geometry'])
+            if cached is not None:
+                static_features[lga['lga_name']] = cached
+    
+    uncached = [lga for lga in lgas if lga['lga_name'] not in static_features]
+    if uncached:
+        for lga, features in zip(uncached, extractor.extract_static(uncached)):
+            static_features[lga['lga_name']] = features
+            if static_store is not None:
+                static_store.put(lga['geometry'], features)
+    
+    def checkpoint(records):
+        for record in records:
+            record.update(static_features[record['lga_name']])
+        if store is not None:
+            store.append(records)
+    
+    groups = {}
+    for lga in lgas:
+        lga_weeks = missing[lga['lga_name']]
+        groups.setdefault(tuple(lga_weeks), (lga_weeks, []))[1].append(lga)
+    
+    results = {lga['lga_name']: [] for lga in lgas}
+    n_records = 0
+    for group_weeks, group_lgas in groups.values():
+        if len(group_weeks) == 0:
+            continue
+        print(f"  Extracting {len(group_weeks)} weeks for {len(group_lgas)} LGAs...", flush=True)
+        for record in extractor.extract_weeks(group_lgas, group_weeks, on_records=checkpoint):
+            results[record['lga_name']].append(record)
+            n_records += 1
+    
+    print(f"  [OK] {n_records} LGA-weeks extracted in {extractor.request_count} requests", flush=True)
     return results
 
-def main():
-    """Main extraction with CHECKPOINTS"""
+def main(batch=False, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, extend_to=None):
+    """
+    Main extraction with CHECKPOINTS
+    
+    Parameters:
+    -----------
+    batch : bool
+        Extract all pending LGAs together with batched reduceRegions requests
+        (many weeks per request) instead of per-LGA, per-week calls
+    concurrency : int
+        Maximum GEE requests in flight at once
+    rate : float
+        Maximum GEE requests per second
+    extend_to : str, optional
+        Extend the week range forward to this date ('today' for the current
+        date); only weeks not already checkpointed are fetched
+    """
     print("="*70, flush=True)
     print("WEEKLY ENVIRONMENTAL DATA EXTRACTION (WITH CHECKPOINTS)", flush=True)
     print("="*70, flush=True)
@@ -161,9 +262,14 @@ def main():
     
     # Initialize
     initialize_gee(service_account_key)
+    scheduler = RequestScheduler(concurrency=concurrency, rate=rate)
     
     # Get info
     start_date, end_date, affected_states, affected_lgas = get_epi_info(epi_file)
+    if extend_to is not None:
+        extend_date = pd.Timestamp.today().normalize() if extend_to == 'today' else pd.Timestamp(extend_to)
+        end_date = max(end_date, extend_date)
+        print(f"Extending to: {end_date.date()}", flush=True)
     
     # Load shapefile
     print("Loading shapefile...", flush=True)
@@ -189,32 +295,41 @@ def main():
     weeks = pd.date_range(start=start_date, end=end_date, freq='W-SUN')
     print(f"Processing {len(weeks)} weeks\n", flush=True)
     
-    # Process each LGA and save checkpoint
-    all_results = []
+    # Week-level checkpoints: every extracted (LGA, week) is committed at once
+    store = WeeklyCheckpointStore(output_dir / "weekly_checkpoints.sqlite")
+    static_store = StaticFeatureStore(output_dir / "static_features.sqlite")
     
-    for idx, row in gdf.iterrows():
-        lga_name = row[lga_col]
-        
-        # Check if checkpoint exists
+    # Migrate legacy per-LGA Excel checkpoints
+    for lga_name in gdf[lga_col]:
         checkpoint_file = output_dir / f"checkpoint_{lga_name}.xlsx"
-        
-        if checkpoint_file.exists():
-            print(f"\n[SKIP] {lga_name} - checkpoint exists", flush=True)
-            df_checkpoint = pd.read_excel(checkpoint_file)
-            all_results.extend(df_checkpoint.to_dict('records'))
-            continue
-        
-        # Process LGA
-        lga_results = process_one_lga(row, weeks, lga_col, state_col)
-        all_results.extend(lga_results)
-        
-        # Save checkpoint
-        df_checkpoint = pd.DataFrame(lga_results)
-        df_checkpoint.to_excel(checkpoint_file, index=False)
-        print(f"  [CHECKPOINT SAVED] {checkpoint_file.name}", flush=True)
+        if checkpoint_file.exists() and not store.has_lga(lga_name):
+            n = store.import_excel_checkpoint(checkpoint_file)
+            print(f"[IMPORTED] {checkpoint_file.name} ({n} weeks)", flush=True)
+    
+    # Only (LGA, week) keys without a checkpoint are extracted
+    missing = {lga_name: store.missing_weeks(lga_name, weeks) for lga_name in gdf[lga_col]}
+    print(f"Missing LGA-weeks: {sum(len(w) for w in missing.values())} of {len(gdf) * len(weeks)}", flush=True)
+    
+    pending = gdf[[len(missing[name]) > 0 for name in gdf[lga_col]]]
+    
+    if batch:
+        if len(pending):
+            process_lgas_batched(pending, weeks, lga_col, state_col, scheduler=scheduler,
+                                 store=store, missing=missing, static_store=static_store)
+    else:
+        for idx, row in gdf.iterrows():
+            lga_name = row[lga_col]
+            
+            if len(missing[lga_name]) == 0:
+                print(f"\n[SKIP] {lga_name} - all weeks checkpointed", flush=True)
+                continue
+            
+            process_one_lga(row, missing[lga_name], lga_col, state_col, scheduler, store, static_store)
     
     # Save final results
-    df_final = pd.DataFrame(all_results)
+    df_final = store.load(gdf[lga_col].tolist(), weeks)
+    store.close()
+    static_store.close()
     
     # Reorder columns
     cols = ['lga_name', 'state_name', 'week_start', 'week_end', 'year', 'epi_week',
@@ -222,8 +337,7 @@ def main():
             'precipitation_total', 'lst_day_mean', 'lst_night_mean', 'ndvi_mean']
     df_final = df_final[cols]
     
-    output_file = output_dir / f"environmental_weekly_data_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.xlsx"
-    df_final.to_excel(output_file, index=False)
+    output_file = write_table(df_final, output_dir / f"environmental_weekly_data_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.parquet")
     
     print("\n" + "="*70, flush=True)
     print("EXTRACTION COMPLETE!", flush=True)
@@ -236,4 +350,14 @@ def main():
     return df_final
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Weekly environmental data extraction with checkpoints')
+    parser.add_argument('--batch', action='store_true',
+                        help='Use batched reduceRegions requests (many LGAs and weeks per request)')
+    parser.add_argument('--extend-to', default=None,
+                        help="Extend the week range forward to this date (YYYY-MM-DD or 'today')")
+    add_scheduler_arguments(parser)
+    args = parser.parse_args()
+    
+    main(batch=args.batch, concurrency=args.concurrency, rate=args.rate, extend_to=args.extend_to)
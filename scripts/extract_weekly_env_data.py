@@ -9,6 +9,12 @@ import pandas as pd
 from pathlib import Path
 from datetime import datetime
 import sys
+from gee_scheduler import RequestScheduler, add_scheduler_arguments, DEFAULT_CONCURRENCY, DEFAULT_RATE
+from static_features import StaticFeatureStore, get_static_features
+
+# Project root holds the shared storage module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from storage import write_table
 
 def initialize_gee(service_account_key):
     """Initialize Google Earth Engine"""
@@ -59,41 +65,7 @@ def get_epi_info(epi_file):
     
     return start_date, end_date, affected_states, affected_lgas
 
-def extract_static_features_once(geometry):
-    """Extract static features (elevation, slope, aspect) - only once per LGA"""
-    try:
-        dem = ee.Image("USGS/SRTMGL1_003")
-        
-        elev = dem.reduceRegion(
-            reducer=ee.Reducer.mean(),
-            geometry=geometry,
-            scale=90,
-            maxPixels=1e9
-        ).getInfo()
-        
-        slope = ee.Terrain.slope(dem).reduceRegion(
-            reducer=ee.Reducer.mean(),
-            geometry=geometry,
-            scale=90,
-            maxPixels=1e9
-        ).getInfo()
-        
-        aspect = ee.Terrain.aspect(dem).reduceRegion(
-            reducer=ee.Reducer.mean(),
-            geometry=geometry,
-            scale=90,
-            maxPixels=1e9
-        ).getInfo()
-        
-        return {
-            'elevation_mean': elev.get('elevation', 0) or 0,
-            'slope_mean': slope.get('slope', 0) or 0,
-            'aspect_mean': aspect.get('aspect', 0) or 0
-        }
-    except:
-        return {'elevation_mean': 0, 'slope_mean': 0, 'aspect_mean': 0}
-
-def extract_weekly_data(geometry, week_start, week_end):
+def extract_weekly_data(geometry, week_start, week_end, scheduler):
     """Extract all environmental data for one week - BATCH OPTIMIZED"""
     
     start_str = week_start.strftime('%Y-%m-%d')
@@ -121,12 +93,12 @@ def extract_weekly_data(geometry, week_start, week_end):
         precip_total = precip.sum()
         precip_mean_img = precip.mean()
         
-        precip_stats = precip_total.addBands(precip_mean_img).reduceRegion(
+        precip_stats = scheduler.get_info(precip_total.addBands(precip_mean_img).reduceRegion(
             reducer=ee.Reducer.mean(),
             geometry=geometry,
             scale=5566,
             maxPixels=1e9
-        ).getInfo()
+        ))
         
         result['precipitation_total'] = precip_stats.get('precipitation', 0) or 0
         result['precipitation_mean'] = precip_stats.get('precipitation_1', 0) or 0
@@ -138,12 +110,12 @@ def extract_weekly_data(geometry, week_start, week_end):
             .mean() \
             .multiply(0.02).subtract(273.15)
         
-        lst_stats = lst.reduceRegion(
+        lst_stats = scheduler.get_info(lst.reduceRegion(
             reducer=ee.Reducer.mean(),
             geometry=geometry,
             scale=1000,
             maxPixels=1e9
-        ).getInfo()
+        ))
         
         result['lst_day_mean'] = lst_stats.get('LST_Day_1km', 0) or 0
         result['lst_night_mean'] = lst_stats.get('LST_Night_1km', 0) or 0
@@ -155,12 +127,12 @@ def extract_weekly_data(geometry, week_start, week_end):
             .mean() \
             .multiply(0.0001)
         
-        ndvi_stats = ndvi.reduceRegion(
+        ndvi_stats = scheduler.get_info(ndvi.reduceRegion(
             reducer=ee.Reducer.mean(),
             geometry=geometry,
             scale=1000,
             maxPixels=1e9
-        ).getInfo()
+        ))
         
         result['ndvi_mean'] = ndvi_stats.get('NDVI', 0) or 0
         
@@ -171,15 +143,15 @@ def extract_weekly_data(geometry, week_start, week_end):
                 .filterBounds(geometry) \
                 .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 30))
             
-            count = s2.size().getInfo()
+            count = scheduler.get_info(s2.size())
             if count > 0:
                 ndwi = s2.map(lambda img: img.normalizedDifference(['B3', 'B8'])).mean()
-                ndwi_stats = ndwi.reduceRegion(
+                ndwi_stats = scheduler.get_info(ndwi.reduceRegion(
                     reducer=ee.Reducer.mean(),
                     geometry=geometry,
                     scale=20,
                     maxPixels=1e9
-                ).getInfo()
+                ))
                 result['ndwi_mean'] = ndwi_stats.get('nd', 0) or 0
         except:
             pass
@@ -194,7 +166,7 @@ def extract_weekly_data(geometry, week_start, week_end):
     
     return result
 
-def main():
+def main(concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE):
     """Main extraction - WEEKLY VERSION FOR EPI PREDICTIONS"""
     print("="*70, flush=True)
     print("WEEKLY ENVIRONMENTAL DATA EXTRACTION (EPI WEEK ALIGNED)", flush=True)
@@ -213,6 +185,8 @@ def main():
     
     # Initialize
     initialize_gee(service_account_key)
+    scheduler = RequestScheduler(concurrency=concurrency, rate=rate)
+    static_store = StaticFeatureStore(output_dir / "static_features.sqlite")
     
     # Get info from epi data
     start_date, end_date, affected_states, affected_lgas = get_epi_info(epi_file)
@@ -263,24 +237,27 @@ def main():
         geom_json = row.geometry.__geo_interface__
         ee_geometry = ee.Geometry(geom_json)
         
-        # Extract static features once
+        # Static features (fetched from GEE only on a store miss)
         print("  Extracting static features...", flush=True)
-        static_features = extract_static_features_once(ee_geometry)
+        static_features = get_static_features(geom_json, scheduler, static_store)
         
-        # Process each week
+        # Process weeks concurrently (results keep week order)
         print(f"  Extracting {len(weeks)} weeks...", flush=True)
-        for i, week_end in enumerate(weeks):
+        
+        def extract_week(item):
+            i, week_end = item
             week_start = week_end - pd.Timedelta(days=6)
             
             if i % 52 == 0:
                 print(f"    Year {week_start.year}...", flush=True)
             
-            weekly_data = extract_weekly_data(ee_geometry, week_start, week_end)
+            weekly_data = extract_weekly_data(ee_geometry, week_start, week_end, scheduler)
             weekly_data['lga_name'] = lga_name
             weekly_data['state_name'] = state_name
             weekly_data.update(static_features)
-            
-            all_results.append(weekly_data)
+            return weekly_data
+        
+        all_results.extend(scheduler.map(extract_week, enumerate(weeks)))
         
         print(f"  [OK] {len(weeks)} weeks extracted", flush=True)
     
@@ -294,8 +271,7 @@ def main():
             'lst_day_mean', 'lst_night_mean', 'ndvi_mean', 'ndwi_mean']
     df = df[cols]
     
-    output_file = output_dir / f"environmental_weekly_data_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.xlsx"
-    df.to_excel(output_file, index=False)
+    output_file = write_table(df, output_dir / f"environmental_weekly_data_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.parquet")
     
     print("\n" + "="*70, flush=True)
     print("EXTRACTION COMPLETE!", flush=True)
@@ -311,4 +287,10 @@ def main():
     return df
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Weekly environmental data extraction')
+    add_scheduler_arguments(parser)
+    args = parser.parse_args()
+    
+    main(concurrency=args.concurrency, rate=args.rate)
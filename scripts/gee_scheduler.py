@@ -0,0 +1,145 @@
+"""
+GEE Request Scheduler
+Runs getInfo() requests concurrently under a concurrency cap and a
+token-bucket rate limit, retrying quota / 429 errors with exponential backoff
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 10.0  # requests per second
+
+# Error messages that indicate throttling or a transient backend failure
+RETRYABLE_MARKERS = [
+    '429',
+    'too many requests',
+    'too many concurrent',
+    'quota',
+    'rate limit',
+    'resource exhausted',
+    'resource_exhausted',
+    '503',
+    'service unavailable',
+    'deadline exceeded',
+    'timed out',
+]
+
+def is_retryable(error):
+    """True for quota, throttling and transient server errors"""
+    message = str(error).lower()
+    return any(marker in message for marker in RETRYABLE_MARKERS)
+
+# Error messages that mean the period simply has no imagery
+NO_DATA_MARKERS = [
+    'no bands',
+    'did not match any bands',
+    'empty collection',
+    'collection is empty',
+]
+
+def is_no_data(error):
+    """True for errors raised because an image or collection has no data"""
+    message = str(error).lower()
+    return any(marker in message for marker in NO_DATA_MARKERS)
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                # Tolerance: after sleeping exactly the wait, rounding can
+                # leave the bucket a hair short of a whole token
+                if self.tokens >= 1 - 1e-9:
+                    self.tokens = max(0.0, self.tokens - 1)
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+class RequestScheduler:
+    """
+    Shared scheduler for GEE requests
+
+    - call(fn): run one request in the calling thread, rate limited, with
+      exponential backoff (plus jitter) on retryable errors
+    - get_info(obj): call(obj.getInfo)
+    - map(fn, items): run fn over items on a thread pool of `concurrency`
+      workers, preserving input order
+
+    fn passed to map may itself use call()/get_info(); those run inline in the
+    worker thread, so the pool never waits on itself. Any callable can be
+    scheduled, so a fake client that injects latency and throttling errors
+    exercises the same code paths offline; sleep and clock are injectable
+    so backoff and rate limiting can be checked without waiting.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, burst=None,
+                 max_retries=5, base_delay=1.0, max_delay=60.0, sleep=time.sleep,
+                 clock=time.monotonic):
+        self.concurrency = max(1, concurrency)
+        self.limiter = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.request_count = 0
+        self.retry_count = 0
+        self._count_lock = threading.Lock()
+
+    def call(self, fn, *args, **kwargs):
+        """Run one request with rate limiting and retry/backoff"""
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            with self._count_lock:
+                self.request_count += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+                delay *= random.uniform(0.5, 1.0)
+                with self._count_lock:
+                    self.retry_count += 1
+                print(f"      [RETRY] {e} - backing off {delay:.1f}s", flush=True)
+                self.sleep(delay)
+                attempt += 1
+
+    def get_info(self, obj):
+        """Scheduled obj.getInfo()"""
+        return self.call(obj.getInfo)
+
+    def map(self, fn, items):
+        """Apply fn to every item concurrently; results keep input order"""
+        items = list(items)
+        if self.concurrency == 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(fn, items))
+
+def add_scheduler_arguments(parser):
+    """Add --concurrency / --rate options to an extractor's argument parser"""
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Concurrent GEE requests (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help=f'Maximum GEE requests per second (default: {DEFAULT_RATE})')
+    return parser
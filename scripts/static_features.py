@@ -0,0 +1,120 @@
+"""
+Persistent Static Terrain Features
+Elevation, slope and aspect never change, so they are fetched from GEE once
+per LGA geometry and dataset and reused by every extractor and run
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+
+DEM_DATASET = "USGS/SRTMGL1_003"
+TERRAIN_SCALE = 90
+
+STATIC_DEFAULTS = {'elevation_mean': 0, 'slope_mean': 0, 'aspect_mean': 0}
+
+def geometry_hash(geom_json):
+    """SHA-1 of a GeoJSON geometry (e.g. shapely's __geo_interface__)"""
+    payload = json.dumps(geom_json, sort_keys=True, default=list)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+class StaticFeatureStore:
+    """
+    SQLite store of static features keyed by (geometry hash, dataset ID)
+
+    A changed LGA boundary or a different DEM misses; everything else is
+    served locally. Safe to use from scheduler worker threads.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS static_features ("
+            "geometry_hash TEXT NOT NULL, dataset_id TEXT NOT NULL, features TEXT NOT NULL, "
+            "PRIMARY KEY (geometry_hash, dataset_id))"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, geom_json, dataset_id=DEM_DATASET):
+        """Stored features for a geometry, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT features FROM static_features WHERE geometry_hash = ? AND dataset_id = ?",
+                (geometry_hash(geom_json), dataset_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, geom_json, features, dataset_id=DEM_DATASET):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO static_features (geometry_hash, dataset_id, features) VALUES (?, ?, ?)",
+                (geometry_hash(geom_json), dataset_id, json.dumps(features))
+            )
+            self.conn.commit()
+
+    def get_or_compute(self, geom_json, compute, dataset_id=DEM_DATASET):
+        """
+        Static features for a geometry, calling compute() only on a miss
+
+        compute() returns the features dict, or None on failure (failures
+        fall back to zeros and are not stored, so the next run retries)
+        """
+        features = self.get(geom_json, dataset_id)
+        if features is not None:
+            return features
+
+        features = compute()
+        if features is None:
+            return dict(STATIC_DEFAULTS)
+        self.put(geom_json, features, dataset_id)
+        return features
+
+def fetch_terrain_features(ee_geometry, scheduler, ee_module=None):
+    """
+    Elevation, slope and aspect means in one reduceRegion request
+
+    Returns:
+    --------
+    dict (elevation_mean, slope_mean, aspect_mean), or None if the request fails
+    """
+    if ee_module is None:
+        import ee as ee_module
+    ee = ee_module
+
+    try:
+        dem = ee.Image(DEM_DATASET)
+        terrain = dem.select(['elevation']) \
+            .addBands(ee.Terrain.slope(dem)) \
+            .addBands(ee.Terrain.aspect(dem))
+        stats = scheduler.get_info(terrain.reduceRegion(
+            reducer=ee.Reducer.mean(),
+            geometry=ee_geometry,
+            scale=TERRAIN_SCALE,
+            maxPixels=1e9
+        ))
+        return {
+            'elevation_mean': stats.get('elevation', 0) or 0,
+            'slope_mean': stats.get('slope', 0) or 0,
+            'aspect_mean': stats.get('aspect', 0) or 0
+        }
+    except Exception as e:
+        print(f"      Static features error: {e}", flush=True)
+        return None
+
+def get_static_features(geom_json, scheduler, store=None, ee_module=None):
+    """Static features for one LGA from the store, fetching from GEE on a miss"""
+    if ee_module is None:
+        import ee as ee_module
+
+    def compute():
+        return fetch_terrain_features(ee_module.Geometry(geom_json), scheduler, ee_module)
+
+    if store is None:
+        return compute() or dict(STATIC_DEFAULTS)
+    return store.get_or_compute(geom_json, compute)
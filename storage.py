@@ -0,0 +1,223 @@
+"""
+Pipeline Table Storage
+Typed Parquet is the canonical format for tables passed between pipeline
+stages; Excel is only written as an optional export for people to open
+"""
+
+import hashlib
+import io
+import os
+import shutil
+from pathlib import Path
+import pandas as pd
+
+TABLE_SUFFIX = ".parquet"
+
+# Older runs wrote these; read_table falls back to them when no Parquet exists
+LEGACY_SUFFIXES = [".xlsx", ".csv"]
+
+# Set CHOLERA_EXPORT_EXCEL=1 to also write an .xlsx copy of every stage table
+EXPORT_EXCEL_ENV = "CHOLERA_EXPORT_EXCEL"
+
+def excel_export_enabled():
+    """Whether stage tables should also be exported to Excel"""
+    return os.environ.get(EXPORT_EXCEL_ENV, "").strip().lower() in ("1", "true", "yes")
+
+def table_path(path):
+    """Canonical Parquet path for a table (any suffix is replaced)"""
+    return Path(path).with_suffix(TABLE_SUFFIX)
+
+def find_table(path):
+    """
+    Existing file for a table: the Parquet file if present, otherwise a
+    legacy .xlsx/.csv with the same stem; None if neither exists
+    """
+    path = table_path(path)
+    if path.exists():
+        return path
+    for suffix in LEGACY_SUFFIXES:
+        legacy = path.with_suffix(suffix)
+        if legacy.exists():
+            return legacy
+    return None
+
+def table_exists(path):
+    return find_table(path) is not None
+
+def file_signature(path):
+    """
+    (path, inode, mtime, size) of a file or table directory, or None if it
+    does not exist
+
+    Rewriting a file or swapping in a new partitioned table directory changes
+    the signature, so it can key caches of the parsed contents.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return (str(path), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def _arrow_safe(df):
+    """Cast mixed-type object columns (common after Excel reads) to string"""
+    mixed = [
+        col for col in df.columns
+        if df[col].dtype == object
+        and pd.api.types.infer_dtype(df[col], skipna=True) in ("mixed", "mixed-integer")
+    ]
+    if not mixed:
+        return df
+    df = df.copy()
+    for col in mixed:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+def write_table(df, path, export_excel=None):
+    """
+    Write a stage table as Parquet
+
+    Parameters:
+    -----------
+    df : DataFrame
+        Table to write (the index is not stored)
+    path : Path
+        Table path; the suffix is replaced with .parquet
+    export_excel : bool, optional
+        Also write an .xlsx copy next to it (default: CHOLERA_EXPORT_EXCEL)
+
+    Returns:
+    --------
+    Path of the Parquet file
+    """
+    path = table_path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_suffix(".parquet.tmp")
+    _arrow_safe(df).to_parquet(tmp_path, index=False)
+    if path.is_dir():
+        shutil.rmtree(path)
+    tmp_path.replace(path)
+
+    if export_excel is None:
+        export_excel = excel_export_enabled()
+    if export_excel:
+        df.to_excel(path.with_suffix(".xlsx"), index=False)
+
+    return path
+
+def read_table(path, columns=None):
+    """
+    Read a stage table written by write_table (or a legacy .xlsx/.csv)
+
+    Parameters:
+    -----------
+    path : Path
+        Table path; the suffix is ignored
+    columns : list, optional
+        Only read these columns
+
+    Returns:
+    --------
+    DataFrame
+    """
+    found = find_table(path)
+    if found is None:
+        raise FileNotFoundError(f"No table found for {table_path(path)}")
+
+    if found.suffix == TABLE_SUFFIX:
+        return pd.read_parquet(found, columns=columns)
+    if found.suffix == ".xlsx":
+        return pd.read_excel(found, usecols=columns)
+    return pd.read_csv(found, usecols=columns)
+
+class PartitionedTableWriter:
+    """
+    Write a stage table one partition at a time
+
+    The table is a directory of part-NNNNN.parquet files (read back by
+    read_table like a single file). Parts go to a temporary directory that
+    replaces the old table on close(), so readers never see a half-written
+    table. Use as a context manager.
+    """
+
+    def __init__(self, path):
+        self.path = table_path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_suffix(".parquet.tmp")
+        if self.tmp_path.is_dir():
+            shutil.rmtree(self.tmp_path)
+        elif self.tmp_path.exists():
+            self.tmp_path.unlink()
+        self.tmp_path.mkdir()
+        self.n_parts = 0
+        self.n_rows = 0
+
+    def write(self, df):
+        """Append one partition"""
+        if len(df) == 0:
+            return
+        _arrow_safe(df).to_parquet(self.tmp_path / f"part-{self.n_parts:05d}.parquet", index=False)
+        self.n_parts += 1
+        self.n_rows += len(df)
+
+    def close(self):
+        if self.path.is_dir():
+            shutil.rmtree(self.path)
+        elif self.path.exists():
+            self.path.unlink()
+        self.tmp_path.replace(self.path)
+        return self.path
+
+    def abort(self):
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+def partition_values(path, column):
+    """Distinct values of a column, reading only that column"""
+    return sorted(read_table(path, columns=[column])[column].dropna().unique().tolist())
+
+def read_partition(path, column, values):
+    """
+    Rows of a table whose `column` is in `values`
+
+    Parquet tables are filtered while reading, so only matching rows are
+    materialised; legacy Excel/CSV tables are read whole and filtered.
+    """
+    found = find_table(path)
+    if found is None:
+        raise FileNotFoundError(f"No table found for {table_path(path)}")
+    values = list(values)
+
+    if found.suffix == TABLE_SUFFIX:
+        return pd.read_parquet(found, filters=[(column, "in", values)])
+    df = read_table(found)
+    return df[df[column].isin(values)].reset_index(drop=True)
+
+def frame_fingerprint(df, columns=None):
+    """
+    Short content hash of a table (or some of its columns)
+
+    Identical data gives the same fingerprint regardless of row order, so it
+    identifies the dataset a model or search was run on.
+    """
+    if columns is not None:
+        df = df[list(columns)]
+    row_hashes = pd.util.hash_pandas_object(df, index=False).sort_values().values
+    digest = hashlib.sha1(row_hashes.tobytes())
+    digest.update(",".join(map(str, df.columns)).encode())
+    return digest.hexdigest()[:16]
+
+def to_excel_bytes(df):
+    """Excel workbook for a table as bytes (for on-demand downloads)"""
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
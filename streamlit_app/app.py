@@ -5,7 +5,6 @@ Interactive dashboard for cholera outbreak prediction
 
 import streamlit as st
 import pandas as pd
-import geopandas as gpd
 import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
@@ -22,11 +21,26 @@ from pipeline_runner import (
     get_pdf_report_file,
     get_epi_data_file,
     get_shapefile,
+    get_latest_model,
+    get_server_status,
+    request_forecast,
     save_uploaded_data,
+    run_incremental_merge,
     PARENT_DIR,
     DATA_DIR,
     PREDICTIONS_DIR
 )
+from storage import find_table
+from data_cache import (
+    load_table,
+    load_predictions,
+    epi_summary,
+    table_excel_bytes,
+    load_lga_registry,
+    load_map_geometry,
+)
+from map_geometry import level_for_zoom
+from map_render import hover_data, hover_template
 
 # For compatibility
 parent_dir = PARENT_DIR
@@ -108,12 +122,10 @@ def main():
         try:
             epi_file = get_epi_data_file()
             if epi_file and epi_file.exists():
-                df_epi = pd.read_excel(epi_file)
-                st.metric("Total Cases", len(df_epi))
-                # Try to find LGA column
-                lga_cols = [col for col in df_epi.columns if 'lga' in col.lower()]
-                if lga_cols:
-                    st.metric("LGAs Affected", df_epi[lga_cols[0]].nunique())
+                stats = epi_summary(epi_file)
+                st.metric("Total Cases", stats['total_cases'])
+                if stats['lgas_affected'] is not None:
+                    st.metric("LGAs Affected", stats['lgas_affected'])
         except:
             st.info("Load data to see stats")
     
@@ -143,8 +155,8 @@ def show_dashboard():
             st.rerun()
         return
     
-    # Load data
-    df_pred = pd.read_excel(predictions_file)
+    # Load data (cached until the file changes)
+    df_pred = load_predictions(predictions_file)
     
     # Metrics row
     col1, col2, col3, col4 = st.columns(4)
@@ -157,7 +169,7 @@ def show_dashboard():
         high_risk = (df_pred['risk_category'] == 'Very High').sum()
         st.metric("High Risk Periods", high_risk)
     with col4:
-        lgas = df_pred['lga_name'].nunique()
+        lgas = df_pred['lga_id'].nunique()
         st.metric("LGAs Covered", lgas)
     
     # Interactive Map
@@ -170,7 +182,7 @@ def show_dashboard():
     with col2:
         map_style = st.selectbox("Map Style:", ["Light", "Dark", "Street", "Satellite"], index=0)
     with col3:
-        st.metric("LGAs Displayed", df_pred['lga_name'].nunique())
+        st.metric("LGAs Displayed", df_pred['lga_id'].nunique())
     
     show_interactive_map(df_pred, map_style)
     
@@ -205,46 +217,28 @@ def show_interactive_map(df_pred, map_style="Light"):
         if not shapefile.exists():
             st.error(f"Shapefile not found: {shapefile}")
             return
-            
-        gdf = gpd.read_file(shapefile)
         
-        # Find LGA column
-        lga_cols = [col for col in gdf.columns if 'lganame' in col.lower()]
-        if not lga_cols:
-            st.error("No LGA column found in shapefile")
-            return
-            
-        lga_col = lga_cols[0]
-        gdf[lga_col] = gdf[lga_col].str.strip().str.title()
+        # Prepared geometry: simplified GeoJSON per detail level, centroids
+        # and bounds (built once, cached until the shapefile changes)
+        geometry = load_map_geometry(shapefile)
         
         # Aggregate predictions by LGA
-        lga_summary = df_pred.groupby('lga_name').agg({
+        lga_summary = df_pred.groupby('lga_id').agg({
             'case_count': 'sum',
             'predicted_cases': 'sum'
         }).reset_index()
         
-        # Merge with shapefile
-        gdf = gdf.merge(lga_summary, left_on=lga_col, right_on='lga_name', how='left')
+        # Join values to the LGAs by integer id
+        gdf = geometry.lgas[['lga_id', 'lga_name']].merge(lga_summary, on='lga_id', how='left')
         
         # Fill NaN values
         gdf['predicted_cases'] = gdf['predicted_cases'].fillna(0)
         gdf['case_count'] = gdf['case_count'].fillna(0)
         
-        # Convert to WGS84
-        if gdf.crs is None:
-            st.warning("Shapefile has no CRS, assuming WGS84")
-            gdf = gdf.set_crs(epsg=4326)
-        elif gdf.crs.to_epsg() != 4326:
-            gdf = gdf.to_crs(epsg=4326)
-        
-        # Get center point
-        centroid = gdf.geometry.unary_union.centroid
-        center_lat = centroid.y
-        center_lon = centroid.x
-        
-        # Create GeoJSON format for Plotly
-        import json
-        geojson = json.loads(gdf.to_json())
+        # Frame the LGAs with predictions; draw them and their surroundings
+        # at the detail of that zoom and the rest of the country coarsely
+        (center_lat, center_lon), zoom = geometry.view(lga_summary['lga_id'])
+        geojson = geometry.geojson(level_for_zoom(zoom), bounds=geometry.bounds(lga_summary['lga_id']))
         
         # Create custom color scale (better visibility)
         colorscale = [
@@ -258,24 +252,16 @@ def show_interactive_map(df_pred, map_style="Light"):
             [1, '#bd0026']       # Dark red (highest cases)
         ]
         
-        # Prepare hover text with more details
-        hover_text = []
-        for idx, row in gdf.iterrows():
-            text = f"<b>{row[lga_col]}</b><br>"
-            text += f"Predicted Cases: {row['predicted_cases']:.1f}<br>"
-            text += f"Actual Cases: {row['case_count']:.0f}<br>"
-            text += f"<extra></extra>"
-            hover_text.append(text)
-        
         # Create choropleth using go.Choroplethmapbox
         fig = go.Figure(go.Choroplethmapbox(
             geojson=geojson,
-            locations=gdf.index,
+            locations=gdf['lga_id'],
             z=gdf['predicted_cases'],
             colorscale=colorscale,
-            text=gdf[lga_col],
-            hovertext=hover_text,
-            hovertemplate='%{hovertext}',
+            text=gdf['lga_name'],
+            # Hover text is formatted in the browser from the raw columns
+            customdata=hover_data(gdf),
+            hovertemplate=hover_template(),
             marker_opacity=0.8,
             marker_line_width=2,
             marker_line_color='rgba(255, 255, 255, 0.9)',
@@ -299,7 +285,7 @@ def show_interactive_map(df_pred, map_style="Light"):
             mapbox=dict(
                 style=mapbox_style,
                 center=dict(lat=center_lat, lon=center_lon),
-                zoom=6.5,
+                zoom=zoom,
             ),
             height=650,
             margin={"r":0,"t":30,"l":0,"b":0},
@@ -417,7 +403,9 @@ def show_risk_distribution(df_pred):
 def show_lga_distribution(df_pred):
     """Cases by LGA"""
     try:
-        lga_cases = df_pred.groupby('lga_name')['case_count'].sum().sort_values(ascending=True)
+        lga_cases = df_pred.groupby('lga_id')['case_count'].sum()
+        lga_cases.index = load_lga_registry().decode(lga_cases.index)
+        lga_cases = lga_cases.sort_values(ascending=True)
         
         fig = px.bar(
             x=lga_cases.values,
@@ -477,6 +465,14 @@ def show_upload_page():
                         st.success(f"✅ {message}")
                         if backup_file:
                             st.info(f"📦 Backup created: {backup_file.name}")
+                        
+                        # Bring the merged dataset up to date with the new weeks
+                        with st.spinner("Updating merged dataset..."):
+                            merged, _, merge_error = run_incremental_merge()
+                        if merged:
+                            st.success("✅ Merged dataset updated")
+                        else:
+                            st.warning(f"⚠️ Merged dataset not updated: {merge_error}")
                         st.balloons()
                         
                         st.markdown("### Next Steps")
@@ -622,6 +618,11 @@ def show_results_page():
         st.warning("⚠️ No results available. Please run the pipeline first.")
         return
     
+    bundle = get_latest_model()
+    if bundle is not None:
+        st.caption(f"Model: {bundle.manifest.get('model_name')} · version {bundle.version}"
+                   f" · trained {bundle.manifest.get('created', 'unknown')}")
+    
     # Tabs for different views
     tab1, tab2, tab3, tab4 = st.tabs(["📊 Predictions", "🔮 Future Forecast", "📄 PDF Report", "📥 Downloads"])
     
@@ -642,7 +643,7 @@ def show_predictions_table():
     st.subheader("All Predictions")
     
     predictions_file = get_predictions_file()
-    df = pd.read_excel(predictions_file)
+    df = load_table(predictions_file)
     
     # Filters
     col1, col2 = st.columns(2)
@@ -677,16 +678,25 @@ def show_predictions_table():
         st.metric("Total Predicted", f"{df_filtered['predicted_cases'].sum():.0f}")
 
 def show_future_forecast():
-    """Show 12-week future forecast"""
+    """Show future forecast (live from the prediction server when it is running)"""
     st.subheader("🔮 12-Week Future Forecast")
     
-    future_file = get_future_predictions_file()
-    
-    if not future_file.exists():
-        st.warning("Future forecast not available")
-        return
+    live = None
+    if get_server_status() is not None:
+        horizon = st.slider("Forecast horizon (weeks)", min_value=1, max_value=26, value=12)
+        live = request_forecast(horizon)
     
-    df_future = pd.read_excel(future_file)
+    if live is not None:
+        version, df_future = live
+        st.caption(f"Live forecast from the prediction server (model version {version})")
+    else:
+        future_file = get_future_predictions_file()
+        
+        if not future_file.exists():
+            st.warning("Future forecast not available")
+            return
+        
+        df_future = load_table(future_file)
     
     # Check available columns
     available_cols = df_future.columns.tolist()
@@ -752,11 +762,29 @@ def show_downloads():
     """Downloads section"""
     st.subheader("📥 Download Files")
     
+    # Stage tables are stored as Parquet; Excel copies are built on demand
+    excel_mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    tables = [
+        ("predictions/cholera_predictions.parquet", "Complete Predictions (Excel)"),
+        ("predictions/future_predictions_12weeks.parquet", "12-Week Forecast (Excel)"),
+        ("merged_data/cholera_merged_dataset.parquet", "Complete Dataset (Excel)"),
+    ]
+    
+    for file_path, label in tables:
+        table_file = find_table(parent_dir / file_path)
+        if table_file is not None:
+            st.download_button(
+                label=f"📥 {label}",
+                data=table_excel_bytes(table_file),
+                file_name=f"{table_file.stem}.xlsx",
+                mime=excel_mime,
+                key=file_path
+            )
+        else:
+            st.info(f"{label} - Not available yet")
+    
     files = [
-        ("predictions/cholera_predictions.xlsx", "Complete Predictions (Excel)", "application/vnd.ms-excel"),
-        ("predictions/future_predictions_12weeks.xlsx", "12-Week Forecast (Excel)", "application/vnd.ms-excel"),
         ("predictions/Cholera_Prediction_Report_Complete.pdf", "PDF Report", "application/pdf"),
-        ("merged_data/cholera_merged_dataset.csv", "Complete Dataset (CSV)", "text/csv"),
         ("model_output/model_results.csv", "Model Performance", "text/csv"),
     ]
     
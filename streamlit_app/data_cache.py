@@ -0,0 +1,108 @@
+"""
+Cached Data Access
+Parsed tables, the LGA registry and the map geometry for the Streamlit
+app, cached across reruns and keyed on each source file's path, inode,
+mtime and size: widget interactions never re-parse Excel files or
+shapefiles, and a rewritten file is picked up on the next rerun
+"""
+
+from pathlib import Path
+import pandas as pd
+import streamlit as st
+from pipeline_runner import PARENT_DIR, get_shapefile, get_lga_registry
+from storage import read_table, find_table, file_signature, to_excel_bytes
+from panel_index import add_panel_index
+from map_geometry import load_geometry
+
+# Versions of each cached item kept at once (older file signatures age out)
+MAX_ENTRIES = 4
+
+REGISTRY_FILE = PARENT_DIR / "cache" / "lga_registry.parquet"
+
+def _find(path):
+    """File backing a table and its signature; FileNotFoundError if there is none"""
+    found = find_table(path)
+    if found is None:
+        raise FileNotFoundError(f"No table found for {path}")
+    return str(found), file_signature(found)
+
+def _shapefile_signature(shapefile):
+    """Signatures of the geometry, attribute and projection files"""
+    return tuple(file_signature(Path(shapefile).with_suffix(suffix)) for suffix in ('.shp', '.dbf', '.prj'))
+
+def _registry_signature():
+    return (file_signature(REGISTRY_FILE), _shapefile_signature(get_shapefile()))
+
+# ---------------------------------------------------------------------------
+# Tables (st.cache_data: every caller gets its own copy and may modify it)
+# ---------------------------------------------------------------------------
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _read_table(path, signature):
+    return read_table(path)
+
+def load_table(path):
+    """Stage table (Parquet, or Excel/CSV from older runs)"""
+    return _read_table(*_find(path))
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _read_predictions(path, signature, registry_signature):
+    df = read_table(path)
+    if 'lga_id' not in df.columns:
+        # Predictions from older runs have no integer panel index
+        add_panel_index(df, load_lga_registry())
+    return df
+
+def load_predictions(path):
+    """Predictions table with the integer lga_id column"""
+    return _read_predictions(*_find(path), _registry_signature())
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _epi_summary(path, signature):
+    df_epi = pd.read_excel(path)
+    lga_cols = [col for col in df_epi.columns if 'lga' in col.lower()]
+    return {
+        'total_cases': len(df_epi),
+        'lgas_affected': df_epi[lga_cols[0]].nunique() if lga_cols else None
+    }
+
+def epi_summary(epi_file):
+    """
+    Quick stats of the case line list
+
+    Returns:
+        dict: total_cases, lgas_affected (None without an LGA column)
+    """
+    return _epi_summary(str(epi_file), file_signature(epi_file))
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _excel_bytes(path, signature):
+    return to_excel_bytes(read_table(path))
+
+def table_excel_bytes(path):
+    """Excel workbook of a table as bytes (for download buttons)"""
+    return _excel_bytes(*_find(path))
+
+# ---------------------------------------------------------------------------
+# Registry and geometries (st.cache_resource: one shared object, read-only)
+# ---------------------------------------------------------------------------
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_ENTRIES)
+def _registry(registry_signature):
+    return get_lga_registry()
+
+def load_lga_registry():
+    """LGA registry (integer LGA codes shared with the pipeline)"""
+    return _registry(_registry_signature())
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_ENTRIES)
+def _map_geometry(path, signature, registry_signature):
+    return load_geometry(path, registry=load_lga_registry())
+
+def load_map_geometry(shapefile):
+    """
+    Simplified LGA map geometry (map_geometry.LGAGeometry), prepared on
+    first use and kept in memory; GeoJSON of each detail level is parsed
+    once and shared between reruns, so do not modify it
+    """
+    return _map_geometry(str(shapefile), _shapefile_signature(shapefile), _registry_signature())
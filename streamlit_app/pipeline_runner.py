@@ -3,13 +3,23 @@ Pipeline Runner Module
 Handles execution of pipeline scripts from Streamlit app
 """
 
+import json
+import os
 import subprocess
 import sys
+import urllib.error
+import urllib.request
 from pathlib import Path
 
 # Get parent directory (main project folder)
 PARENT_DIR = Path(__file__).parent.parent
 
+# Shared table storage (Parquet stage outputs) lives in the project root
+sys.path.insert(0, str(PARENT_DIR))
+from storage import find_table
+from panel_index import project_registry
+from model_registry import load_latest, TASK_WEEKLY
+
 # Pipeline scripts - check both parent and scripts folder
 def get_script_path(script_name):
     """Get script path, checking both parent and scripts directory"""
@@ -41,13 +51,14 @@ MERGED_DATA_DIR = PARENT_DIR / 'merged_data'
 MODEL_OUTPUT_DIR = PARENT_DIR / 'model_output'
 ENV_DATA_DIR = PARENT_DIR / 'environmental_data_excel'
 
-def run_script(script_key, timeout=600):
+def run_script(script_key, timeout=600, args=None):
     """
     Run a pipeline script
     
     Args:
         script_key: Key from SCRIPTS dict
         timeout: Timeout in seconds
+        args: Extra command-line arguments for the script
         
     Returns:
         tuple: (success, output, error)
@@ -60,7 +71,7 @@ def run_script(script_key, timeout=600):
     try:
         # Run the script from parent directory
         result = subprocess.run(
-            [sys.executable, str(script_path)],
+            [sys.executable, str(script_path)] + list(args or []),
             cwd=str(PARENT_DIR),
             capture_output=True,
             text=True,
@@ -77,6 +88,16 @@ def run_script(script_key, timeout=600):
     except Exception as e:
         return False, "", str(e)
 
+def run_incremental_merge(timeout=300):
+    """
+    Update the merged dataset after new case data is saved, recomputing
+    features only for new or changed (LGA, week) rows
+    
+    Returns:
+        tuple: (success, output, error)
+    """
+    return run_script('merge', timeout=timeout, args=['--incremental'])
+
 def check_prerequisites():
     """
     Check if all required files and directories exist
@@ -133,12 +154,14 @@ def check_prerequisites():
     return len(missing) == 0, missing
 
 def get_predictions_file():
-    """Get path to predictions file"""
-    return PREDICTIONS_DIR / "cholera_predictions.xlsx"
+    """Get path to predictions table (Parquet, or Excel from older runs)"""
+    path = PREDICTIONS_DIR / "cholera_predictions.parquet"
+    return find_table(path) or path
 
 def get_future_predictions_file():
-    """Get path to future predictions file"""
-    return PREDICTIONS_DIR / "future_predictions_12weeks.xlsx"
+    """Get path to future predictions table (Parquet, or Excel from older runs)"""
+    path = PREDICTIONS_DIR / "future_predictions_12weeks.parquet"
+    return find_table(path) or path
 
 def get_pdf_report_file():
     """Get path to PDF report"""
@@ -155,6 +178,70 @@ def get_shapefile():
     """Get path to shapefile"""
     return DATA_DIR / "LGA.shp"
 
+def get_lga_registry():
+    """Get the LGA registry (integer LGA codes shared with the pipeline)"""
+    return project_registry(PARENT_DIR)
+
+def get_latest_model():
+    """Get the latest registered weekly model bundle, or None if none is trained"""
+    try:
+        return load_latest(TASK_WEEKLY, registry_dir=MODEL_OUTPUT_DIR / 'registry')
+    except FileNotFoundError:
+        return None
+
+# Local prediction server (prediction_server.py), used when it is running
+PREDICTION_SERVER_URL = os.environ.get('CHOLERA_PREDICTION_SERVER', 'http://127.0.0.1:8765')
+
+def _server_request(path, payload=None, timeout=10):
+    """JSON request to the prediction server; None if it is not reachable"""
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(PREDICTION_SERVER_URL.rstrip('/') + path, data=data,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+def get_server_status():
+    """Prediction server status (model version, panel size), or None if it is not running"""
+    return _server_request('/health', timeout=1)
+
+def request_forecast(horizon=12, lga_ids=None, lga_names=None):
+    """
+    Forecast from the prediction server
+    
+    Returns:
+        tuple: (model_version, DataFrame) or None if the server is not reachable
+    """
+    import pandas as pd
+    
+    result = _server_request('/forecast', {'horizon': horizon, 'lga_ids': lga_ids, 'lga_names': lga_names})
+    if result is None:
+        return None
+    df = pd.DataFrame(result['forecast'])
+    if 'week_start' in df.columns:
+        df['week_start'] = pd.to_datetime(df['week_start'])
+    return result['model_version'], df
+
+def request_predictions(lga_ids=None, lga_names=None, start=None, end=None):
+    """
+    Predictions for existing (LGA, week) rows from the prediction server
+    
+    Returns:
+        tuple: (model_version, DataFrame) or None if the server is not reachable
+    """
+    import pandas as pd
+    
+    result = _server_request('/predict', {'lga_ids': lga_ids, 'lga_names': lga_names,
+                                          'start': start, 'end': end})
+    if result is None:
+        return None
+    df = pd.DataFrame(result['predictions'])
+    if 'week_start' in df.columns:
+        df['week_start'] = pd.to_datetime(df['week_start'])
+    return result['model_version'], df
+
 def save_uploaded_data(df, create_backup=True):
     """
     Save uploaded data to epi data file
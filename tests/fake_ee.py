@@ -0,0 +1,157 @@
+"""
+Minimal offline stand-in for the Earth Engine `ee` module
+
+Covers what the batch extractor uses. Every band carries a value derived
+from its dataset and week start, and reducing over an LGA adds the LGA's
+number (the x coordinate of its point geometry), so tests can check which
+(LGA, week) each value came from. Collections listed in `empty` have no
+scenes for a week, and a single-band stack reports its value as 'mean',
+like the real service.
+"""
+
+import pandas as pd
+
+DATASET_OFFSETS = {
+    'UCSB-CHG/CHIRPS/DAILY': 1000,
+    'MODIS/061/MOD11A2': 2000,
+    'MODIS/061/MOD13A2': 3000,
+}
+
+def week_value(dataset, start_str, band_index=0):
+    """Base value of a dataset's band for the week starting start_str"""
+    return DATASET_OFFSETS[dataset] + pd.Timestamp(start_str).dayofyear + 0.1 * band_index
+
+class FakeEE:
+    """
+    Fake `ee` module instance
+
+    Parameters:
+    -----------
+    empty : set of (dataset, week start string)
+        Weekly composites without scenes
+    """
+
+    def __init__(self, empty=()):
+        self.empty = set(empty)
+        self.requests = 0
+        fake = self
+
+        class Computed:
+            def __init__(self, value):
+                self.value = value
+
+            def getInfo(self):
+                fake.requests += 1
+                return _resolve(self.value)
+
+        class Image:
+            def __init__(self, bands=None):
+                # DEM asset name or {band name: base value}
+                if isinstance(bands, str):
+                    bands = {'elevation': 1.0}
+                self.bands = dict(bands or {})
+
+            @staticmethod
+            def cat(images):
+                bands = {}
+                for image in images:
+                    bands.update(image.bands)
+                return Image(bands)
+
+            def addBands(self, other):
+                return Image({**self.bands, **other.bands})
+
+            def select(self, names):
+                return Image({name: self.bands[name] for name in names})
+
+            def multiply(self, _):
+                return self
+
+            def subtract(self, _):
+                return self
+
+            def bandNames(self):
+                return Computed(list(self.bands))
+
+            def reduceRegions(self, collection, reducer, scale):
+                return Reduced(self, collection)
+
+        class Reduced(Computed):
+            def __init__(self, image, collection):
+                self.image, self.collection = image, collection
+
+            def resolve(self):
+                features = []
+                for feature in self.collection.features:
+                    offset = feature.geometry['coordinates'][0]
+                    values = {band: base + offset for band, base in self.image.bands.items()}
+                    if len(values) == 1:
+                        values = {'mean': next(iter(values.values()))}
+                    features.append({'type': 'Feature', 'properties': {**feature.properties, **values}})
+                return {'type': 'FeatureCollection', 'features': features}
+
+            def getInfo(self):
+                fake.requests += 1
+                return self.resolve()
+
+        def _resolve(value):
+            if isinstance(value, Reduced):
+                return value.resolve()
+            if isinstance(value, Computed):
+                return _resolve(value.value)
+            if isinstance(value, dict):
+                return {key: _resolve(item) for key, item in value.items()}
+            return value
+
+        class ImageCollection:
+            def __init__(self, dataset, start=None, names=None):
+                self.dataset, self.start, self.names = dataset, start, names
+
+            def filterDate(self, start, end):
+                return ImageCollection(self.dataset, start, self.names)
+
+            def select(self, bands, names=None):
+                return ImageCollection(self.dataset, self.start, names or bands)
+
+            def map(self, _):
+                return self
+
+            def _composite(self):
+                if (self.dataset, self.start) in fake.empty:
+                    return Image()
+                return Image({name: week_value(self.dataset, self.start, k)
+                              for k, name in enumerate(self.names)})
+
+            sum = _composite
+            mean = _composite
+
+        class Feature:
+            def __init__(self, geometry, properties):
+                self.geometry, self.properties = geometry, properties
+
+        class FeatureCollection:
+            def __init__(self, features):
+                self.features = features
+
+        class Reducer:
+            @staticmethod
+            def mean():
+                return 'mean'
+
+        class Terrain:
+            @staticmethod
+            def slope(dem):
+                return Image({'slope': 2.0})
+
+            @staticmethod
+            def aspect(dem):
+                return Image({'aspect': 3.0})
+
+        self.Image = Image
+        self.ImageCollection = ImageCollection
+        self.Feature = Feature
+        self.FeatureCollection = FeatureCollection
+        self.Reducer = Reducer
+        self.Terrain = Terrain
+        self.Dictionary = Computed
+        self.Geometry = lambda geometry: geometry
@@ -0,0 +1,82 @@
+import pandas as pd
+from fake_ee import FakeEE, week_value
+from gee_batch import BatchWeeklyExtractor
+from gee_scheduler import RequestScheduler
+
+CHIRPS = 'UCSB-CHG/CHIRPS/DAILY'
+LST = 'MODIS/061/MOD11A2'
+NDVI = 'MODIS/061/MOD13A2'
+
+def make_lgas(n):
+    return [{'lga_name': f'LGA {k}', 'state_name': 'Yobe',
+             'geometry': {'type': 'Point', 'coordinates': [k, 0]}} for k in range(n)]
+
+def week_start(week_end):
+    return (week_end - pd.Timedelta(days=6)).strftime('%Y-%m-%d')
+
+def test_multi_chunk_values_and_request_count():
+    weeks = pd.date_range('2024-01-07', periods=10, freq='W-SUN')
+    starts = [week_start(w) for w in weeks]
+    # Last chunk (weeks 9-10): no LST scenes, NDVI only in week 9, so its
+    # MODIS stack is a single band reported as 'mean'
+    empty = {(LST, starts[8]), (LST, starts[9]), (NDVI, starts[9])}
+    ee = FakeEE(empty)
+    extractor = BatchWeeklyExtractor(ee, weeks_per_request=4, lgas_per_request=2,
+                                     scheduler=RequestScheduler(concurrency=1, rate=0))
+    lgas = make_lgas(5)
+
+    records = extractor.extract_weeks(lgas, weeks)
+
+    # 3 LGA chunks x 3 week chunks, one CHIRPS and one MODIS request each
+    assert extractor.request_count == 18
+    assert ee.requests == 18
+    assert len(records) == 5 * 10
+
+    for n, record in enumerate(records):
+        k, i = divmod(n, 10)
+        start = starts[i]
+        assert record['lga_name'] == f'LGA {k}'
+        assert record['week_start'] == start
+        assert record['week_end'] == weeks[i].strftime('%Y-%m-%d')
+        assert record['precipitation_total'] == week_value(CHIRPS, start) + k
+        lst_day = 0 if (LST, start) in empty else week_value(LST, start, 0) + k
+        lst_night = 0 if (LST, start) in empty else week_value(LST, start, 1) + k
+        ndvi = 0 if (NDVI, start) in empty else week_value(NDVI, start, 0) + k
+        assert record['lst_day_mean'] == lst_day
+        assert record['lst_night_mean'] == lst_night
+        assert record['ndvi_mean'] == ndvi
+
+def test_single_band_chunk_keeps_its_value():
+    weeks = pd.date_range('2024-01-07', periods=1, freq='W-SUN')
+    start = week_start(weeks[0])
+    ee = FakeEE({(LST, start)})
+    extractor = BatchWeeklyExtractor(ee, scheduler=RequestScheduler(concurrency=1, rate=0))
+
+    (record,) = extractor.extract_weeks(make_lgas(1), weeks)
+
+    assert record['ndvi_mean'] == week_value(NDVI, start)
+    assert record['precipitation_total'] == week_value(CHIRPS, start)
+    assert record['lst_day_mean'] == 0
+
+def test_records_are_passed_to_on_records_per_chunk():
+    weeks = pd.date_range('2024-01-07', periods=6, freq='W-SUN')
+    extractor = BatchWeeklyExtractor(FakeEE(), weeks_per_request=4, lgas_per_request=3,
+                                     scheduler=RequestScheduler(concurrency=1, rate=0))
+    chunks = []
+
+    records = extractor.extract_weeks(make_lgas(4), weeks, on_records=chunks.append)
+
+    assert [len(chunk) for chunk in chunks] == [12, 6, 4, 2]
+    assert sorted(r['lga_name'] + r['week_start'] for chunk in chunks for r in chunk) == \
+        sorted(r['lga_name'] + r['week_start'] for r in records)
+
+def test_extract_static_one_request_per_chunk():
+    ee = FakeEE()
+    extractor = BatchWeeklyExtractor(ee, lgas_per_request=2,
+                                     scheduler=RequestScheduler(concurrency=1, rate=0))
+
+    results = extractor.extract_static(make_lgas(3))
+
+    assert extractor.request_count == 2
+    assert results == [{'elevation_mean': 1.0 + k, 'slope_mean': 2.0 + k, 'aspect_mean': 3.0 + k}
+                       for k in range(3)]
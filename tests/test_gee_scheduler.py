@@ -0,0 +1,153 @@
+import threading
+import time
+import pytest
+from gee_scheduler import RequestScheduler, TokenBucket, is_retryable, is_no_data
+
+class FakeClock:
+    """Monotonic clock that only moves when something sleeps"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class FlakyClient:
+    """Fails `failures` times with `message`, then returns 'ok'"""
+
+    def __init__(self, failures, message='429 Too Many Requests'):
+        self.failures = failures
+        self.message = message
+        self.calls = 0
+
+    def get(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError(self.message)
+        return 'ok'
+
+class SlowClient:
+    """Takes `latency` seconds per call and records how many calls overlap"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get(self, item):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+        return item
+
+def make_scheduler(clock, **kwargs):
+    kwargs.setdefault('rate', 0)
+    return RequestScheduler(concurrency=1, sleep=clock.sleep, clock=clock, **kwargs)
+
+def test_retries_retryable_errors_with_jittered_backoff():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, max_retries=5, base_delay=1.0, max_delay=60.0)
+    client = FlakyClient(3)
+
+    assert scheduler.call(client.get) == 'ok'
+
+    assert client.calls == 4
+    assert scheduler.request_count == 4
+    assert scheduler.retry_count == 3
+    assert len(clock.sleeps) == 3
+    for attempt, delay in enumerate(clock.sleeps):
+        # Exponential backoff with jitter in [50%, 100%] of the full delay
+        assert 0.5 * 2 ** attempt <= delay <= 2 ** attempt
+
+def test_backoff_is_capped_at_max_delay():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, max_retries=5, base_delay=10.0, max_delay=15.0)
+
+    scheduler.call(FlakyClient(4, 'Quota exceeded').get)
+
+    assert all(delay <= 15.0 for delay in clock.sleeps)
+    assert all(delay >= 7.5 for delay in clock.sleeps[1:])
+
+def test_gives_up_after_max_retries():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, max_retries=2)
+    client = FlakyClient(10)
+
+    with pytest.raises(RuntimeError, match='429'):
+        scheduler.call(client.get)
+
+    assert client.calls == 3
+    assert scheduler.retry_count == 2
+
+def test_non_retryable_error_is_raised_at_once():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    client = FlakyClient(1, 'Permission denied')
+
+    with pytest.raises(RuntimeError, match='Permission denied'):
+        scheduler.call(client.get)
+
+    assert client.calls == 1
+    assert scheduler.retry_count == 0
+    assert clock.sleeps == []
+
+def test_token_bucket_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=5.0, capacity=1, clock=clock, sleep=clock.sleep)
+
+    for _ in range(11):
+        bucket.acquire()
+
+    # First token is the initial burst, the other 10 arrive at 5 per second
+    assert clock.now == pytest.approx(2.0)
+
+def test_scheduler_calls_are_rate_limited():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, rate=4.0, burst=2)
+
+    for _ in range(10):
+        scheduler.call(lambda: None)
+
+    # Burst of 2, then 8 more at 4 per second
+    assert clock.now == pytest.approx(2.0)
+    assert scheduler.request_count == 10
+
+def test_map_keeps_input_order():
+    scheduler = RequestScheduler(concurrency=4, rate=0)
+
+    assert scheduler.map(lambda x: x * x, range(20)) == [x * x for x in range(20)]
+
+@pytest.mark.parametrize('concurrency', [1, 4, 8])
+def test_map_speedup_is_proportional_to_concurrency(concurrency):
+    client = SlowClient(latency=0.05)
+    scheduler = RequestScheduler(concurrency=concurrency, rate=0)
+    n_calls = 16
+    serial = n_calls * client.latency
+
+    start = time.perf_counter()
+    results = scheduler.map(lambda item: scheduler.call(client.get, item), range(n_calls))
+    elapsed = time.perf_counter() - start
+
+    assert results == list(range(n_calls))
+    assert client.max_in_flight == concurrency
+    assert scheduler.request_count == n_calls
+    # About serial / concurrency: never faster, and well short of the next
+    # slower concurrency level
+    expected = serial / concurrency
+    assert expected * 0.9 <= elapsed < expected * 1.5 + 0.05
+
+def test_error_classification():
+    assert is_retryable(RuntimeError('HTTP 503: Service Unavailable'))
+    assert is_retryable(RuntimeError('Computation timed out.'))
+    assert not is_retryable(RuntimeError('Permission denied'))
+    assert is_no_data(RuntimeError("Image.select: Pattern 'NDVI' did not match any bands."))
+    assert not is_no_data(RuntimeError('429 Too Many Requests'))
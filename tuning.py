@@ -0,0 +1,242 @@
+"""
+Hyperparameter Search
+Randomized search with successive halving, scored by rolling-origin
+backtests. Every trial is kept in a SQLite store, so interrupted searches
+resume where they stopped and a search on a grown dataset starts from the
+best configurations found before
+"""
+
+import hashlib
+import json
+import math
+import sqlite3
+import time
+from datetime import datetime
+import pandas as pd
+from joblib import Parallel, delayed
+from scipy.stats import loguniform, randint, uniform
+from sklearn.base import clone
+from sklearn.model_selection import ParameterSampler
+from sklearn.preprocessing import StandardScaler
+from backtest import run_backtest, DEFAULT_STEP, DEFAULT_MIN_TRAIN_WEEKS
+from forecasting import DEFAULT_HORIZON
+from storage import frame_fingerprint
+
+# Search spaces by model name (names as in the training scripts)
+SEARCH_SPACES = {
+    'Random Forest': {
+        'n_estimators': randint(50, 301),
+        'max_depth': [None, 5, 10, 20],
+        'min_samples_leaf': randint(1, 11),
+        'max_features': [1.0, 0.5, 'sqrt']
+    },
+    'Gradient Boosting': {
+        'n_estimators': randint(50, 301),
+        'learning_rate': loguniform(0.01, 0.3),
+        'max_depth': randint(2, 7),
+        'subsample': uniform(0.6, 0.4)
+    },
+    'Extra Trees': {
+        'n_estimators': randint(50, 301),
+        'max_depth': [None, 5, 10, 20],
+        'min_samples_leaf': randint(1, 11)
+    },
+    'Ridge Regression': {'alpha': loguniform(1e-3, 1e2)},
+    'Lasso Regression': {'alpha': loguniform(1e-4, 1.0)},
+    'Elastic Net': {'alpha': loguniform(1e-4, 1.0), 'l1_ratio': uniform(0.1, 0.8)}
+}
+
+def _to_native(value):
+    """JSON fallback for numpy scalars"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def _params_json(params):
+    return json.dumps(params, sort_keys=True, default=_to_native)
+
+def _params_hash(params):
+    return hashlib.sha1(_params_json(params).encode()).hexdigest()[:16]
+
+class TrialStore:
+    """
+    SQLite store of search trials
+
+    One row per (search, params, budget) with the backtest score, so a
+    rerun of the same search skips every trial already evaluated. A search
+    is one model on one dataset fingerprint with one backtest setup.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS trials ("
+            "search TEXT NOT NULL, model TEXT NOT NULL, fingerprint TEXT NOT NULL, "
+            "params_hash TEXT NOT NULL, budget INTEGER NOT NULL, params TEXT NOT NULL, "
+            "score REAL NOT NULL, metrics TEXT, seconds REAL, created TEXT NOT NULL, "
+            "PRIMARY KEY (search, params_hash, budget))"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, search, model, fingerprint, params, budget, score, metrics=None, seconds=None):
+        """Commit one evaluated trial"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO trials (search, model, fingerprint, params_hash, budget, params, "
+            "score, metrics, seconds, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (search, model, fingerprint, _params_hash(params), int(budget), _params_json(params),
+             float(score), json.dumps(metrics or {}, default=_to_native), seconds,
+             datetime.now().isoformat(timespec='seconds'))
+        )
+        self.conn.commit()
+
+    def completed(self, search):
+        """{(params_hash, budget): score} of a search's evaluated trials"""
+        rows = self.conn.execute(
+            "SELECT params_hash, budget, score FROM trials WHERE search = ?", (search,)
+        ).fetchall()
+        return {(h, budget): score for h, budget, score in rows}
+
+    def trials(self, model=None):
+        """All trials (optionally of one model), params decoded"""
+        query = "SELECT * FROM trials"
+        args = ()
+        if model is not None:
+            query += " WHERE model = ?"
+            args = (model,)
+        df = pd.read_sql_query(query, self.conn, params=args)
+        df['params'] = df['params'].map(json.loads)
+        return df
+
+    def best_params(self, model, top=1, exclude_search=None):
+        """
+        Best configurations of a model's most recent search
+
+        Each configuration is ranked by its score at the largest budget it
+        reached (larger budgets first), so candidates dropped early by
+        successive halving never outrank finalists.
+
+        Returns:
+        --------
+        List of up to `top` param dicts (empty if the model was never tuned)
+        """
+        df = self.trials(model)
+        if exclude_search is not None:
+            df = df[df['search'] != exclude_search]
+        if df.empty:
+            return []
+        latest = df.groupby('search')['created'].max().idxmax()
+        df = df[df['search'] == latest]
+        final = df.sort_values('budget').drop_duplicates('params_hash', keep='last')
+        final = final.sort_values(['budget', 'score'], ascending=[False, True])
+        return final['params'].head(top).tolist()
+
+def tuned_params(store, names):
+    """{model name: best stored params} for the named models that were tuned"""
+    tuned = {}
+    for name in names:
+        best = store.best_params(name)
+        if best:
+            tuned[name] = best[0]
+    return tuned
+
+def _evaluate(model, params, df, feature_cols, budget, step, horizon, min_train_weeks):
+    """Backtest one configuration on the most recent `budget` origins"""
+    start = time.time()
+    estimator = clone(model).set_params(**params)
+    results = run_backtest(estimator, df, feature_cols, scaler=StandardScaler(), step=step,
+                           horizon=horizon, min_train_weeks=min_train_weeks, max_origins=budget,
+                           n_jobs=1)
+    origins = results['origins']
+    metrics = {'mae': origins['mae'].mean(), 'rmse': origins['rmse'].mean(),
+               'bias': origins['bias'].mean(), 'origins': len(origins)}
+    return params, float(metrics['mae']), metrics, time.time() - start
+
+def tune_model(name, model, df, feature_cols, store, space=None, n_iter=20, warm_iter=None,
+               warm_top=3, min_origins=4, max_origins=36, eta=3, step=DEFAULT_STEP,
+               horizon=DEFAULT_HORIZON, min_train_weeks=DEFAULT_MIN_TRAIN_WEEKS,
+               n_jobs=-1, random_state=None, verbose=True):
+    """
+    Randomized successive-halving search for one model
+
+    Every candidate is backtested on the most recent `min_origins` origins;
+    the best 1/eta move on to eta times as many origins, until `max_origins`.
+    Candidates run as parallel trials and results are committed to the
+    store in candidate order as they come in, so an interrupted search
+    keeps every trial recorded before it stopped.
+
+    Parameters:
+    -----------
+    name : str
+        Model name (key of SEARCH_SPACES and of the store)
+    model : estimator
+        Base estimator; sampled params are set on clones of it
+    df : DataFrame
+        Merged panel (see backtest.run_backtest)
+    store : TrialStore
+        Trial store used to resume and warm start
+    n_iter : int
+        Random candidates for a model that was never tuned
+    warm_iter, warm_top : int
+        When an earlier search exists (e.g. before the dataset grew), its
+        `warm_top` best configurations are candidates alongside only
+        `warm_iter` new random ones (default n_iter // 4)
+    min_origins, max_origins, eta : int
+        Successive halving budgets, in backtest origins
+    n_jobs : int
+        Parallel trials (-1: all cores)
+    random_state : int, optional
+        Sampling seed (default: derived from the search, so a resumed
+        search samples the same candidates and a new one different ones)
+
+    Returns:
+    --------
+    (best params, DataFrame of the search's trials)
+    """
+    space = space or SEARCH_SPACES[name]
+    fingerprint = frame_fingerprint(df, ['lga_id', 'week_id', 'case_count'] + list(feature_cols))
+    search = hashlib.sha1(json.dumps(
+        [name, fingerprint, sorted(space), step, horizon, min_train_weeks, min_origins, max_origins, eta]
+    ).encode()).hexdigest()[:16]
+
+    previous = store.best_params(name, top=warm_top, exclude_search=search)
+    n_new = (warm_iter if warm_iter is not None else max(1, n_iter // 4)) if previous else n_iter
+    candidates = {}
+    seed = int(search[:8], 16) if random_state is None else random_state
+    for params in previous + list(ParameterSampler(space, n_new, random_state=seed)):
+        params = json.loads(_params_json(params))
+        candidates.setdefault(_params_hash(params), params)
+
+    if verbose:
+        source = f"{len(previous)} from previous search + {n_new} random" if previous else f"{n_new} random"
+        print(f"  Tuning {name}: {len(candidates)} candidates ({source})", flush=True)
+
+    done = store.completed(search)
+    survivors = list(candidates)
+    budget = min_origins
+    while True:
+        todo = [h for h in survivors if (h, budget) not in done]
+        outputs = Parallel(n_jobs=n_jobs, return_as='generator')(
+            delayed(_evaluate)(model, candidates[h], df, feature_cols, budget, step, horizon, min_train_weeks)
+            for h in todo
+        )
+        for params, score, metrics, seconds in outputs:
+            store.record(search, name, fingerprint, params, budget, score, metrics, seconds)
+            done[(_params_hash(params), budget)] = score
+
+        if verbose:
+            print(f"    {budget} origins: {len(survivors)} candidates ({len(todo)} evaluated), "
+                  f"best MAE {min(done[(h, budget)] for h in survivors):.4f}", flush=True)
+        if budget >= max_origins or len(survivors) == 1:
+            break
+        survivors.sort(key=lambda h: done[(h, budget)])
+        survivors = survivors[:max(1, math.ceil(len(survivors) / eta))]
+        budget = min(budget * eta, max_origins)
+
+    best = min(survivors, key=lambda h: done[(h, budget)])
+    trials = store.trials(name)
+    return candidates[best], trials[trials['search'] == search].reset_index(drop=True)
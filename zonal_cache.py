@@ -0,0 +1,189 @@
+"""
+Content-Addressed Zonal Statistics Cache
+Stores per-LGA raster statistics as Parquet so reruns only recompute the
+(raster, LGA) pairs whose inputs changed
+"""
+
+import hashlib
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from zonal_stats import extract_parallel, extract_spec, task_streaming
+
+class ZonalStatsCache:
+    """
+    On-disk cache of zonal statistics
+
+    One Parquet file per (raster fingerprint, requested statistics) holds a
+    row per LGA, keyed by a hash of the LGA geometry and its CRS:
+
+    - raster fingerprint: resolved path + size + mtime (or a SHA-256 of the
+      file contents with content_hash=True)
+    - geometry hash: SHA-1 of the geometry WKB + CRS
+    - stat set: sorted statistic names or class map, plus read mode
+
+    A changed raster gets a new file (older versions are pruned); a changed
+    LGA boundary only misses its own row.
+    """
+
+    def __init__(self, cache_dir, content_hash=False):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.content_hash = content_hash
+
+    def raster_fingerprint(self, raster_path):
+        """Fingerprint of the raster file (path + size + mtime, or content hash)"""
+        raster_path = Path(raster_path).resolve()
+        if self.content_hash:
+            digest = hashlib.sha256()
+            with open(raster_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            return digest.hexdigest()[:16]
+
+        stat = raster_path.stat()
+        key = f"{raster_path}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def geometry_hashes(geometries):
+        """Per-geometry hash of WKB + CRS, aligned with geometries.index"""
+        crs = geometries.crs.to_wkt() if geometries.crs else ''
+        wkb = geometries.geometry.to_wkb()
+        return pd.Series(
+            [hashlib.sha1((value or b'') + crs.encode()).hexdigest() for value in wkb],
+            index=geometries.index
+        )
+
+    @staticmethod
+    def spec_key(spec, streaming=False):
+        """Hash of the requested statistics (or class map) and read mode"""
+        if isinstance(spec, dict):
+            payload = {'classes': sorted((str(k), str(v)) for k, v in spec.items())}
+        else:
+            payload = {'stats': sorted(spec)}
+        payload['streaming'] = bool(streaming)
+        return hashlib.sha1(json.dumps(payload).encode()).hexdigest()[:8]
+
+    def entry_path(self, raster_path, spec, streaming=False):
+        """Parquet file for one raster version and stat set"""
+        raster_path = Path(raster_path)
+        path_key = hashlib.sha1(str(raster_path.resolve()).encode()).hexdigest()[:8]
+        return self.cache_dir / (f"{raster_path.stem}_{path_key}_"
+                                 f"{self.raster_fingerprint(raster_path)}_"
+                                 f"{self.spec_key(spec, streaming)}.parquet")
+
+    def _prune_stale(self, path):
+        """Remove entries for older versions of the same raster and stat set"""
+        stem, path_key, _, spec = path.stem.rsplit('_', 3)
+        for old in self.cache_dir.glob(f"{stem}_{path_key}_*_{spec}.parquet"):
+            if old != path:
+                old.unlink(missing_ok=True)
+
+    def lookup(self, raster_path, geometries, spec, streaming=False):
+        """
+        Cached rows for geometries
+
+        Returns:
+        --------
+        (stats, missing) where stats is indexed like geometries (NaN rows for
+        misses) or None when nothing is cached, and missing is a boolean
+        array of geometries that need computing
+        """
+        path = self.entry_path(raster_path, spec, streaming)
+        hashes = self.geometry_hashes(geometries)
+
+        if not path.exists():
+            return None, np.ones(len(geometries), dtype=bool)
+
+        cached = pd.read_parquet(path)
+        missing = ~hashes.isin(cached.index).values
+        stats = cached.reindex(hashes.values)
+        stats.index = geometries.index
+        return stats, missing
+
+    def store(self, raster_path, geometries, spec, stats, streaming=False):
+        """Add freshly computed rows (indexed like geometries) to the cache"""
+        path = self.entry_path(raster_path, spec, streaming)
+        rows = stats.copy()
+        rows.index = pd.Index(self.geometry_hashes(geometries).values, name='geometry_hash')
+
+        if path.exists():
+            rows = pd.concat([pd.read_parquet(path), rows])
+        rows = rows[~rows.index.duplicated(keep='last')]
+
+        tmp_path = path.with_suffix('.tmp')
+        rows.to_parquet(tmp_path)
+        tmp_path.replace(path)
+        self._prune_stale(path)
+
+    def get_or_compute(self, raster_path, geometries, spec, streaming=False, engine=None):
+        """
+        Zonal statistics for geometries, computing only cache misses
+
+        Parameters:
+        -----------
+        raster_path : Path
+            Path to raster file
+        geometries : GeoDataFrame
+            Geometries to extract statistics for
+        spec : list or dict
+            Statistics to calculate, or {class code: column} for class proportions
+        streaming : bool
+            Use block-streaming reads for misses
+        engine : ZonalStatsEngine, optional
+            Shared engine (used when every geometry misses, to reuse label grids)
+
+        Returns:
+        --------
+        DataFrame indexed like geometries
+        """
+        stats, missing = self.lookup(raster_path, geometries, spec, streaming)
+        if not missing.any():
+            return stats
+
+        if missing.all():
+            computed = extract_spec(raster_path, geometries, spec, streaming, engine)
+            self.store(raster_path, geometries, spec, computed, streaming)
+            return computed
+
+        subset = geometries[missing]
+        computed = extract_spec(raster_path, subset, spec, streaming)
+        self.store(raster_path, subset, spec, computed, streaming)
+        stats.loc[computed.index, computed.columns] = computed
+        return stats
+
+def cached_extract_parallel(cache, geometries, tasks, workers, streaming=False):
+    """
+    extract_parallel with a cache in front
+
+    Tasks that miss the same set of LGAs are computed together in the
+    process pool on that subset only; fully cached tasks do no work.
+    streaming is a bool or a set of task names, as in extract_parallel.
+
+    Returns:
+    --------
+    dict {name: DataFrame} indexed like `geometries`
+    """
+    results = {}
+    groups = {}
+
+    for name, (raster_path, spec) in tasks.items():
+        stats, missing = cache.lookup(raster_path, geometries, spec, task_streaming(streaming, name))
+        results[name] = stats
+        if missing.any():
+            groups.setdefault(missing.tobytes(), (missing, {}))[1][name] = (raster_path, spec)
+
+    for missing, group_tasks in groups.values():
+        subset = geometries[missing]
+        computed = extract_parallel(subset, group_tasks, workers, streaming=streaming)
+        for name, stats in computed.items():
+            raster_path, spec = group_tasks[name]
+            cache.store(raster_path, subset, spec, stats, task_streaming(streaming, name))
+            if results[name] is None:
+                results[name] = stats.reindex(geometries.index)
+            else:
+                results[name].loc[stats.index, stats.columns] = stats
+
+    return results
@@ -0,0 +1,588 @@
+"""
+Zonal Statistics Engine
+Rasterizes LGA polygons once per raster grid and computes statistics for
+every LGA in a single vectorized pass per raster band
+"""
+
+import math
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.features import rasterize
+from rasterio.windows import Window
+from shapely.geometry import box
+from tqdm import tqdm
+
+SUPPORTED_STATS = ['mean', 'min', 'max', 'std', 'sum', 'median']
+
+# Upper bound on pixels read at once in streaming mode (~32 MB of float64)
+STREAM_MAX_PIXELS = 2 ** 22
+
+def valid_pixel_mask(values, nodata=None):
+    """Boolean mask of pixels that are not nodata (and finite for float rasters)"""
+    valid = np.ones(values.shape, dtype=bool)
+    if nodata is not None and not (isinstance(nodata, float) and math.isnan(nodata)):
+        valid &= values != nodata
+    if np.issubdtype(values.dtype, np.floating):
+        valid &= np.isfinite(values)
+    return valid
+
+def zone_stats_from_labels(values, labels, n_zones, stat_funcs, nodata=None):
+    """
+    Compute statistics for every zone of a label grid in one pass
+
+    Parameters:
+    -----------
+    values : ndarray
+        Raster band values
+    labels : ndarray
+        Integer zone ids aligned with `values` (0 = outside every zone)
+    n_zones : int
+        Number of zones (ids run from 1 to n_zones)
+    stat_funcs : list
+        Statistics to calculate (mean, min, max, std, sum, median)
+    nodata : float, optional
+        Raster nodata value to exclude
+
+    Returns:
+    --------
+    dict mapping each statistic to an array of length n_zones
+    (NaN for zones without valid pixels)
+    """
+    unknown = [func for func in stat_funcs if func not in SUPPORTED_STATS]
+    if unknown:
+        raise ValueError(f"Unsupported statistics: {unknown}")
+
+    valid = (labels > 0) & valid_pixel_mask(values, nodata)
+    zones = labels[valid]
+    pixels = values[valid].astype(np.float64)
+
+    size = n_zones + 1
+    count = np.bincount(zones, minlength=size)
+    total = np.bincount(zones, weights=pixels, minlength=size)
+    present = count > 0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(present, total / count, np.nan)
+
+    stats = {}
+    if 'mean' in stat_funcs:
+        stats['mean'] = mean
+    if 'sum' in stat_funcs:
+        stats['sum'] = np.where(present, total, np.nan)
+    if 'std' in stat_funcs:
+        # Two-pass variance (deviation from zone mean) for numerical stability
+        deviation = pixels - mean[zones]
+        sq_dev = np.bincount(zones, weights=deviation * deviation, minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats['std'] = np.where(present, np.sqrt(sq_dev / count), np.nan)
+
+    if any(func in stat_funcs for func in ['min', 'max', 'median']):
+        # One sort by (zone, value) gives min, max and median for every zone
+        sorted_pixels = pixels[np.lexsort((pixels, zones))]
+        starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+        first = starts[present]
+        last = first + count[present] - 1
+
+        if 'min' in stat_funcs:
+            stats['min'] = np.full(size, np.nan)
+            stats['min'][present] = sorted_pixels[first]
+        if 'max' in stat_funcs:
+            stats['max'] = np.full(size, np.nan)
+            stats['max'][present] = sorted_pixels[last]
+        if 'median' in stat_funcs:
+            lower = first + (count[present] - 1) // 2
+            upper = first + count[present] // 2
+            stats['median'] = np.full(size, np.nan)
+            stats['median'][present] = (sorted_pixels[lower] + sorted_pixels[upper]) / 2
+
+    # Drop the background zone 0
+    return {func: stats[func][1:] for func in stat_funcs}
+
+def zone_class_counts(values, labels, n_zones, class_ids, nodata=None):
+    """
+    Joint (zone, class) pixel counts in one bincount pass
+
+    Parameters:
+    -----------
+    values : ndarray
+        Categorical raster band (e.g. LULC class codes)
+    labels : ndarray
+        Integer zone ids aligned with `values` (0 = outside every zone)
+    n_zones : int
+        Number of zones (ids run from 1 to n_zones)
+    class_ids : array-like
+        Class codes to count; any codes, in any order
+    nodata : float, optional
+        Raster nodata value to exclude
+
+    Returns:
+    --------
+    (counts, totals) where counts is an (n_zones, n_classes) matrix in the
+    order of `class_ids` and totals is the number of valid pixels per zone
+    (including pixels whose code is not in `class_ids`)
+    """
+    class_ids = np.asarray(class_ids)
+    n_classes = len(class_ids)
+    size = n_zones + 1
+
+    valid = (labels > 0) & valid_pixel_mask(values, nodata)
+    zones = labels[valid]
+    codes = values[valid]
+    totals = np.bincount(zones, minlength=size)
+
+    # Map arbitrary class codes onto 0..n_classes-1
+    order = np.argsort(class_ids)
+    sorted_ids = class_ids[order]
+    position = np.clip(np.searchsorted(sorted_ids, codes), 0, max(n_classes - 1, 0))
+    known = sorted_ids[position] == codes if n_classes else np.zeros(len(codes), dtype=bool)
+    class_index = order[position[known]]
+
+    counts = np.bincount(zones[known] * n_classes + class_index,
+                         minlength=size * n_classes).reshape(size, n_classes)
+    return counts[1:], totals[1:]
+
+class ZoneAccumulator:
+    """
+    Running per-zone statistics for block-streamed rasters
+
+    Keeps count, sum, mean/M2 (merged per block with Chan's parallel update,
+    which is the numerically stable form of a sum-of-squares accumulator),
+    min and max per zone. An optional fixed-bin histogram per zone gives an
+    approximate median. Memory is O(n_zones * bins), independent of raster size.
+    """
+
+    def __init__(self, n_zones, histogram_edges=None):
+        size = n_zones + 1
+        self.n_zones = n_zones
+        self.count = np.zeros(size, dtype=np.int64)
+        self.sum = np.zeros(size)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+        self.histogram_edges = histogram_edges
+        self.histogram = None
+        if histogram_edges is not None:
+            self.histogram = np.zeros((size, len(histogram_edges) - 1), dtype=np.int64)
+
+    def update(self, zones, pixels):
+        """Fold one block of (zone id, pixel value) pairs into the accumulators"""
+        if len(zones) == 0:
+            return
+        pixels = pixels.astype(np.float64)
+        size = self.n_zones + 1
+
+        count_b = np.bincount(zones, minlength=size)
+        sum_b = np.bincount(zones, weights=pixels, minlength=size)
+        present = count_b > 0
+        mean_b = np.zeros(size)
+        mean_b[present] = sum_b[present] / count_b[present]
+        deviation = pixels - mean_b[zones]
+        m2_b = np.bincount(zones, weights=deviation * deviation, minlength=size)
+
+        n_a = self.count[present]
+        n_b = count_b[present]
+        n = n_a + n_b
+        delta = mean_b[present] - self.mean[present]
+        self.m2[present] += m2_b[present] + delta * delta * n_a * n_b / n
+        self.mean[present] += delta * n_b / n
+        self.count[present] = n
+        self.sum += sum_b
+
+        # Per-zone min/max of this block via one sort + reduceat
+        order = np.argsort(zones, kind='stable')
+        sorted_zones = zones[order]
+        sorted_pixels = pixels[order]
+        starts = np.flatnonzero(np.r_[True, sorted_zones[1:] != sorted_zones[:-1]])
+        block_zones = sorted_zones[starts]
+        self.min[block_zones] = np.minimum(self.min[block_zones],
+                                           np.minimum.reduceat(sorted_pixels, starts))
+        self.max[block_zones] = np.maximum(self.max[block_zones],
+                                           np.maximum.reduceat(sorted_pixels, starts))
+
+        if self.histogram is not None:
+            n_bins = self.histogram.shape[1]
+            bins = np.clip(np.searchsorted(self.histogram_edges, pixels, side='right') - 1,
+                           0, n_bins - 1)
+            self.histogram += np.bincount(zones * n_bins + bins,
+                                          minlength=size * n_bins).reshape(size, n_bins)
+
+    def median(self):
+        """Approximate per-zone median, interpolated within the histogram bin"""
+        result = np.full(self.n_zones + 1, np.nan)
+        if self.histogram is None:
+            return result
+        present = self.count > 0
+        cumulative = np.cumsum(self.histogram[present], axis=1)
+        half = self.count[present] / 2
+        n_bins = self.histogram.shape[1]
+        b = np.minimum((cumulative < half[:, None]).sum(axis=1), n_bins - 1)
+        rows = np.arange(len(b))
+        below = np.where(b > 0, cumulative[rows, np.maximum(b - 1, 0)], 0)
+        in_bin = self.histogram[present][rows, b]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fraction = np.where(in_bin > 0, (half - below) / in_bin, 0.5)
+        lo = self.histogram_edges[b]
+        hi = self.histogram_edges[b + 1]
+        result[present] = lo + fraction * (hi - lo)
+        return result
+
+    def results(self, stat_funcs):
+        """Final statistics in the same layout as zone_stats_from_labels"""
+        present = self.count > 0
+        stats = {
+            'mean': self.mean.copy(),
+            'sum': self.sum.copy(),
+            'min': self.min.copy(),
+            'max': self.max.copy(),
+        }
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats['std'] = np.sqrt(self.m2 / self.count)
+        if 'median' in stat_funcs:
+            stats['median'] = self.median()
+        for func in stats:
+            stats[func][~present] = np.nan
+        return {func: stats[func][1:] for func in stat_funcs}
+
+def stream_windows(src, band=1, max_pixels=STREAM_MAX_PIXELS):
+    """
+    Read windows that follow the raster's internal blocks
+
+    Tiled rasters yield their tiles. Striped rasters (full-width, few-row
+    blocks) are grouped into row bands of at most `max_pixels` pixels so we
+    do not pay per-row overhead.
+    """
+    block_height, block_width = src.block_shapes[band - 1]
+    if block_width < src.width:
+        for _, window in src.block_windows(band):
+            yield window
+        return
+
+    rows = max(block_height, (max_pixels // max(src.width, 1)) // block_height * block_height)
+    for row_off in range(0, src.height, rows):
+        yield Window(0, row_off, src.width, min(rows, src.height - row_off))
+
+class ZonalStatsEngine:
+    """
+    Zonal statistics for a fixed set of geometries
+
+    Geometries are reprojected once per raster CRS and rasterized once per
+    raster grid (CRS + transform + shape). Rasters sharing a grid reuse the
+    same label grid, so each raster costs one read and one bincount pass.
+    LGA boundaries do not overlap; where geometries do, the later one wins.
+    """
+
+    def __init__(self, geometries):
+        self.geometries = geometries
+        self.n_zones = len(geometries)
+        self._projected = {}
+        self._label_grids = {}
+
+    def geometries_in(self, crs):
+        """Geometries reprojected to `crs` (cached per CRS)"""
+        key = crs.to_wkt() if crs else None
+        if key not in self._projected:
+            if crs is None or self.geometries.crs is None or self.geometries.crs == crs:
+                self._projected[key] = self.geometries
+            else:
+                self._projected[key] = self.geometries.to_crs(crs)
+        return self._projected[key]
+
+    def window_for(self, src):
+        """Raster window covering all geometries, or None if they do not overlap"""
+        geometries = self.geometries_in(src.crs)
+        minx, miny, maxx, maxy = geometries.total_bounds
+        inverse = ~src.transform
+        cols, rows = zip(*[inverse * (x, y) for x in (minx, maxx) for y in (miny, maxy)])
+        col_off = max(int(math.floor(min(cols))), 0)
+        row_off = max(int(math.floor(min(rows))), 0)
+        col_end = min(int(math.ceil(max(cols))), src.width)
+        row_end = min(int(math.ceil(max(rows))), src.height)
+        if col_end <= col_off or row_end <= row_off:
+            return None
+        return Window(col_off, row_off, col_end - col_off, row_end - row_off)
+
+    def label_grid(self, src, window=None):
+        """
+        Label grid for the raster grid of `src`
+
+        Returns:
+        --------
+        (window, labels) where labels holds zone id i+1 for the i-th geometry
+        and 0 outside every geometry; (None, None) if nothing overlaps
+        """
+        if window is None:
+            window = self.window_for(src)
+            if window is None:
+                return None, None
+
+        transform = src.window_transform(window)
+        shape = (int(window.height), int(window.width))
+        key = (src.crs.to_wkt() if src.crs else None, tuple(transform)[:6], shape)
+
+        if key not in self._label_grids:
+            geometries = self.geometries_in(src.crs)
+            shapes = [(geom, zone) for zone, geom in enumerate(geometries.geometry, start=1)
+                      if geom is not None and not geom.is_empty]
+            if shapes:
+                labels = rasterize(shapes, out_shape=shape, transform=transform,
+                                   fill=0, dtype='int32')
+            else:
+                labels = np.zeros(shape, dtype='int32')
+            self._label_grids[key] = labels
+
+        return window, self._label_grids[key]
+
+    def empty_stats(self, stat_funcs):
+        """All-NaN statistics frame (geometries outside the raster)"""
+        return pd.DataFrame({func: np.full(self.n_zones, np.nan) for func in stat_funcs},
+                            index=self.geometries.index)
+
+    def extract(self, raster_path, stat_funcs=('mean', 'min', 'max', 'std'), band=1,
+                streaming=False, **stream_kwargs):
+        """
+        Extract zonal statistics for every geometry from one raster band
+
+        Parameters:
+        -----------
+        raster_path : Path
+            Path to raster file
+        stat_funcs : list
+            Statistics to calculate (mean, min, max, std, sum, median)
+        band : int
+            Raster band to summarise
+        streaming : bool
+            Stream the raster block by block (see extract_streaming) instead
+            of reading the covering window in one go
+
+        Returns:
+        --------
+        DataFrame with one column per statistic, indexed like the geometries
+        """
+        stat_funcs = list(stat_funcs)
+        if streaming:
+            return self.extract_streaming(raster_path, stat_funcs, band, **stream_kwargs)
+
+        with rasterio.open(raster_path) as src:
+            window, labels = self.label_grid(src)
+            if window is None:
+                return self.empty_stats(stat_funcs)
+            values = src.read(band, window=window)
+            stats = zone_stats_from_labels(values, labels, self.n_zones, stat_funcs, src.nodata)
+
+        return pd.DataFrame(stats, index=self.geometries.index)[stat_funcs]
+
+    def class_proportions(self, raster_path, class_map, band=1, streaming=False,
+                          max_pixels=STREAM_MAX_PIXELS):
+        """
+        Share of each class in every geometry from a categorical raster
+
+        Parameters:
+        -----------
+        raster_path : Path
+            Path to categorical raster (e.g. LULC)
+        class_map : dict
+            {class code: column name}; any set of codes is supported
+        band : int
+            Raster band to summarise
+        streaming : bool
+            Accumulate counts block by block instead of reading the covering window
+
+        Returns:
+        --------
+        DataFrame (geometries x classes) of proportions of valid pixels,
+        NaN for geometries without valid pixels
+        """
+        class_ids = list(class_map.keys())
+        counts = np.zeros((self.n_zones, len(class_ids)), dtype=np.int64)
+        totals = np.zeros(self.n_zones, dtype=np.int64)
+
+        with rasterio.open(raster_path) as src:
+            if self.window_for(src) is not None:
+                if streaming:
+                    geometries = self.geometries_in(src.crs)
+                    for labels, values in self._stream_blocks(src, geometries, band, max_pixels):
+                        block_counts, block_totals = zone_class_counts(values, labels, self.n_zones,
+                                                                       class_ids, src.nodata)
+                        counts += block_counts
+                        totals += block_totals
+                else:
+                    window, labels = self.label_grid(src)
+                    values = src.read(band, window=window)
+                    counts, totals = zone_class_counts(values, labels, self.n_zones,
+                                                       class_ids, src.nodata)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            proportions = counts / totals[:, None]
+        proportions[totals == 0] = np.nan
+
+        return pd.DataFrame(proportions, index=self.geometries.index,
+                            columns=list(class_map.values()))
+
+    def extract_streaming(self, raster_path, stat_funcs=('mean', 'min', 'max', 'std'), band=1,
+                          max_pixels=STREAM_MAX_PIXELS, histogram_bins=1024, histogram_range=None):
+        """
+        Block-streaming zonal statistics with flat peak memory
+
+        Reads one internal block (or bounded row band) at a time, rasterizes
+        only the geometries that touch it and folds the pixels into running
+        per-zone accumulators. Nothing larger than one block is ever held,
+        however large the raster or polygon.
+
+        Parameters:
+        -----------
+        raster_path : Path
+            Path to raster file
+        stat_funcs : list
+            Statistics to calculate (mean, min, max, std, sum, median)
+        band : int
+            Raster band to summarise
+        max_pixels : int
+            Upper bound on pixels per read for striped rasters
+        histogram_bins : int
+            Histogram bins per zone for the approximate median
+        histogram_range : tuple, optional
+            (min, max) of the histogram; when omitted and a median is
+            requested, a first streaming pass finds the value range
+
+        Returns:
+        --------
+        DataFrame with one column per statistic, indexed like the geometries
+        """
+        stat_funcs = list(stat_funcs)
+        unknown = [func for func in stat_funcs if func not in SUPPORTED_STATS]
+        if unknown:
+            raise ValueError(f"Unsupported statistics: {unknown}")
+
+        with rasterio.open(raster_path) as src:
+            geometries = self.geometries_in(src.crs)
+            if self.window_for(src) is None:
+                return self.empty_stats(stat_funcs)
+
+            accumulator = self._stream_pass(src, geometries, band, max_pixels, ZoneAccumulator(self.n_zones))
+
+            if 'median' in stat_funcs:
+                if histogram_range is None:
+                    present = accumulator.count[1:] > 0
+                    if present.any():
+                        histogram_range = (accumulator.min[1:][present].min(),
+                                           accumulator.max[1:][present].max())
+                if histogram_range is not None:
+                    lo, hi = histogram_range
+                    edges = np.linspace(lo, hi if hi > lo else lo + 1, histogram_bins + 1)
+                    median_pass = self._stream_pass(src, geometries, band, max_pixels,
+                                                    ZoneAccumulator(self.n_zones, edges))
+                    accumulator.histogram_edges = edges
+                    accumulator.histogram = median_pass.histogram
+
+        return pd.DataFrame(accumulator.results(stat_funcs), index=self.geometries.index)[stat_funcs]
+
+    def _stream_blocks(self, src, geometries, band, max_pixels):
+        """Yield (labels, values) for each raster block that intersects any geometry"""
+        sindex = geometries.sindex
+        geoms = geometries.geometry.values
+
+        for window in stream_windows(src, band, max_pixels):
+            hits = sindex.query(box(*src.window_bounds(window)))
+            if len(hits) == 0:
+                continue
+
+            shapes = [(geoms[i], int(i) + 1) for i in hits
+                      if geoms[i] is not None and not geoms[i].is_empty]
+            if not shapes:
+                continue
+            labels = rasterize(shapes, out_shape=(int(window.height), int(window.width)),
+                               transform=src.window_transform(window), fill=0, dtype='int32')
+            if not labels.any():
+                continue
+
+            yield labels, src.read(band, window=window)
+
+    def _stream_pass(self, src, geometries, band, max_pixels, accumulator):
+        """One pass over the raster blocks that intersect any geometry"""
+        for labels, values in self._stream_blocks(src, geometries, band, max_pixels):
+            valid = (labels > 0) & valid_pixel_mask(values, src.nodata)
+            accumulator.update(labels[valid], values[valid])
+
+        return accumulator
+
+def zonal_stats(raster_path, geometries, stat_funcs=('mean', 'min', 'max', 'std'), band=1,
+                streaming=False):
+    """One-off zonal statistics for a raster (use ZonalStatsEngine to reuse label grids)"""
+    return ZonalStatsEngine(geometries).extract(raster_path, stat_funcs, band, streaming=streaming)
+
+def extract_spec(raster_path, geometries, spec, streaming=False, engine=None):
+    """
+    Statistics or class proportions for geometries
+
+    `spec` is a list of statistic names, or a {class code: column} dict for
+    class proportions. Also the process-pool task: each call opens its own
+    rasterio handle.
+    """
+    if engine is None:
+        engine = ZonalStatsEngine(geometries)
+    if isinstance(spec, dict):
+        return engine.class_proportions(raster_path, spec, streaming=streaming)
+    return engine.extract(raster_path, spec, streaming=streaming)
+
+def chunk_geometries(geometries, n_chunks):
+    """
+    Split geometries into spatially compact chunks
+
+    Geometries are ordered along a Hilbert curve before splitting, so each
+    chunk covers a small raster window.
+    """
+    n_chunks = max(1, min(n_chunks, len(geometries)))
+    valid = geometries.geometry.notna() & ~geometries.geometry.is_empty
+    order = np.r_[np.flatnonzero(valid)[np.argsort(geometries[valid].geometry.hilbert_distance().values,
+                                                   kind='stable')],
+                  np.flatnonzero(~valid)]
+    return [geometries.iloc[positions] for positions in np.array_split(order, n_chunks)]
+
+def task_streaming(streaming, name):
+    """Whether a task streams: streaming is a bool for all tasks or a set of task names"""
+    if isinstance(streaming, (set, frozenset, list, tuple)):
+        return name in streaming
+    return bool(streaming)
+
+def extract_parallel(geometries, tasks, workers, n_chunks=None, streaming=False):
+    """
+    Run raster x LGA-chunk zonal statistics tasks across a process pool
+
+    Parameters:
+    -----------
+    geometries : GeoDataFrame
+        Geometries to extract statistics for
+    tasks : dict
+        {name: (raster_path, stat_funcs)} for statistics or
+        {name: (raster_path, class_map)} for class proportions
+    workers : int
+        Number of worker processes
+    n_chunks : int, optional
+        LGA chunks per raster (defaults to `workers`)
+    streaming : bool or set of str
+        Use block-streaming reads inside each worker, for every task or
+        only for the named ones
+
+    Returns:
+    --------
+    dict {name: DataFrame} indexed like `geometries`; chunk results are
+    reassembled in the original LGA order, so output is deterministic
+    regardless of completion order
+    """
+    chunks = chunk_geometries(geometries, n_chunks or workers)
+    parts = {name: [None] * len(chunks) for name in tasks}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(extract_spec, raster_path, chunk, spec, task_streaming(streaming, name)): (name, i)
+            for name, (raster_path, spec) in tasks.items()
+            for i, chunk in enumerate(chunks)
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Zonal stats"):
+            name, i = futures[future]
+            parts[name][i] = future.result()
+
+    return {name: pd.concat(frames).reindex(geometries.index) for name, frames in parts.items()}